@@ -0,0 +1,109 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+from session import ee
+
+# area engines for the land part of a mask
+#
+# 'vector' is the original method: reduceToVectors, union(1) and the area of
+# the dissolved geometry, intersected with each region for the per-region
+# areas. 'pixel' multiplies the land mask by ee.Image.pixelArea() and sums it,
+# with a reduceRegion for the totals and one grouped reduceRegions over the
+# regions, so statistics never vectorize; the polygons are only built when a
+# shapefile export asks for them. The two agree up to the pixels cut by the
+# region boundary, so the tolerance is one pixel wide band along the perimeter:
+#
+#   python areas.py --benchmark 2022-06-01 2023-05-31
+#   python areas.py --benchmark 2023-03-01 2023-03-31 --product coastline
+
+default_method = os.environ.get('SURFSIDE_AREA_METHOD', 'vector')
+methods = ('vector', 'pixel')
+
+
+def method(config=None):
+  found = (config or {}).get('area_method', default_method)
+  if found not in methods:
+    raise ValueError('unknown area method: ' + found)
+  return found
+
+
+# features with an 'areaM2' property, the area of landMask (1 for land) in each
+def region_areas(landMask, features, scale):
+  area = landMask.selfMask().multiply(ee.Image.pixelArea()).rename('areaM2')
+  return area.reduceRegions(collection=features,
+    reducer=ee.Reducer.sum().setOutputs(['areaM2']),
+    scale=scale,
+    tileScale=4)
+
+
+# ee.Number, the area in m2 of landMask (1 for land) inside geometry
+def total(landMask, geometry, scale):
+  area = landMask.selfMask().multiply(ee.Image.pixelArea()).rename('areaM2')
+  return ee.Number(area.reduceRegion(reducer=ee.Reducer.sum(),
+    geometry=geometry,
+    scale=scale,
+    maxPixels=1e13,
+    tileScale=4).get('areaM2'))
+
+
+# approximate length in meters of a polygon ring given as [lon, lat] pairs
+def perimeter_m(ring):
+  radius = 6371008.8
+  length = 0.0
+  for (lon1, lat1), (lon2, lat2) in zip(ring, ring[1:] + ring[:1]):
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    length += radius * math.hypot(x, y)
+  return length
+
+
+def tolerance_m2(perimeter, scale):
+  return perimeter * scale
+
+
+# allowed difference in m2 for each area statistic of a product
+def tolerances(product):
+  if product.__name__ == 'coastline':
+    w, n, e, s = product.bbox
+    return {'coast': tolerance_m2(perimeter_m([[w, n], [e, n], [e, s], [w, s]]), product.scale)}
+  found = {'island ' + name: tolerance_m2(perimeter_m(coords[0]), product.mPerPixel) for name, coords in product.regions}
+  found['island'] = sum(found.values())
+  return found
+
+
+# labels whose areas differ by more than the tolerance, with both values
+def check(vector, pixel, tolerances):
+  failed = {}
+  for name, allowed in tolerances.items():
+    difference = abs(vector[name] - pixel[name])
+    if difference > allowed:
+      failed[name] = {'vector': vector[name], 'pixel': pixel[name], 'tolerance': allowed}
+  return failed
+
+
+# run the product's statistics with both engines, uncached, and compare them
+def benchmark(product, window):
+  timings = {}
+  results = {}
+  for name in methods:
+    started = time.perf_counter()
+    tasks, manifest = product.exports(window, {'stats_only': True, 'stat_cache': False, 'composites': False, 'area_method': name})
+    timings[name] = round(time.perf_counter() - started, 3)
+    results[name] = {s['label']: s['area_ha'] * 10000 for s in manifest['stats'] if 'area_ha' in s}
+  return {'seconds': timings, 'failed': check(results['vector'], results['pixel'], tolerances(product))}
+
+
+if __name__ == '__main__':
+  import importlib
+  p = argparse.ArgumentParser()
+  p.add_argument('--benchmark', nargs=2, metavar=('START', 'END'), required=True)
+  p.add_argument('--product', choices=('reefislands', 'coastline'), default='reefislands')
+  args = p.parse_args(sys.argv[1:])
+  report = benchmark(importlib.import_module(args.product), tuple(args.benchmark))
+  print(json.dumps(report))
+  if report['failed']:
+    sys.exit(1)
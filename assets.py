@@ -0,0 +1,77 @@
+import contextlib
+import contextvars
+import time
+
+from session import ee
+
+# Earth Engine assets written by the runs (composites.py, models.py)
+#
+# exists() remembers the assets it has seen, and store() starts an asset
+# export at most once: not when this process already started it, nor when
+# another process has an export of the same description queued or running.
+# That last check lists the tasks, which is slow, so the list of active
+# export descriptions is fetched once per `task_list_ttl` seconds and shared
+# by every check in the process.
+#
+# while a window is built by the task monitor (taskmonitor.build), store()
+# hands its export to the window instead of starting it, so the monitor
+# starts, limits and waits for it like the product's own exports.
+
+task_list_ttl = 60
+
+# asset ids known to exist, and exports started by this process
+_known = set()
+_started = set()
+_active = {'time': None, 'descriptions': set()}
+_collected = contextvars.ContextVar('surfside_asset_exports', default=None)
+
+
+def exists(aid):
+  if aid in _known:
+    return True
+  try:
+    ee.data.getAsset(aid)
+  except ee.EEException:
+    return False
+  _known.add(aid)
+  return True
+
+
+def forget(aid):
+  _known.discard(aid)
+
+
+# descriptions of the READY and RUNNING tasks, at most task_list_ttl seconds old
+def active_descriptions():
+  now = time.time()
+  if _active['time'] is None or now - _active['time'] > task_list_ttl:
+    _active['descriptions'] = {task['description'] for task in ee.data.getTaskList() if task['state'] in ('READY', 'RUNNING')}
+    _active['time'] = now
+  return _active['descriptions']
+
+
+# the asset exports stored within the block, which are not started
+@contextlib.contextmanager
+def collect():
+  found = []
+  token = _collected.set(found)
+  try:
+    yield found
+  finally:
+    _collected.reset(token)
+
+
+# start the export of aid made by task() unless it is already under way, or
+# add it to the exports being collected; returns whether it was stored
+def store(aid, task):
+  description = aid.split('/')[-1]
+  if aid in _started or description in active_descriptions():
+    return False
+  collected = _collected.get()
+  if collected is not None:
+    collected.append(task(description))
+  else:
+    task(description).start()
+  _started.add(aid)
+  _active['descriptions'].add(description)
+  return True
@@ -0,0 +1,96 @@
+import base64
+import hashlib
+import json
+import os
+
+# the storage the exports land in: the Cloud Storage bucket, or a local
+# directory standing in for it (config['bucket_dir'] / SURFSIDE_BUCKET_DIR)
+# for offline runs and tests
+
+bucket_dir = os.environ.get('SURFSIDE_BUCKET_DIR')
+
+
+class GCSBucket:
+  def __init__(self, name):
+    from google.cloud import storage
+    self.name = name
+    self.client = storage.Client()
+    self.bucket = self.client.bucket(name)
+
+  # {object name: custom metadata} for every object under prefix
+  def list(self, prefix):
+    return {blob.name: blob.metadata or {} for blob in self.client.list_blobs(self.bucket, prefix=prefix)}
+
+  def set_metadata(self, name, metadata):
+    blob = self.bucket.blob(name)
+    blob.metadata = metadata
+    blob.patch()
+
+  # size and md5 hex digest (None for composite objects) of an object
+  def stat(self, name):
+    blob = self.bucket.get_blob(name)
+    md5 = base64.b64decode(blob.md5_hash).hex() if blob.md5_hash else None
+    return {'size': blob.size, 'md5': md5}
+
+  # bytes [start, end) of an object
+  def read(self, name, start, end):
+    return self.bucket.blob(name).download_as_bytes(start=start, end=end - 1, checksum=None)
+
+
+class LocalBucket:
+  # objects are files under root/<bucket>, their metadata is kept in
+  # root/<bucket>/.metadata/<object>.json
+  def __init__(self, name, root):
+    self.name = name
+    self.root = os.path.join(root, name)
+
+  def path(self, name):
+    return os.path.join(self.root, name)
+
+  def _metadata_path(self, name):
+    return os.path.join(self.root, '.metadata', name + '.json')
+
+  def list(self, prefix):
+    found = {}
+    for directory, dirs, files in os.walk(self.root):
+      dirs[:] = [d for d in dirs if d != '.metadata']
+      for filename in files:
+        name = os.path.relpath(os.path.join(directory, filename), self.root).replace(os.sep, '/')
+        if name.startswith(prefix):
+          found[name] = self.get_metadata(name)
+    return found
+
+  def get_metadata(self, name):
+    try:
+      with open(self._metadata_path(name)) as f:
+        return json.load(f)
+    except OSError:
+      return {}
+
+  def set_metadata(self, name, metadata):
+    path = self._metadata_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+      json.dump(metadata, f)
+
+  def stat(self, name):
+    digest = hashlib.md5()
+    with open(self.path(name), 'rb') as f:
+      for block in iter(lambda: f.read(1 << 20), b''):
+        digest.update(block)
+    return {'size': os.path.getsize(self.path(name)), 'md5': digest.hexdigest()}
+
+  def read(self, name, start, end):
+    with open(self.path(name), 'rb') as f:
+      f.seek(start)
+      return f.read(end - start)
+
+
+_opened = {}
+
+
+def get(name, config=None):
+  root = (config or {}).get('bucket_dir', bucket_dir)
+  if (name, root) not in _opened:
+    _opened[(name, root)] = LocalBucket(name, root) if root else GCSBucket(name)
+  return _opened[(name, root)]
@@ -0,0 +1,105 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+import numpy as np
+import rasterio
+from rasterio.features import geometry_mask
+from rasterio.windows import transform as window_transform
+
+import localstats
+
+# change between consecutive water/land masks
+#
+# the masks of successive windows (coastline_mask*.tif, or the reef imagery
+# with --band/--threshold turned into the same water mask) are compared pair
+# by pair, block by block. Every pair writes a change raster (0 unchanged,
+# 1 land gained, 2 land lost, 255 no data in either window) and adds its
+# gained and lost hectares, in total and per reef region with --regions
+# reefislands, to the summary JSON. Pairs run in parallel across a process
+# pool and each reads one block of rows of its two masks at a time:
+#
+#   python changedetect.py changes/ coastline_mask2023-01-01_2023-01-31.tif coastline_mask2023-02-01_2023-02-28.tif ...
+#   python changedetect.py changes/ rifS2_*.tif --band 5 --threshold 0 --regions reefislands
+
+block_rows = 256
+nodata = 255
+
+
+# 1 for water, 0 for land, masked where there is no data
+def water(src, window, band, threshold):
+  data = src.read(band, window=window, masked=True)
+  if threshold is None:
+    return data.astype(np.uint8)
+  return np.ma.array((data.data > threshold).astype(np.uint8), mask=np.ma.getmaskarray(data))
+
+
+def pair(before, after, target, band=1, threshold=None, regions=(), rows=block_rows):
+  found = {'before': os.path.basename(before), 'after': os.path.basename(after), 'change': os.path.basename(target),
+    'gained_ha': 0.0, 'lost_ha': 0.0}
+  by_region = {name: [0.0, 0.0] for name, rings in regions}
+  with rasterio.open(before) as a, rasterio.open(after) as b:
+    if (a.height, a.width, a.transform) != (b.height, b.width, b.transform):
+      raise ValueError(before + ' and ' + after + ' are not on the same grid')
+    profile = a.profile.copy()
+    profile.update(count=1, dtype='uint8', nodata=nodata, compress='deflate')
+    with rasterio.open(target, 'w', **profile) as dst:
+      for window in localstats.windows(a.height, a.width, rows):
+        x = water(a, window, band, threshold)
+        y = water(b, window, band, threshold)
+        missing = np.ma.getmaskarray(x) | np.ma.getmaskarray(y)
+        gained = ~missing & (x.data == 1) & (y.data == 0)
+        lost = ~missing & (x.data == 0) & (y.data == 1)
+        change = np.zeros(x.shape, dtype=np.uint8)
+        change[gained] = 1
+        change[lost] = 2
+        change[missing] = nodata
+        dst.write(change, 1, window=window)
+        pixel_m2 = np.broadcast_to(localstats.row_areas(a.transform, window.row_off, window.height)[:, None], x.shape)
+        found['gained_ha'] += float(pixel_m2[gained].sum()) / 10000
+        found['lost_ha'] += float(pixel_m2[lost].sum()) / 10000
+        transform = window_transform(window, a.transform)
+        for name, rings in regions:
+          inside = geometry_mask([{'type': 'Polygon', 'coordinates': rings}], x.shape, transform, invert=True)
+          by_region[name][0] += float(pixel_m2[gained & inside].sum()) / 10000
+          by_region[name][1] += float(pixel_m2[lost & inside].sum()) / 10000
+  found['gained_ha'] = round(found['gained_ha'], 4)
+  found['lost_ha'] = round(found['lost_ha'], 4)
+  if regions:
+    found['regions'] = {name: {'gained_ha': round(g, 4), 'lost_ha': round(l, 4)} for name, (g, l) in by_region.items()}
+  return found
+
+
+# every consecutive pair of masks, in the order given
+def detect(masks, out_dir, band=1, threshold=None, regions=(), workers=None, rows=block_rows):
+  os.makedirs(out_dir, exist_ok=True)
+  targets = []
+  for before, after in zip(masks, masks[1:]):
+    name = 'change_' + os.path.splitext(os.path.basename(before))[0] + '_' + os.path.splitext(os.path.basename(after))[0] + '.tif'
+    targets.append(os.path.join(out_dir, name))
+  with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+    futures = [pool.submit(pair, before, after, target, band, threshold, list(regions), rows)
+      for before, after, target in zip(masks, masks[1:], targets)]
+    summary = {'pairs': [f.result() for f in futures]}
+  with open(os.path.join(out_dir, 'summary.json'), 'w') as f:
+    json.dump(summary, f)
+  return summary
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('out_dir')
+  p.add_argument('masks', nargs='+', help='masks in window order')
+  p.add_argument('--band', type=int, default=1)
+  p.add_argument('--threshold', type=float, help='water is band > threshold, for imagery instead of masks')
+  p.add_argument('--regions', choices=('reefislands',))
+  p.add_argument('--workers', type=int)
+  p.add_argument('--block-rows', type=int, default=block_rows)
+  args = p.parse_args(sys.argv[1:])
+  if len(args.masks) < 2:
+    p.error('at least two masks are needed')
+  regions = localstats.product_regions(args.regions) if args.regions else ()
+  summary = detect(args.masks, args.out_dir, args.band, args.threshold, regions, args.workers, args.block_rows)
+  print(json.dumps({'pairs': len(summary['pairs']), 'summary': os.path.join(args.out_dir, 'summary.json')}))
@@ -1,158 +1,148 @@
-import ee
-
-import json
-from time import sleep
-import os
-
-bucket_name = 'surfsidegis'
-
-# to get arguments sent to this script
+from session import ee
+
+import areas
+import composites
+import export
+import sentinel2
+import stats
+import taskmonitor
+import vectorize
+import windows
 import sys
-start_date = None
-end_date = None
-if len(sys.argv) == 3:
-  start_date = sys.argv[1]
-  end_date = sys.argv[2]
 
-# Trigger the authentication flow.
-# ee.Authenticate()
-# Actually, use service account as login
-credentials = ee.ServiceAccountCredentials(os.environ['GOOGLE_SERVICE_ACCOUNT'], os.environ['GOOGLE_APPLICATION_CREDENTIALS'])
-
-# Initialize the library.
-ee.Initialize(credentials)
+bucket_name = 'surfsidegis'
 
 # region of interest
-roi = ee.Geometry.BBox(-70.041, 12.516, -70.029, 12.505)
+bbox = [-70.041, 12.516, -70.029, 12.505]
+
+def region():
+  return ee.Geometry.BBox(*bbox)
 
-# time period of interest
+# default time period of interest
 i_date = '2023-03-01'
 f_date = '2023-03-31'
 threshold = 0
 scale = 10
 
-if start_date != None and end_date != None:
-  i_date = start_date
-  f_date = end_date
-
 # function to add band to sentinel image
 def addNDWI(image):
   ndwi = image.normalizedDifference(['B3', 'B8']).rename('NDWI')
   ab = image.addBands(ndwi)
   return ab
 
-# imagery loading and processing
-sentinel = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') # sentinel image collection
-sentinel = sentinel.filterBounds(roi) # spatial filtration
-sentinel = sentinel.filterDate(i_date, f_date) # temporal filtration
-sentinel = sentinel.map(addNDWI) # mapping of function to add NDWI band across collection
-sentinel = sentinel.reduce(ee.Reducer.median()) # get per pixel median
-sentinelS2 = sentinel
-sentinel = sentinel.select('NDWI_median').rename('NDWI') # rename median bands
-sentinel = sentinel.clip(roi) # clip mosaic to region of interest
-
-# create mask layer with 1 for water pixels with NDWI above threshold, 0 otherwise
-waterMask = sentinel.select('NDWI').gt(threshold)
-
-# create vector layer to delineate mask boundary contour
-coastline = waterMask.reduceToVectors(reducer=None,
- geometry=roi,
- scale=10,
- geometryInNativeProjection=True)
-
-lc = coastline.filter('label == 0').union(1)
-
-coastArea = lc.first().geometry().area().divide(10000)
-# print('hectares of coast in roi:')
-# print(coastArea)
-coast_area_ha = coastArea.getInfo()
-
-# Export the vectorized coast as a shapefile
-taskSHP = ee.batch.Export.table.toCloudStorage(collection=ee.FeatureCollection(coastline),
-  description= 'coastline_shp'+i_date+'_'+f_date,
-  bucket=bucket_name,
-  fileNamePrefix=i_date+'_'+f_date+'/coastline_shp'+i_date+'_'+f_date,
-  fileFormat='SHP')
-
-taskSHP.start()
-
-# Export the water mask
-taskWM = ee.batch.Export.image.toCloudStorage(image=waterMask,
-  description= 'coastline_mask'+i_date+'_'+f_date,
-  bucket=bucket_name,
-  fileNamePrefix=i_date+'_'+f_date+'/coastline_mask'+i_date+'_'+f_date,
-  region=roi,
-  scale=10,
-  crs='EPSG:4326')
-
-taskWM.start()
-
-# Export the processed sentinel imagery
-taskS2 = ee.batch.Export.image.toCloudStorage(image=sentinelS2.toFloat(),
-  description= 'sentinelS2_'+i_date+'_'+f_date,
-  bucket=bucket_name,
-  fileNamePrefix=i_date+'_'+f_date+'/sentinelS2_'+i_date+'_'+f_date,
-  region=roi,
-  scale=10,
-  crs='EPSG:4326',
-  fileFormat='GeoTIFF')
-
-taskS2.start()
-
-taskSHP_status = {}
-taskWM_status = {}
-taskS2_status = {}
-
-file_list = []
-shape_exts = ['shp', 'shx', 'dbf', 'prj', 'cpg', 'fix']
-
-stat_list = []
-
-# shapefiles
-for ext in shape_exts:
-  file_list.append({
-    'type': 'shapefile',
-    'file_extension': ext,
-    'filename': i_date+'_'+f_date + '/coastline_shp'+i_date+'_'+f_date + '.' + ext
+# build the graph for one window, returns the unstarted export tasks and the manifest;
+# config['s2'] is the window's Sentinel-2 collection when it is shared with other products
+def exports(window, config=None):
+  config = config or {}
+  i_date, f_date = window
+  bucket = config.get('bucket', bucket_name)
+  roi = region()
+  s2 = config.get('s2')
+  if s2 is None:
+    s2 = sentinel2.collection(roi, i_date, f_date)
+
+  # imagery loading and processing
+  def median():
+    sentinel = s2.filterBounds(roi) # sentinel image collection
+    sentinel = sentinel.map(addNDWI) # mapping of function to add NDWI band across collection
+    return sentinel.reduce(ee.Reducer.median()) # get per pixel median
+
+  sentinel = composites.get('ndwi', window, roi, median, config) # stored composite when there is one
+  sentinelS2 = sentinel
+  sentinel = sentinel.select('NDWI_median').rename('NDWI') # rename median bands
+  sentinel = sentinel.clip(roi) # clip mosaic to region of interest
+
+  # create mask layer with 1 for water pixels with NDWI above threshold, 0 otherwise
+  waterMask = sentinel.select('NDWI').gt(threshold)
+
+  # create vector layer to delineate mask boundary contour
+  coastline = waterMask.reduceToVectors(reducer=None,
+   geometry=roi,
+   scale=10,
+   geometryInNativeProjection=True)
+
+  # land area from the dissolved polygons, or from summed pixel areas
+  # (config['area_method'] = 'pixel', see areas.py) so the coast is only
+  # vectorized for the shapefile export
+  if areas.method(config) == 'pixel':
+    coastArea = areas.total(waterMask.Not(), roi, scale).divide(10000)
+  else:
+    lc = coastline.filter('label == 0').union(1)
+
+    coastArea = lc.first().geometry().area().divide(10000)
+    # print('hectares of coast in roi:')
+    # print(coastArea)
+  collector = stats.Collector()
+  collector.add('coast_area_ha', coastArea)
+  values = collector.evaluate(config)
+
+  stat_list = []
+
+  stat_list.append({
+    'label': 'coast',
+    'area_ha': values['coast_area_ha']
   })
 
-# 1st tif export
-file_list.append({
-  'type': 'geotiff',
-  'file_extension': 'tif',
-  'filename': i_date+'_'+f_date + '/coastline_mask'+i_date+'_'+f_date + '.' + 'tif'
-})
-
-#2nd tif export
-file_list.append({
-  'type': 'geotiff',
-  'file_extension': 'tif',
-  'filename': i_date+'_'+f_date + '/sentinelS2_'+i_date+'_'+f_date + '.' + 'tif'
-})
-
-stat_list.append({
-  'label': 'coast',
-  'area_ha': coast_area_ha
-})
-
-jsonBody = {
-  'subject': 'coastline',
-  'location': 'surfside',
-  'window_start': i_date,
-  'window_end': f_date,
-  'files': file_list,
-  'stats': stat_list
-}
-
-while True:
-  taskSHP_status = taskSHP.status()
-  taskWM_status = taskWM.status()
-  taskS2_status = taskS2.status()
-  if taskSHP_status['state'] == 'COMPLETED' and taskWM_status['state'] == 'COMPLETED' and taskS2_status['state'] == 'COMPLETED':
-    print(json.dumps(jsonBody))
-    break
-  elif taskSHP_status['state'] == 'FAILED' or taskWM_status['state'] == 'FAILED' or taskS2_status['state'] == 'FAILED':
+  jsonBody = {
+    'subject': 'coastline',
+    'location': config.get('location', 'surfside'),
+    'window_start': i_date,
+    'window_end': f_date,
+    'files': [],
+    'stats': stat_list
+  }
+
+  # what the exports' outputs depend on, for their fingerprint (see export.py)
+  params = {'roi': bbox, 'composite': 'ndwi', 'index': ['B3', 'B8'], 'threshold': threshold, 'scale': scale}
+
+  # stat-only runs skip the imagery exports
+  if config.get('stats_only'):
+    return [], jsonBody
+
+  # Export the vectorized coast as a shapefile, unless it is vectorized
+  # locally from the mask (config['local_vectors'], see vectorize.py)
+  tasks = []
+  if not vectorize.local(config):
+    taskSHP = export.table('coastline', window, config, params, collection=ee.FeatureCollection(coastline),
+      description= 'coastline_shp'+i_date+'_'+f_date,
+      bucket=bucket,
+      fileNamePrefix=i_date+'_'+f_date+'/coastline_shp'+i_date+'_'+f_date,
+      fileFormat='SHP')
+    tasks.append(taskSHP)
+
+  # Export the water mask
+  taskWM = export.image('coastline', window, config, params, image=waterMask,
+    description= 'coastline_mask'+i_date+'_'+f_date,
+    bucket=bucket,
+    fileNamePrefix=i_date+'_'+f_date+'/coastline_mask'+i_date+'_'+f_date,
+    region=roi,
+    scale=10,
+    crs='EPSG:4326')
+
+  # Export the processed sentinel imagery
+  taskS2 = export.image('coastline', window, config, params, image=sentinelS2.toFloat(),
+    description= 'sentinelS2_'+i_date+'_'+f_date,
+    bucket=bucket,
+    fileNamePrefix=i_date+'_'+f_date+'/sentinelS2_'+i_date+'_'+f_date,
+    region=roi,
+    scale=10,
+    crs='EPSG:4326',
+    fileFormat='GeoTIFF')
+
+  tasks += [taskWM, taskS2]
+
+  # shapefiles, then the mask and imagery tifs
+  jsonBody['files'] = [f for task in tasks for f in task.files]
+
+  # exports whose outputs already exist are skipped
+  return export.pending(tasks), jsonBody
+
+# run one window and return its manifest, without touching the command line
+def run(window, config=None):
+  return taskmonitor.run_exports(exports, window, config or {})
+
+if __name__ == '__main__':
+  args = windows.parse(sys.argv[1:], (i_date, f_date))
+  if not windows.run(exports, args):
     print('at least one of the tasks failed', file=sys.stderr)
     sys.exit(1)
-  else:
-    sleep(1)
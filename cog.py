@@ -0,0 +1,115 @@
+import argparse
+import concurrent.futures
+import io
+import json
+import os
+import random
+import sys
+
+import rasterio
+from rasterio.dtypes import in_dtype_range
+from rasterio.shutil import copy
+from rasterio.windows import Window
+
+import export
+
+# cloud optimized copies of GeoTIFFs that were exported plain
+#
+# every file is rewritten with the GDAL COG driver: 512 pixel tiles,
+# internal overviews and the noData value, compression and overview
+# resampling that export.cog_settings gives its file name stem. A plain
+# export without a noData value gets the stem's, written into the pixels its
+# mask leaves out, so masked pixels no longer read as class 0; one that has
+# a noData value keeps it. Files are converted in parallel, and
+# --benchmark counts the bytes read for typical viewport requests, a full
+# resolution 256 x 256 window and the whole file rendered at 512 x 512,
+# before and after:
+#
+#   python cog.py exports/2023-03-01_2023-03-31/*.tif --out-dir cog/ --benchmark
+
+blocksize = 512
+
+
+# a copy of src with the noData value set and written where src is masked
+def with_nodata(src, path, nodata):
+  profile = src.profile.copy()
+  profile.update(driver='GTiff', nodata=nodata)
+  with rasterio.open(path, 'w', **profile) as dst:
+    for _, window in src.block_windows(1):
+      dst.write(src.read(window=window, masked=True).filled(nodata), window=window)
+  return path
+
+
+def convert(source, target):
+  settings = export.cog_options(os.path.basename(source))
+  staged = None
+  with rasterio.open(source) as src:
+    if src.nodata is None and in_dtype_range(settings['nodata'], src.dtypes[0]):
+      staged = with_nodata(src, target + '.nodata.tif', settings['nodata'])
+  try:
+    copy(staged or source, target, driver='COG',
+      blocksize=blocksize,
+      compress=settings['compress'],
+      overview_resampling=settings['resampling'])
+  finally:
+    if staged:
+      os.remove(staged)
+  return target
+
+
+def convert_all(paths, out_dir, workers=None):
+  os.makedirs(out_dir, exist_ok=True)
+  targets = [os.path.join(out_dir, os.path.basename(path)) for path in paths]
+  with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+    return list(pool.map(convert, paths, targets))
+
+
+class CountingFile(io.FileIO):
+  # a file that adds the bytes it reads to a shared counter
+  def __init__(self, path, mode, counter):
+    super().__init__(path, mode.replace('b', ''))
+    self.counter = counter
+
+  def readinto(self, buffer):
+    n = super().readinto(buffer)
+    self.counter[0] += n or 0
+    return n
+
+  def read(self, size=-1):
+    data = super().read(size)
+    self.counter[0] += len(data)
+    return data
+
+
+# bytes read for a full resolution window and for an overview of the whole file
+def viewport_bytes(path, window_size=256, overview_size=512, seed=0):
+  found = {}
+  for request in ('window', 'overview'):
+    counter = [0]
+    with rasterio.open(path, opener=lambda p, mode='rb': CountingFile(p, mode, counter)) as src:
+      if request == 'window':
+        rng = random.Random(seed)
+        col = rng.randrange(max(1, src.width - window_size))
+        row = rng.randrange(max(1, src.height - window_size))
+        src.read(window=Window(col, row, min(window_size, src.width), min(window_size, src.height)))
+      else:
+        scale = max(1, max(src.width, src.height) / overview_size)
+        src.read(out_shape=(src.count, max(1, int(src.height / scale)), max(1, int(src.width / scale))))
+    found[request] = counter[0]
+  return found
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('paths', nargs='+')
+  p.add_argument('--out-dir', required=True)
+  p.add_argument('--workers', type=int)
+  p.add_argument('--benchmark', action='store_true', help='bytes read per viewport request, before and after')
+  args = p.parse_args(sys.argv[1:])
+  targets = convert_all(args.paths, args.out_dir, args.workers)
+  for source, target in zip(args.paths, targets):
+    report = {'source': source, 'target': target}
+    if args.benchmark:
+      report['before'] = viewport_bytes(source)
+      report['after'] = viewport_bytes(target)
+    print(json.dumps(report))
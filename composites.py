@@ -0,0 +1,105 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from session import ee
+
+import assets
+
+# persisted cloud-free composites
+#
+# the masked median over the window is the most expensive node of every
+# product. With an asset folder configured (config['asset_root'] or
+# SURFSIDE_ASSET_ROOT) the first run for a (window, ROI, mask profile)
+# computes it inline as before and also exports it as an asset; later runs of
+# any product load it with ee.Image(assetId) instead. Each use stamps the
+# asset, and evict() deletes composites that have not been used for a while:
+#
+#   python composites.py --list
+#   python composites.py --evict --max-age-days 90
+
+asset_root = os.environ.get('SURFSIDE_ASSET_ROOT')
+max_age_days = float(os.environ.get('SURFSIDE_COMPOSITE_MAX_AGE_DAYS', '90'))
+used_property = 'surfside_last_used'
+
+
+def asset_id(root, profile, window, roi):
+  key = hashlib.sha256(json.dumps([profile, list(window), ee.serializer.toJSON(roi)]).encode()).hexdigest()
+  return root + '/' + profile + '_' + window[0] + '_' + window[1] + '_' + key[:12]
+
+
+def touch(aid):
+  ee.data.updateAsset(aid, {'properties': {used_property: int(time.time() * 1000)}}, ['properties.' + used_property])
+
+
+# export the composite unless it is already under way (see assets.py)
+def store(image, aid, roi, profile, window):
+  region = ee.FeatureCollection(roi).geometry()
+  assets.store(aid, lambda description: ee.batch.Export.image.toAsset(
+    image=image.toFloat().set({'surfside_profile': profile, 'window_start': window[0], 'window_end': window[1]}),
+    description=description,
+    assetId=aid,
+    region=region,
+    scale=10,
+    crs='EPSG:4326',
+    maxPixels=1e13))
+
+
+# the masked median for the window: the stored asset when there is one,
+# otherwise build() (which returns the median image) and store it for next time
+def get(profile, window, roi, build, config=None):
+  config = config or {}
+  root = config.get('asset_root', asset_root)
+  if not root or config.get('composites') is False:
+    return build()
+  aid = asset_id(root, profile, window, roi)
+  if assets.exists(aid):
+    touch(aid)
+    return ee.Image(aid)
+  image = build()
+  store(image, aid, roi, profile, window)
+  return image
+
+
+def list_composites(root):
+  found = []
+  for asset in ee.data.listAssets({'parent': root}).get('assets', []):
+    if asset.get('type') != 'IMAGE':
+      continue
+    info = ee.data.getAsset(asset['id'])
+    used = info.get('properties', {}).get(used_property)
+    found.append({'id': asset['id'], 'last_used': used / 1000 if used else None, 'updated': asset.get('updateTime')})
+  return found
+
+
+# delete composites not used for max_age_days (never used ones count from their creation)
+def evict(root, max_age_days=max_age_days):
+  cutoff = time.time() - max_age_days * 24 * 3600
+  deleted = []
+  for asset in list_composites(root):
+    last = asset['last_used']
+    if last is None and asset['updated']:
+      last = time.mktime(time.strptime(asset['updated'][:19], '%Y-%m-%dT%H:%M:%S')) - time.timezone
+    if last is not None and last < cutoff:
+      ee.data.deleteAsset(asset['id'])
+      assets.forget(asset['id'])
+      deleted.append(asset['id'])
+  return deleted
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('--root', default=asset_root, required=asset_root is None)
+  p.add_argument('--list', action='store_true')
+  p.add_argument('--evict', action='store_true')
+  p.add_argument('--max-age-days', type=float, default=max_age_days)
+  args = p.parse_args(sys.argv[1:])
+  if args.evict:
+    for aid in evict(args.root, args.max_age_days):
+      print('deleted', aid)
+  if args.list or not args.evict:
+    for asset in list_composites(args.root):
+      print(json.dumps(asset))
@@ -0,0 +1,152 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import buckets
+
+# fetches the files of a manifest from the bucket
+#
+# every object listed in `files` is downloaded concurrently from one thread
+# pool sharing the bucket client (and its pooled connections). Objects are
+# read in ranges of `chunk_size` bytes into a .part file, so an interrupted
+# transfer of a large TIFF resumes where it stopped, and the md5 of the
+# result is checked against the object's. Verified objects are kept in a
+# content-addressed cache, ~/.cache/surfside/objects/<md5> (or
+# SURFSIDE_DOWNLOAD_CACHE), and linked into place, so the same object is never
+# downloaded twice across runs. Objects with the same content (the .prj and
+# .cpg of every window, identical shards) share a cache entry, so they are
+# grouped by it and each entry is fetched by one thread only. --bucket-dir reads from a local directory
+# standing in for the bucket (buckets.LocalBucket), for tests and benchmarks:
+#
+#   python coastline.py 2023-03-01 2023-03-31 > manifest.json
+#   python downloader.py manifest.json downloads/
+#   python downloader.py manifest.json downloads/ --bucket-dir /tmp/buckets
+
+cache_dir = os.environ.get('SURFSIDE_DOWNLOAD_CACHE',
+  os.path.join(os.path.expanduser('~'), '.cache', 'surfside', 'objects'))
+chunk_size = 8 * 1024 * 1024
+max_workers = 8
+
+
+class ChecksumError(Exception):
+  pass
+
+
+def md5_file(path):
+  digest = hashlib.md5()
+  with open(path, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), b''):
+      digest.update(block)
+  return digest.hexdigest()
+
+
+def _place(cached, target):
+  os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+  if os.path.exists(target):
+    os.remove(target)
+  try:
+    os.link(cached, target)
+  except OSError:
+    shutil.copyfile(cached, target)
+
+
+class Downloader:
+  def __init__(self, bucket, cache=cache_dir, workers=max_workers, chunk=chunk_size):
+    self.bucket = bucket
+    self.cache = cache
+    self.workers = workers
+    self.chunk = chunk
+    os.makedirs(cache, exist_ok=True)
+
+  # the cache key: the object's md5, or its bucket, name and size when it has none
+  def key(self, name, info):
+    if info['md5']:
+      return info['md5']
+    return hashlib.sha256(('%s/%s/%d' % (self.bucket.name, name, info['size'])).encode()).hexdigest()
+
+  def fetch(self, name, target, info=None):
+    info = info or self.bucket.stat(name)
+    cached = os.path.join(self.cache, self.key(name, info))
+    if os.path.exists(cached):
+      _place(cached, target)
+      return {'name': name, 'bytes': 0, 'cached': True}
+    part = cached + '.part'
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    if offset > info['size']:
+      offset = 0
+      os.remove(part)
+    fetched = 0
+    with open(part, 'ab') as f:
+      while offset < info['size']:
+        data = self.bucket.read(name, offset, min(offset + self.chunk, info['size']))
+        if not data:
+          raise IOError('short read of ' + name + ' at ' + str(offset))
+        f.write(data)
+        offset += len(data)
+        fetched += len(data)
+    if info['md5'] and md5_file(part) != info['md5']:
+      os.remove(part)
+      raise ChecksumError('md5 mismatch for ' + name)
+    os.replace(part, cached)
+    _place(cached, target)
+    return {'name': name, 'bytes': fetched, 'cached': False}
+
+  # objects sharing a cache entry: the first is fetched, the others linked to it
+  def fetch_group(self, names, infos, out_dir):
+    found = [self.fetch(names[0], os.path.join(out_dir, names[0]), infos[names[0]])]
+    cached = os.path.join(self.cache, self.key(names[0], infos[names[0]]))
+    for name in names[1:]:
+      _place(cached, os.path.join(out_dir, name))
+      found.append({'name': name, 'bytes': 0, 'cached': True})
+    return found
+
+  # every object of the manifests' files, into out_dir/<object name>
+  def fetch_all(self, manifests, out_dir):
+    names = sorted({f['filename'] for m in manifests for f in m['files'] if f['type'] != 'mosaic'})
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+      infos = dict(zip(names, pool.map(self.bucket.stat, names)))
+      groups = {}
+      for name in names:
+        groups.setdefault(self.key(name, infos[name]), []).append(name)
+      results = [r for found in pool.map(lambda group: self.fetch_group(group, infos, out_dir), groups.values()) for r in found]
+    seconds = time.perf_counter() - started
+    fetched = sum(r['bytes'] for r in results)
+    return {
+      'files': len(results),
+      'cached': sum(1 for r in results if r['cached']),
+      'bytes': fetched,
+      'seconds': round(seconds, 3),
+      'mb_per_second': round(fetched / 1e6 / max(seconds, 1e-9), 3)
+    }
+
+
+# manifests from a file with one json manifest per line (the products' output) or one json document
+def read_manifests(path):
+  with open(path) as f:
+    text = f.read()
+  try:
+    found = json.loads(text)
+    return found if isinstance(found, list) else [found]
+  except ValueError:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('manifest')
+  p.add_argument('out_dir')
+  p.add_argument('--bucket', default='surfsidegis')
+  p.add_argument('--bucket-dir', help='local directory standing in for the bucket')
+  p.add_argument('--cache', default=cache_dir)
+  p.add_argument('--workers', type=int, default=max_workers)
+  p.add_argument('--chunk-mb', type=float, default=chunk_size / 1024 / 1024)
+  args = p.parse_args(sys.argv[1:])
+  config = {'bucket_dir': args.bucket_dir} if args.bucket_dir else {}
+  downloader = Downloader(buckets.get(args.bucket, config), args.cache, args.workers, int(args.chunk_mb * 1024 * 1024))
+  print(json.dumps(downloader.fetch_all(read_manifests(args.manifest), args.out_dir)))
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+
+import buckets
+from session import ee
+
+# export helpers shared by the products
+#
+# every export carries a fingerprint of its parameters: the product, the
+# window, the product's params (ROI, mask profile, thresholds, bands, model)
+# and the export options such as region, scale, crs and formatOptions. The
+# image or table graph is left out, it differs between runs that produce the
+# same output (a stored composite or registered model, the collection shared
+# by surfside.py run). Before the task is created the bucket is checked for objects under the same
+# prefix carrying that fingerprint in their metadata; if there are any the
+# export is skipped and the existing files go into the manifest. Objects are
+# stamped with the fingerprint once their task completes. config['force']
+# exports regardless.
+#
+# With config['cog'] (or SURFSIDE_COG=1) image exports are written as cloud
+# optimized GeoTIFFs, tiled with internal overviews, with the product's
+# noData value, and their manifest entries carry 'cog': True. cog.py
+# converts files that were exported before with the same settings.
+
+fingerprint_key = 'surfside-fingerprint'
+shape_exts = ['shp', 'shx', 'dbf', 'prj', 'cpg', 'fix']
+file_types = {'tif': 'geotiff', 'csv': 'csv'}
+cog = os.environ.get('SURFSIDE_COG') == '1'
+
+# noData, local compression and overview resampling of the cloud optimized
+# GeoTIFFs by file name stem: classes and masks keep exact values, imagery is
+# averaged
+cog_settings = {
+  'coastline_mask': {'nodata': 255, 'compress': 'deflate', 'resampling': 'nearest'},
+  'sentinelS2_': {'nodata': -9999, 'compress': 'deflate', 'resampling': 'average'},
+  'rifS2_': {'nodata': -9999, 'compress': 'deflate', 'resampling': 'average'},
+  'seafloorCover_': {'nodata': 255, 'compress': 'deflate', 'resampling': 'nearest'},
+  'SCsentinelS2_': {'nodata': -9999, 'compress': 'deflate', 'resampling': 'average'},
+  'SentinelMangroveExtent_Aruba_': {'nodata': 255, 'compress': 'deflate', 'resampling': 'nearest'}
+}
+
+
+def _encode(value):
+  if isinstance(value, ee.ComputedObject):
+    return json.loads(ee.serializer.toJSON(value))
+  return value
+
+
+def fingerprint(product, window, params, options):
+  payload = {
+    'product': product,
+    'window': list(window),
+    'params': params,
+    'options': {key: _encode(value) for key, value in options.items() if key not in ('image', 'collection', 'description')}
+  }
+  return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+# the manifest entries for the files an export writes
+def files(prefix, file_format):
+  if file_format == 'SHP':
+    return [{'type': 'shapefile', 'file_extension': ext, 'filename': prefix + '.' + ext} for ext in shape_exts]
+  if file_format == 'CSV':
+    return [{'type': 'csv', 'file_extension': 'csv', 'filename': prefix + '.csv'}]
+  return [{'type': 'geotiff', 'file_extension': 'tif', 'filename': prefix + '.tif'}]
+
+
+# {object name: metadata} of the objects an export with this prefix writes:
+# prefix.<ext>, or prefix-<offsets>.tif when EE splits a large image. A bare
+# prefix match would also take the shards prefix_rXXcYY of the same image
+def outputs(bucket, prefix):
+  return {name: metadata for name, metadata in bucket.list(prefix).items() if name[len(prefix):][:1] in ('.', '-')}
+
+
+def entry(name):
+  ext = name.rsplit('.', 1)[-1]
+  return {'type': file_types.get(ext, 'shapefile'), 'file_extension': ext, 'filename': name}
+
+
+class Export:
+  # an export task with its fingerprint and the files it writes, the task
+  # monitor starts it like a task and calls completed() when it finishes
+  skipped = False
+
+  def __init__(self, task, bucket, prefix, fingerprint, files, kind=None, options=None, retries=0):
+    self.task = task
+    self.bucket = bucket
+    self.prefix = prefix
+    self.fingerprint = fingerprint
+    self.files = files
+    self.kind = kind
+    self.options = options
+    self.retries = retries
+
+  @property
+  def id(self):
+    return self.task.id
+
+  # set by taskmonitor.FakeBackend when it starts the export offline
+  @id.setter
+  def id(self, value):
+    self.task.id = value
+
+  @property
+  def config(self):
+    return self.task.config
+
+  def start(self):
+    self.task.start()
+
+  def completed(self):
+    for name, metadata in outputs(self.bucket, self.prefix).items():
+      self.bucket.set_metadata(name, dict(metadata, **{fingerprint_key: self.fingerprint}))
+
+  # a fresh task for the same export while retries are left, the monitor
+  # starts it in place of this one when it fails
+  def retry(self):
+    if self.retries <= 0:
+      return None
+    task = getattr(ee.batch.Export, self.kind).toCloudStorage(**self.options)
+    return Export(task, self.bucket, self.prefix, self.fingerprint, self.files, self.kind, self.options, self.retries - 1)
+
+
+class Existing:
+  # outputs already in the bucket for the same parameters
+  skipped = True
+
+  def __init__(self, names):
+    self.files = [entry(name) for name in names]
+
+
+def _export(kind, product, window, config, params, file_format, options, retries=0):
+  fp = fingerprint(product, window, params, options)
+  bucket = buckets.get(options['bucket'], config)
+  prefix = options['fileNamePrefix']
+  if not config.get('force'):
+    found = sorted(name for name, metadata in outputs(bucket, prefix).items() if metadata.get(fingerprint_key) == fp)
+    if found:
+      return Existing(found)
+  task = getattr(ee.batch.Export, kind).toCloudStorage(**options)
+  return Export(task, bucket, prefix, fp, files(prefix, file_format), kind, options, retries)
+
+
+# the cog settings for a file name or export prefix
+def cog_options(name):
+  base = name.rsplit('/', 1)[-1]
+  for stem, settings in cog_settings.items():
+    if base.startswith(stem):
+      return settings
+  return {'nodata': -9999, 'compress': 'deflate', 'resampling': 'average'}
+
+
+# params are the product's explicit parameters that decide the output, see fingerprint()
+def image(product, window, config, params, retries=0, **options):
+  file_format = options.get('fileFormat', 'GeoTIFF')
+  if not config.get('cog', cog) or file_format != 'GeoTIFF':
+    return _export('image', product, window, config, params, file_format, options, retries)
+  settings = cog_options(options['fileNamePrefix'])
+  format_options = dict(options.get('formatOptions', {}), cloudOptimized=True, noData=settings['nodata'])
+  found = _export('image', product, window, config, params, file_format, dict(options, formatOptions=format_options), retries)
+  for f in found.files:
+    f['cog'] = True
+  return found
+
+
+def table(product, window, config, params, **options):
+  return _export('table', product, window, config, params, options.get('fileFormat', 'CSV'), options)
+
+
+# the exports that still have to run
+def pending(found):
+  return [export for export in found if not export.skipped]
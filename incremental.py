@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import localindex
+
+# incremental per-pixel composites
+#
+# instead of recomputing the median of a full year of scenes, every masked
+# scene (localindex.py output with a "date" in its sidecar) is ingested once
+# into a bounded histogram for its month: per band, `bins` equal bins over
+# [lo, hi] with uint8 counts, stored as one memory mapped
+# <state>/<YYYY-MM>.npy of (bands, bins, rows, cols), bands x bins bytes per
+# pixel and month. The approximate median for any trailing window adds up
+# the histograms of the months it covers (windows resolve to whole months)
+# and never reads the scenes again.
+#
+# error bound: the estimate is the mean of the centres of the bins holding
+# the two middle values (one for odd counts), so when those values lie in
+# [lo, hi] it is off by at most half a bin, (hi - lo) / bins / 2. Values
+# outside [lo, hi] are counted in the edge bins, so a median outside the
+# range is only known to be beyond it. Pixels with no valid value are NaN.
+# A month holds at most 255 scenes. `median --check` measures the error
+# against the exact np.nanmedian of the scenes:
+#
+#   python incremental.py init state/ --like scene.npy --range 0 4000 --bins 64
+#   python incremental.py ingest state/ scenes/*.npy
+#   python incremental.py median state/ median.npy 2022-06-01 2023-05-31 --check scenes/*.npy
+
+block_rows = 64
+
+
+def read_state(state):
+  with open(os.path.join(state, 'state.json')) as f:
+    return json.load(f)
+
+
+def write_state(state, meta):
+  path = os.path.join(state, 'state.json')
+  with open(path + '.tmp', 'w') as f:
+    json.dump(meta, f)
+  os.replace(path + '.tmp', path)
+
+
+def init(state, like, lo, hi, bins=64):
+  os.makedirs(state, exist_ok=True)
+  shape = np.load(like, mmap_mode='r').shape
+  write_state(state, {
+    'bands': localindex.read_meta(like)['bands'],
+    'rows': shape[1],
+    'cols': shape[2],
+    'lo': lo,
+    'hi': hi,
+    'bins': bins,
+    'scenes': []
+  })
+
+
+def width(meta):
+  return (meta['hi'] - meta['lo']) / meta['bins']
+
+
+def _period(state, meta, month, mode='r+'):
+  path = os.path.join(state, month + '.npy')
+  if not os.path.exists(path):
+    return np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8,
+      shape=(len(meta['bands']), meta['bins'], meta['rows'], meta['cols']))
+  return np.load(path, mmap_mode=mode)
+
+
+# bin of each value, values outside [lo, hi] go to the edge bins and NaN to -1
+def bin_index(values, meta):
+  index = np.clip(np.floor((values - meta['lo']) / width(meta)), 0, meta['bins'] - 1)
+  return np.where(np.isnan(values), -1, index).astype(np.int64)
+
+
+# add masked scenes to their months, scenes already ingested are skipped
+def ingest(state, paths):
+  meta = read_state(state)
+  added = []
+  for path in paths:
+    scene_meta = localindex.read_meta(path)
+    name = os.path.basename(path)
+    if name in meta['scenes']:
+      continue
+    if scene_meta['bands'] != meta['bands']:
+      raise ValueError(path + ' has bands ' + ','.join(scene_meta['bands']))
+    hist = _period(state, meta, scene_meta['date'][:7])
+    scene = np.load(path, mmap_mode='r')
+    for row in range(0, meta['rows'], block_rows):
+      index = bin_index(scene[:, row:row + block_rows].astype(np.float64), meta)
+      block = hist[:, :, row:row + block_rows]
+      for b in range(meta['bins']):
+        block[:, b] += (index == b)
+    hist.flush()
+    meta['scenes'].append(name)
+    added.append(name)
+    write_state(state, meta)
+  return added
+
+
+def months(state, window):
+  found = []
+  for filename in sorted(os.listdir(state)):
+    month = filename[:-len('.npy')]
+    if filename.endswith('.npy') and window[0][:7] <= month <= window[1][:7]:
+      found.append(month)
+  return found
+
+
+# approximate median of the window, written like localcomposite.py output
+def median(state, target, window):
+  meta = read_state(state)
+  periods = [_period(state, meta, month, 'r') for month in months(state, window)]
+  bands = len(meta['bands'])
+  out = np.lib.format.open_memmap(target, mode='w+', dtype=np.float32, shape=(bands, meta['rows'], meta['cols']))
+  localindex.write_meta(target, {'bands': [name + '_median' for name in meta['bands']], 'nodata': None})
+  for row in range(0, meta['rows'], block_rows):
+    rows = min(block_rows, meta['rows'] - row)
+    counts = np.zeros((bands, meta['bins'], rows, meta['cols']), dtype=np.int32)
+    for hist in periods:
+      counts += hist[:, :, row:row + rows]
+    cumulative = counts.cumsum(axis=1)
+    n = cumulative[:, -1]
+    # bin of the k-th smallest value is the number of bins whose cumulative count is <= k
+    first = (cumulative <= ((n - 1) // 2)[:, None]).sum(axis=1)
+    second = (cumulative <= (n // 2)[:, None]).sum(axis=1)
+    estimate = meta['lo'] + ((first + second) / 2 + 0.5) * width(meta)
+    out[:, row:row + rows] = np.where(n > 0, estimate, np.nan)
+  out.flush()
+  return len(periods)
+
+
+# largest error against the exact median of the window's scenes, over the
+# pixels whose exact median is inside [lo, hi]
+def check(state, target, paths, window):
+  import localcomposite
+  meta = read_state(state)
+  exact = target + '.exact.npy'
+  localcomposite.naive(localcomposite.select(paths, (window[0][:7] + '-01', window[1][:7] + '-31')), exact)
+  a = np.load(target, mmap_mode='r')
+  b = np.load(exact, mmap_mode='r')
+  worst = 0.0
+  for row in range(0, meta['rows'], block_rows):
+    x = np.asarray(a[:, row:row + block_rows], dtype=np.float64)
+    y = np.asarray(b[:, row:row + block_rows], dtype=np.float64)
+    inside = ~np.isnan(y) & (y >= meta['lo']) & (y <= meta['hi'])
+    if inside.any():
+      worst = max(worst, float(np.abs(x[inside] - y[inside]).max()))
+  os.remove(exact)
+  return {'max_error': worst, 'bound': width(meta) / 2}
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  commands = p.add_subparsers(dest='command', required=True)
+  c = commands.add_parser('init')
+  c.add_argument('state')
+  c.add_argument('--like', required=True, help='a scene with the bands and shape of the ROI')
+  c.add_argument('--range', nargs=2, type=float, metavar=('LO', 'HI'), required=True)
+  c.add_argument('--bins', type=int, default=64)
+  c = commands.add_parser('ingest')
+  c.add_argument('state')
+  c.add_argument('scenes', nargs='+')
+  c = commands.add_parser('median')
+  c.add_argument('state')
+  c.add_argument('target')
+  c.add_argument('start')
+  c.add_argument('end')
+  c.add_argument('--check', nargs='+', metavar='SCENE', help='compare with the exact median of these scenes')
+  args = p.parse_args(sys.argv[1:])
+  if args.command == 'init':
+    init(args.state, args.like, args.range[0], args.range[1], args.bins)
+  elif args.command == 'ingest':
+    print(json.dumps({'ingested': ingest(args.state, args.scenes)}))
+  else:
+    report = {'months': median(args.state, args.target, (args.start, args.end))}
+    if args.check:
+      report.update(check(args.state, args.target, args.check, (args.start, args.end)))
+    print(json.dumps(report))
+    if args.check and report['max_error'] > report['bound'] + 1e-6:
+      sys.exit(1)
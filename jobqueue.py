@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import time
+
+# SQLite backed job queue for worker.py
+#
+# a job is one product run for one window; `stats` jobs only compute the
+# statistics and are always claimed before `export` jobs, then higher
+# priority first, then oldest first
+
+schema = '''
+create table if not exists jobs (
+  id integer primary key autoincrement,
+  product text not null,
+  window_start text not null,
+  window_end text not null,
+  location text not null default 'surfside',
+  priority integer not null default 0,
+  kind text not null default 'export',
+  state text not null default 'queued',
+  manifest text,
+  error text,
+  created real,
+  started real,
+  finished real
+);
+create index if not exists jobs_next on jobs (state, kind, priority, id);
+'''
+
+KINDS = ('export', 'stats')
+
+
+class Queue:
+  def __init__(self, path):
+    self.db = sqlite3.connect(path, isolation_level=None, timeout=30)
+    self.db.row_factory = sqlite3.Row
+    self.db.executescript(schema)
+
+  def put(self, product, window, location='surfside', priority=0, kind='export'):
+    if kind not in KINDS:
+      raise ValueError('unknown job kind: ' + kind)
+    cur = self.db.execute('insert into jobs (product, window_start, window_end, location, priority, kind, created) values (?, ?, ?, ?, ?, ?, ?)',
+      (product, window[0], window[1], location, priority, kind, time.time()))
+    return cur.lastrowid
+
+  # take the next queued job of one of the kinds and mark it running, None
+  # when there is none
+  def claim(self, kinds=KINDS):
+    kinds = list(kinds)
+    self.db.execute('begin immediate')
+    try:
+      row = self.db.execute("select * from jobs where state = 'queued' and kind in (%s) order by kind = 'stats' desc, priority desc, id limit 1" % ','.join('?' * len(kinds)),
+        kinds).fetchone()
+      if row is not None:
+        self.db.execute("update jobs set state = 'running', started = ? where id = ?", (time.time(), row['id']))
+      self.db.execute('commit')
+    except BaseException:
+      self.db.execute('rollback')
+      raise
+    return dict(row) if row is not None else None
+
+  def finish(self, job_id, manifest):
+    self.db.execute("update jobs set state = 'done', manifest = ?, finished = ? where id = ?",
+      (json.dumps(manifest), time.time(), job_id))
+
+  def fail(self, job_id, error):
+    self.db.execute("update jobs set state = 'failed', error = ?, finished = ? where id = ?",
+      (error, time.time(), job_id))
+
+  # jobs left running by a worker that died go back to the queue
+  def requeue_running(self):
+    return self.db.execute("update jobs set state = 'queued', started = null where state = 'running'").rowcount
+
+  def get(self, job_id):
+    row = self.db.execute('select * from jobs where id = ?', (job_id,)).fetchone()
+    if row is None:
+      return None
+    job = dict(row)
+    if job['manifest'] is not None:
+      job['manifest'] = json.loads(job['manifest'])
+    return job
+
+  def counts(self):
+    return dict(self.db.execute('select state, count(*) from jobs group by state').fetchall())
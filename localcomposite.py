@@ -0,0 +1,117 @@
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import localindex
+
+# local median composites of masked Sentinel-2 stacks
+#
+# the local counterpart of sentinel.reduce(ee.Reducer.median()): scenes are
+# memory mapped .npy arrays of (bands, rows, cols) with their masks applied
+# (NaN), like the output of localindex.py, and a sidecar <file>.json with
+# "bands" and the scene "date". The per-pixel NaN-aware median is computed in
+# chunks of rows across a process pool, each chunk sized so the stack slice
+# stays within --memory-mb per worker, and written into a memory mapped
+# output with EE's band names (B3_median, NDWI_median, ...). Pixels masked
+# in every scene stay NaN, like masked pixels in EE:
+#
+#   python localcomposite.py median.npy scenes/*.npy --window 2022-01-01 2022-12-31
+#   python localcomposite.py median.npy scenes/*.npy --benchmark
+
+memory_mb = 256
+
+
+# the scenes whose date falls in the window (both ends included, like the products)
+def select(paths, window=None):
+  if not window:
+    return list(paths)
+  return [path for path in paths if window[0] <= localindex.read_meta(path).get('date', '')[:10] <= window[1]]
+
+
+def chunk_rows(scenes, bands, cols, budget_mb=memory_mb):
+  return max(1, int(budget_mb * 1024 * 1024 // (scenes * bands * cols * 8)))
+
+
+def _chunk(paths, target, row, rows):
+  stack = np.stack([np.load(path, mmap_mode='r')[:, row:row + rows].astype(np.float64) for path in paths])
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore', RuntimeWarning) # all-NaN pixels stay NaN
+    median = np.nanmedian(stack, axis=0)
+  out = np.load(target, mmap_mode='r+')
+  out[:, row:row + rows] = median
+  out.flush()
+
+
+def composite(paths, target, workers=None, budget_mb=memory_mb):
+  bands = localindex.read_meta(paths[0])['bands']
+  shape = np.load(paths[0], mmap_mode='r').shape
+  np.lib.format.open_memmap(target, mode='w+', dtype=np.float32, shape=shape)
+  localindex.write_meta(target, {'bands': [name + '_median' for name in bands], 'nodata': None, 'scenes': len(paths)})
+  rows = chunk_rows(len(paths), shape[0], shape[2], budget_mb)
+  with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+    futures = [pool.submit(_chunk, paths, target, row, rows) for row in range(0, shape[1], rows)]
+    for future in futures:
+      future.result()
+
+
+# the whole stack in memory and one np.nanmedian
+def naive(paths, target):
+  stack = np.stack([np.load(path) for path in paths]).astype(np.float64)
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore', RuntimeWarning)
+    np.save(target, np.nanmedian(stack, axis=0).astype(np.float32))
+
+
+def _measure(method, paths, target):
+  started = time.perf_counter()
+  if method == 'chunked':
+    composite(paths, target)
+  else:
+    naive(paths, target)
+  seconds = time.perf_counter() - started
+  self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+  return {'seconds': round(seconds, 3), 'peak_rss_mb': round(max(self_kb, children_kb) / 1024, 1)}
+
+
+# time and peak memory of both methods, each in a fresh process, and whether they agree
+def benchmark(paths, target):
+  context = multiprocessing.get_context('spawn')
+  report = {'scenes': len(paths)}
+  outputs = {'chunked': target, 'naive': target + '.naive.npy'}
+  for method, path in outputs.items():
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+      report[method] = pool.submit(_measure, method, paths, path).result()
+  a = np.load(outputs['chunked'], mmap_mode='r')
+  b = np.load(outputs['naive'], mmap_mode='r')
+  report['equal'] = bool(np.array_equal(a, b, equal_nan=True))
+  os.remove(outputs['naive'])
+  return report
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('target')
+  p.add_argument('scenes', nargs='+')
+  p.add_argument('--window', nargs=2, metavar=('START', 'END'))
+  p.add_argument('--workers', type=int)
+  p.add_argument('--memory-mb', type=float, default=memory_mb, help='stack slice per worker')
+  p.add_argument('--benchmark', action='store_true', help='compare with a naive in-memory np.nanmedian')
+  args = p.parse_args(sys.argv[1:])
+  paths = select(args.scenes, args.window)
+  if not paths:
+    print('no scenes in the window', file=sys.stderr)
+    sys.exit(1)
+  if args.benchmark:
+    print(json.dumps(benchmark(paths, args.target)))
+  else:
+    composite(paths, args.target, args.workers, args.memory_mb)
+    print(json.dumps({'scenes': len(paths), 'target': args.target}))
@@ -0,0 +1,179 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# the products' per-image preprocessing, locally
+#
+# same semantics as the Earth Engine functions, for reprocessing archived
+# scenes and tuning thresholds without spending quota:
+#
+#   coastline     addNDWI: NDWI
+#   reefislands   mask (QA60 cloud/cirrus bits, SCL 3, 8, 9, 10) and addIndex: ndwi, mndwi
+#   seafloor      mask (QA60, SCL 3, 4, 5, 8, 9, 10, B3 > 100, (B3 - B8) / (B3 + B8) > 0)
+#   mangroves     maskS2clouds (QA60, / 10000) and addIndicesS2: NDVI, NDMI, MNDWI, SR, R84, R38, GCVI
+#
+# like EE, masked pixels are NaN in every band, normalizedDifference masks
+# pixels where either input is negative, and division by zero gives 0 in
+# divide, expression and normalizedDifference (so GCVI is -1 there).
+# Scenes are .npy arrays of (bands, rows, cols) with a sidecar <file>.json
+# holding {"bands": [...], "nodata": ...} and the scene's "date", which the
+# output's sidecar keeps for localcomposite.py and incremental.py; they are
+# memory mapped and processed in blocks of rows across a process pool, every
+# worker writing its rows straight into the memory mapped output:
+#
+#   python localindex.py mangroves scene.npy indices.npy
+#   python localindex.py reefislands scene.npy out.npy --check golden.npy
+
+block_rows = 256
+cloudBitMask = 1 << 10
+cirrusBitMask = 1 << 11
+
+
+def normalized_difference(a, b):
+  nd = divide(a - b, a + b)
+  nd[(a < 0) | (b < 0)] = np.nan
+  return nd
+
+
+def divide(a, b):
+  with np.errstate(divide='ignore', invalid='ignore'):
+    out = a / b
+  out[b == 0] = 0
+  return out
+
+
+def qa_clear(qa):
+  qa = np.nan_to_num(qa).astype(np.int64)
+  return ((qa & cloudBitMask) == 0) & ((qa & cirrusBitMask) == 0)
+
+
+def scl_clear(scl, classes):
+  return ~np.isin(scl, classes)
+
+
+def masked(bands, keep):
+  return {name: np.where(keep, band, np.nan) for name, band in bands.items()}
+
+
+def coastline(bands):
+  out = dict(bands)
+  out['NDWI'] = normalized_difference(bands['B3'], bands['B8'])
+  return out
+
+
+def reefislands(bands):
+  out = dict(bands)
+  out['ndwi'] = normalized_difference(bands['B3'], bands['B8'])
+  out['mndwi'] = normalized_difference(bands['B3'], bands['B11'])
+  keep = qa_clear(bands['QA60']) & scl_clear(bands['SCL'], [3, 8, 9, 10])
+  return masked(out, keep)
+
+
+def seafloor(bands):
+  keep = qa_clear(bands['QA60']) & scl_clear(bands['SCL'], [3, 4, 5, 8, 9, 10]) & (bands['B3'] > 100)
+  ndwi_revise = divide(bands['B3'] - bands['B8'], bands['B3'] + bands['B8'])
+  return masked(bands, keep & (ndwi_revise > 0))
+
+
+def mangroves(bands):
+  keep = qa_clear(bands['QA60'])
+  img = masked({name: band / 10000 for name, band in bands.items()}, keep)
+  img['NDVI'] = normalized_difference(img['B8'], img['B4'])
+  img['NDMI'] = normalized_difference(img['B12'], img['B3'])
+  img['MNDWI'] = normalized_difference(img['B3'], img['B11'])
+  img['SR'] = divide(img['B4'], img['B3'])
+  img['R84'] = divide(img['B8'], img['B4'])
+  img['R38'] = divide(img['B3'], img['B8'])
+  img['GCVI'] = divide(img['B8'], img['B3']) - 1
+  return img
+
+
+profiles = {
+  'coastline': coastline,
+  'reefislands': reefislands,
+  'seafloor': seafloor,
+  'mangroves': mangroves
+}
+
+
+def read_meta(path):
+  with open(path + '.json') as f:
+    return json.load(f)
+
+
+def write_meta(path, meta):
+  with open(path + '.json', 'w') as f:
+    json.dump(meta, f)
+
+
+# the profile's output band names for the scene's bands
+def output_bands(profile, bands):
+  sample = {name: np.zeros((1, 1)) for name in bands}
+  return list(profiles[profile](sample))
+
+
+def _block(profile, source, target, row, rows):
+  meta = read_meta(source)
+  scene = np.load(source, mmap_mode='r')
+  data = scene[:, row:row + rows].astype(np.float64)
+  if meta.get('nodata') is not None:
+    data[data == meta['nodata']] = np.nan
+  out = profiles[profile](dict(zip(meta['bands'], data)))
+  result = np.load(target, mmap_mode='r+')
+  result[:, row:row + rows] = np.stack(list(out.values()))
+  result.flush()
+  return rows * data.shape[2]
+
+
+def process(profile, source, target, workers=None, rows=block_rows):
+  meta = read_meta(source)
+  scene = np.load(source, mmap_mode='r')
+  names = output_bands(profile, meta['bands'])
+  np.lib.format.open_memmap(target, mode='w+', dtype=np.float32, shape=(len(names),) + scene.shape[1:])
+  write_meta(target, dict(meta, bands=names, nodata=None))
+  started = time.perf_counter()
+  with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+    futures = [pool.submit(_block, profile, source, target, row, rows) for row in range(0, scene.shape[1], rows)]
+    pixels = sum(f.result() for f in futures)
+  seconds = time.perf_counter() - started
+  return {'bands': names, 'pixels': pixels, 'seconds': round(seconds, 3)}
+
+
+# compare an output with a golden array exported from EE: same band names,
+# same masked pixels and values within tolerance
+def check(target, golden, tolerance=1e-4):
+  ours = np.load(target, mmap_mode='r')
+  theirs = np.load(golden, mmap_mode='r')
+  names = read_meta(target)['bands']
+  found = {}
+  for i, name in enumerate(read_meta(golden)['bands']):
+    a = np.asarray(ours[names.index(name)], dtype=np.float64)
+    b = np.asarray(theirs[i], dtype=np.float64)
+    mask_differs = int((np.isnan(a) != np.isnan(b)).sum())
+    both = ~(np.isnan(a) | np.isnan(b))
+    values_differ = int((np.abs(a[both] - b[both]) > tolerance).sum())
+    if mask_differs or values_differ:
+      found[name] = {'mask': mask_differs, 'values': values_differ}
+  return found
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('profile', choices=sorted(profiles))
+  p.add_argument('source')
+  p.add_argument('target')
+  p.add_argument('--workers', type=int)
+  p.add_argument('--block-rows', type=int, default=block_rows)
+  p.add_argument('--check', metavar='GOLDEN', help='.npy fixture exported from EE, with its .json')
+  args = p.parse_args(sys.argv[1:])
+  report = process(args.profile, args.source, args.target, args.workers, args.block_rows)
+  if args.check:
+    report['failed'] = check(args.target, args.check)
+  print(json.dumps(report))
+  if args.check and report['failed']:
+    sys.exit(1)
@@ -0,0 +1,131 @@
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import resource
+import sys
+
+import numpy as np
+import rasterio
+from rasterio.features import geometry_mask
+from rasterio.windows import Window
+from rasterio.windows import transform as window_transform
+
+# statistics of exported GeoTIFFs without loading them whole
+#
+# blocks of rows are read by a process pool and reduced to per-class pixel
+# counts and hectares, plus hectares per class inside each region (the reef
+# island R1..R21 polygons with --regions reefislands). The exports are
+# EPSG:4326, so the area of a pixel depends only on its row: it is the
+# spherical area of the cell between the row's edge latitudes. Memory stays
+# at one block per worker, the peak RSS of the parent and of the workers is
+# reported and --max-rss-mb fails the run above a budget:
+#
+#   python localstats.py SentinelMangroveExtent_Aruba_2022-01-01_2022-12-31.tif
+#   python localstats.py rifS2_2022-06-01_2023-05-31.tif --band 5 --threshold 0 --regions reefislands
+
+block_rows = 256
+radius = 6371007.2
+
+
+# m2 of one pixel in each row of a window of a north-up EPSG:4326 raster
+def row_areas(transform, row_off, height):
+  dlon = math.radians(abs(transform.a))
+  edges = transform.f + transform.e * np.arange(row_off, row_off + height + 1)
+  sines = np.sin(np.radians(edges))
+  return radius * radius * dlon * np.abs(np.diff(sines))
+
+
+# [(name, [ring, ...])] regions of a product module
+def product_regions(name):
+  if name == 'reefislands':
+    import reefislands
+    return reefislands.regions
+  raise ValueError('no regions for ' + name)
+
+
+def _merge(total, part):
+  for key, (count, m2) in part.items():
+    found = total.setdefault(key, [0, 0.0])
+    found[0] += count
+    found[1] += m2
+
+
+# per-class [pixels, m2] of a window, in total and per region
+def _block(path, window, band, threshold, regions):
+  with rasterio.open(path) as src:
+    data = src.read(band, window=window, masked=True)
+    transform = window_transform(window, src.transform)
+    areas = row_areas(src.transform, window.row_off, window.height)
+  if threshold is not None:
+    data = np.ma.array((data.data > threshold).astype(np.int64), mask=np.ma.getmaskarray(data))
+  valid = ~np.ma.getmaskarray(data)
+  pixel_m2 = np.broadcast_to(areas[:, None], data.shape)
+
+  def reduce(keep):
+    values = data.data[keep]
+    weights = pixel_m2[keep]
+    found = {}
+    for value in np.unique(values):
+      selected = values == value
+      found[str(value.item())] = (int(selected.sum()), float(weights[selected].sum()))
+    return found
+
+  classes = reduce(valid)
+  by_region = {}
+  for name, rings in regions:
+    inside = geometry_mask([{'type': 'Polygon', 'coordinates': rings}], data.shape, transform, invert=True)
+    by_region[name] = reduce(valid & inside)
+  return classes, by_region
+
+
+def windows(height, width, rows=block_rows):
+  return [Window(0, row, width, min(rows, height - row)) for row in range(0, height, rows)]
+
+
+def peak_rss_mb():
+  return {
+    'parent': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    'workers': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+  }
+
+
+def stats(path, band=1, threshold=None, regions=(), workers=None, rows=block_rows):
+  with rasterio.open(path) as src:
+    height, width = src.height, src.width
+  classes = {}
+  by_region = {name: {} for name, rings in regions}
+  with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+    futures = [pool.submit(_block, path, window, band, threshold, list(regions)) for window in windows(height, width, rows)]
+    for future in concurrent.futures.as_completed(futures):
+      part, part_regions = future.result()
+      _merge(classes, part)
+      for name, found in part_regions.items():
+        _merge(by_region[name], found)
+
+  def table(found):
+    return {value: {'pixels': count, 'area_ha': round(m2 / 10000, 4)} for value, (count, m2) in sorted(found.items())}
+
+  report = {'classes': table(classes), 'peak_rss_mb': peak_rss_mb()}
+  if regions:
+    report['regions'] = {name: table(found) for name, found in by_region.items()}
+  return report
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('path')
+  p.add_argument('--band', type=int, default=1)
+  p.add_argument('--threshold', type=float, help='classes are band > threshold (1) and the rest (0), like the water masks')
+  p.add_argument('--regions', choices=('reefislands',))
+  p.add_argument('--workers', type=int)
+  p.add_argument('--block-rows', type=int, default=block_rows)
+  p.add_argument('--max-rss-mb', type=float, help='fail when the parent or a worker peaks above this')
+  args = p.parse_args(sys.argv[1:])
+  regions = product_regions(args.regions) if args.regions else ()
+  report = stats(args.path, args.band, args.threshold, regions, args.workers, args.block_rows)
+  print(json.dumps(report))
+  if args.max_rss_mb and max(report['peak_rss_mb'].values()) > args.max_rss_mb:
+    print('peak RSS above %.1f MB' % args.max_rss_mb, file=sys.stderr)
+    sys.exit(1)
@@ -1,455 +1,447 @@
-import ee
-
-import json
-from time import sleep
-import os
+from session import ee
+
+import composites
+import export
+import models
+import sentinel2
+import shards
+import stats
+import taskmonitor
+import tiles
+import windows
+import sys
 
 bucket_name = 'surfsidegis'
 
-# to get arguments sent to this script
-import sys
-start_date = None
-end_date = None
-if len(sys.argv) == 3:
-  start_date = sys.argv[1]
-  end_date = sys.argv[2]
-
-# Trigger the authentication flow.
-# ee.Authenticate()
-# Actually, use service account as login
-credentials = ee.ServiceAccountCredentials(os.environ['GOOGLE_SERVICE_ACCOUNT'], os.environ['GOOGLE_APPLICATION_CREDENTIALS'])
-
-# Initialize the library.
-ee.Initialize(credentials)
-
-SRTM = ee.Image("USGS/SRTMGL1_003")
-
-Mangrove = ee.FeatureCollection(
-    [ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.00970731496197, 12.489314837322848],
-              [-70.00908504418415, 12.488874889203244],
-              [-70.00818382024151, 12.49067657758724],
-              [-70.00720750060493, 12.490273295535356],
-              [-70.00667105435711, 12.490948924779829],
-              [-70.00862370251996, 12.492006886153161]]]),
-        {
-          "landcover": 1,
-          "system:index": "0"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.0353799750772, 12.515467706172474],
-              [-70.03536656403213, 12.515438902966409],
-              [-70.03525525235801, 12.515491272429603],
-              [-70.03516808056503, 12.515571135840515],
-              [-70.03520160817772, 12.515601248267721]]]),
-        {
-          "landcover": 1,
-          "system:index": "1"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.0348569443193, 12.515662782347174],
-              [-70.03479793572097, 12.515779304287227],
-              [-70.0348556032148, 12.515801561281043],
-              [-70.03492399954467, 12.51575835652661]]]),
-        {
-          "landcover": 1,
-          "system:index": "2"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03390393804013, 12.514886450507992],
-              [-70.03387309263645, 12.514954530953789],
-              [-70.03403670738636, 12.515040940724505],
-              [-70.03408230493962, 12.514991189647928]]]),
-        {
-          "landcover": 1,
-          "system:index": "3"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03449947372076, 12.515402316070073],
-              [-70.0345262958109, 12.51529234014719],
-              [-70.03435999885198, 12.51528710319732]]]),
-        {
-          "landcover": 1,
-          "system:index": "4"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03217768933843, 12.503552989045419],
-              [-70.03203285005162, 12.50333302706027],
-              [-70.0315071370847, 12.503746764924802],
-              [-70.03164661195348, 12.503924829118258]]]),
-        {
-          "landcover": 1,
-          "system:index": "5"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.0319738414533, 12.503851508582866],
-              [-70.03174317147801, 12.50401909834747],
-              [-70.03201675679753, 12.504579475833335],
-              [-70.03229034211705, 12.504490443977552]]]),
-        {
-          "landcover": 1,
-          "system:index": "6"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.032462003494, 12.504155264951148],
-              [-70.03261220719884, 12.504008623990357],
-              [-70.03232252862523, 12.503678681524283],
-              [-70.03214550283025, 12.503762476476215]]]),
-        {
-          "landcover": 1,
-          "system:index": "7"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03155005242894, 12.503448245266318],
-              [-70.03108871247838, 12.5030135581293],
-              [-70.03097605969975, 12.50309735329695],
-              [-70.03143203523229, 12.50357917498355]]]),
-        {
-          "landcover": 1,
-          "system:index": "8"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03171098496983, 12.503264943550722],
-              [-70.03180754449437, 12.50312877647781],
-              [-70.03124428060124, 12.502652191157507],
-              [-70.03112089898656, 12.50283549330781]]]),
-        {
-          "landcover": 1,
-          "system:index": "9"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03021557286024, 12.501558601926321],
-              [-70.02971131756544, 12.501951393751542],
-              [-70.02999026730299, 12.502171356912886],
-              [-70.03050525143385, 12.501804751539977]]]),
-        {
-          "landcover": 1,
-          "system:index": "10"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.02933580830336, 12.500623754980854],
-              [-70.02897907450438, 12.500775635106846],
-              [-70.02914805367232, 12.500940608246008],
-              [-70.02932776167631, 12.500872524106098],
-              [-70.02944309666395, 12.500712788168984]]]),
-        {
-          "landcover": 1,
-          "system:index": "11"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.02638564284142, 12.49771737333107],
-              [-70.02610488429467, 12.497989418783188],
-              [-70.02709193721215, 12.499063063185263],
-              [-70.02745671763817, 12.498790724539564]]]),
-        {
-          "landcover": 1,
-          "system:index": "12"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.02437091467083, 12.495687780375063],
-              [-70.02411674679941, 12.495958130396135],
-              [-70.02486776532358, 12.496764679774675],
-              [-70.02509307088083, 12.496586610647809]]]),
-        {
-          "landcover": 1,
-          "system:index": "13"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.02388275263012, 12.495331640515188],
-              [-70.02241290208995, 12.494315591748153],
-              [-70.02202666399181, 12.494420339228315],
-              [-70.02333558199108, 12.495729679149852],
-              [-70.02389348146617, 12.495404963467625]]]),
-        {
-          "landcover": 1,
-          "system:index": "14"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.01948391142682, 12.49128888188913],
-              [-70.01917277518109, 12.491634552458489],
-              [-70.02136145773724, 12.493991384934967],
-              [-70.02174769583539, 12.49369809139701]]]),
-        {
-          "landcover": 1,
-          "system:index": "15"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.0027031575844, 12.487068992765918],
-              [-70.00327178589556, 12.485832934666062],
-              [-70.00231691948626, 12.485455831019365],
-              [-70.00172683350299, 12.485434880800662],
-              [-70.00152298561785, 12.4859376855815],
-              [-70.00217744461749, 12.486440489385263]]]),
-        {
-          "landcover": 1,
-          "system:index": "16"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.98862272203722, 12.47318293223302],
-              [-69.988762196906, 12.472926279770386],
-              [-69.98811310232439, 12.472722005179609],
-              [-69.98803800047197, 12.47292104196238]]]),
-        {
-          "landcover": 1,
-          "system:index": "17"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.98713677824297, 12.472051564365046],
-              [-69.98712604940691, 12.471863002573299],
-              [-69.98686855734148, 12.471595873133374],
-              [-69.98667543829241, 12.471836813424693],
-              [-69.98753374517717, 12.472659151426953],
-              [-69.98774832189837, 12.472549157323126]]]),
-        {
-          "landcover": 1,
-          "system:index": "18"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.98757929238623, 12.477980478163792],
-              [-69.98761147889441, 12.477823346944172],
-              [-69.98652786645239, 12.477404329892288],
-              [-69.98637229832953, 12.47729433780381],
-              [-69.98601824673956, 12.477158157058101],
-              [-69.98595923814123, 12.47737290358606],
-              [-69.9862220946247, 12.477613838502991],
-              [-69.98680681618994, 12.477713355033693]]]),
-        {
-          "landcover": 1,
-          "system:index": "19"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.98990728884948, 12.47946157507232],
-              [-69.98968734771026, 12.479527046011125],
-              [-69.98945667773498, 12.479867494626108],
-              [-69.98948349982513, 12.480042956429765],
-              [-69.989821458161, 12.48021841811448],
-              [-69.98988046675933, 12.480100570727409],
-              [-69.98966589003814, 12.479935584295385]]]),
-        {
-          "landcover": 1,
-          "system:index": "20"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.96870278228242, 12.463652229751656],
-              [-69.96905683387239, 12.463222713771385],
-              [-69.96801613677461, 12.46277224502751],
-              [-69.96765135634858, 12.463201761754142]]]),
-        {
-          "landcover": 1,
-          "system:index": "21"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.96355070784475, 12.459744143007757],
-              [-69.96329321577932, 12.459199382700357],
-              [-69.96245636656667, 12.45885366883478],
-              [-69.96198429778005, 12.459587000728828],
-              [-69.96288552000905, 12.459838428329379],
-              [-69.96459140494252, 12.461022230005778],
-              [-69.96476306631948, 12.46081270797882]]]),
-        {
-          "landcover": 1,
-          "system:index": "22"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.96189846709157, 12.45937747754215],
-              [-69.96229543402578, 12.458769859343427],
-              [-69.96196284010793, 12.45857081169287],
-              [-69.96145858481313, 12.458696526016249],
-              [-69.96034278586293, 12.45735557009172],
-              [-69.95945229246999, 12.458162239721013]]]),
-        {
-          "landcover": 1,
-          "system:index": "23"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.9601389379778, 12.457198426365457],
-              [-69.96033205702687, 12.456140322796434],
-              [-69.95939864828969, 12.455427933803792],
-              [-69.95786442473317, 12.456266038297917],
-              [-69.95901241019155, 12.457942239161842]]]),
-        {
-          "landcover": 1,
-          "system:index": "24"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.95837582092119, 12.454851022903235],
-              [-69.95691669921709, 12.454411015981258],
-              [-69.95687378387285, 12.455186265771424],
-              [-69.95768917541338, 12.455898655427758],
-              [-69.95859039764238, 12.455437697638231]]]),
-        {
-          "landcover": 1,
-          "system:index": "25"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.97242004058901, 12.481087993238079],
-              [-69.97280627868716, 12.480155691129955],
-              [-69.97030645988528, 12.480134740482208],
-              [-69.96985584877078, 12.480857536849607]]]),
-        {
-          "landcover": 1,
-          "system:index": "26"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.97168511531893, 12.478427256990843],
-              [-69.97130960605685, 12.478490109343536],
-              [-69.97141152999941, 12.479689538816753],
-              [-69.97181922576968, 12.47965811278791]]]),
-        {
-          "landcover": 1,
-          "system:index": "27"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.97245759151522, 12.477673027568423],
-              [-69.97272581241671, 12.47720163306371],
-              [-69.97290820262972, 12.476510252904443],
-              [-69.97285455844943, 12.476017905302044],
-              [-69.97268289707247, 12.476017905302044],
-              [-69.97271508358065, 12.476290267921172],
-              [-69.97267216823641, 12.476573105722474],
-              [-69.97245759151522, 12.477227821669816],
-              [-69.97224301479403, 12.477479232153692],
-              [-69.97163683555667, 12.477966339271548],
-              [-69.971878234368, 12.47818108512922]]]),
-        {
-          "landcover": 1,
-          "system:index": "28"
-        })])
-
-NonMangrove = ee.FeatureCollection(
-    [ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03671663037285, 12.515005127981798],
-              [-70.03523605099663, 12.516241046556585],
-              [-70.03655569783196, 12.51748743302393],
-              [-70.0380577348803, 12.516408628280596]]]),
-        {
-          "landcover": 0,
-          "system:index": "0"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.03381188298339, 12.508841050009346],
-              [-70.03145153905028, 12.510810184837855],
-              [-70.03443415547484, 12.514559878783437],
-              [-70.03735239888304, 12.512465084410305]]]),
-        {
-          "landcover": 0,
-          "system:index": "1"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.99805502494439, 12.483094683561244],
-              [-69.99863439179269, 12.480811069921913],
-              [-69.99887041648492, 12.480182560325844],
-              [-69.99831251341573, 12.479910208218563],
-              [-69.99629549583062, 12.47888361709417],
-              [-69.99494366248712, 12.482130962952331]]]),
-        {
-          "landcover": 0,
-          "system:index": "2"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.89566442067482, 12.419244490176723],
-              [-69.89480611379005, 12.42213634203198],
-              [-69.89806767995216, 12.424567149156204],
-              [-69.89884015614845, 12.421633413583782]]]),
-        {
-          "landcover": 0,
-          "system:index": "3"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.0399761404729, 12.516695468730221],
-              [-70.03830244204761, 12.51811990740766],
-              [-70.0433449949956, 12.522078967726642],
-              [-70.0469284262395, 12.521115392501827]]]),
-        {
-          "landcover": 0,
-          "system:index": "4"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.05348167596101, 12.52374470808388],
-              [-70.05043468652009, 12.521000621670986],
-              [-70.04773101983308, 12.524394067772905],
-              [-70.04964075265168, 12.52655160596711]]]),
-        {
-          "landcover": 0,
-          "system:index": "5"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.98747874682294, 12.501311005098941],
-              [-69.98833705370771, 12.48471891748726],
-              [-69.93992854540693, 12.486394934261224],
-              [-69.94387675707685, 12.509858028521709]]]),
-        {
-          "landcover": 0,
-          "system:index": "6"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-69.9217324394499, 12.459074508048971],
-              [-69.89787150805341, 12.475165414633638],
-              [-69.92997218554365, 12.496618401430144],
-              [-69.94816829150068, 12.471813224829958]]]),
-        {
-          "landcover": 0,
-          "system:index": "7"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.00276005834993, 12.501312574333873],
-              [-69.97426426977572, 12.531477276080388],
-              [-70.01614964575228, 12.564654371175223],
-              [-70.03812230200228, 12.534158412210905]]]),
-        {
-          "landcover": 0,
-          "system:index": "8"
-        }),
-    ee.Feature(
-        ee.Geometry.Polygon(
-            [[[-70.04322098850915, 12.550588678924465],
-              [-70.04988926132701, 12.539561524707254],
-              [-70.03941791733287, 12.533864196543567],
-              [-70.03169315536998, 12.545426289728876]]]),
-        {
-          "landcover": 0,
-          "system:index": "9"
-        })])
-
-Coast = ee.Geometry.Polygon(
+# mangrove and non-mangrove training polygons
+def trainingPolygons():
+  Mangrove = ee.FeatureCollection(
+      [ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.00970731496197, 12.489314837322848],
+                [-70.00908504418415, 12.488874889203244],
+                [-70.00818382024151, 12.49067657758724],
+                [-70.00720750060493, 12.490273295535356],
+                [-70.00667105435711, 12.490948924779829],
+                [-70.00862370251996, 12.492006886153161]]]),
+          {
+            "landcover": 1,
+            "system:index": "0"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.0353799750772, 12.515467706172474],
+                [-70.03536656403213, 12.515438902966409],
+                [-70.03525525235801, 12.515491272429603],
+                [-70.03516808056503, 12.515571135840515],
+                [-70.03520160817772, 12.515601248267721]]]),
+          {
+            "landcover": 1,
+            "system:index": "1"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.0348569443193, 12.515662782347174],
+                [-70.03479793572097, 12.515779304287227],
+                [-70.0348556032148, 12.515801561281043],
+                [-70.03492399954467, 12.51575835652661]]]),
+          {
+            "landcover": 1,
+            "system:index": "2"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03390393804013, 12.514886450507992],
+                [-70.03387309263645, 12.514954530953789],
+                [-70.03403670738636, 12.515040940724505],
+                [-70.03408230493962, 12.514991189647928]]]),
+          {
+            "landcover": 1,
+            "system:index": "3"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03449947372076, 12.515402316070073],
+                [-70.0345262958109, 12.51529234014719],
+                [-70.03435999885198, 12.51528710319732]]]),
+          {
+            "landcover": 1,
+            "system:index": "4"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03217768933843, 12.503552989045419],
+                [-70.03203285005162, 12.50333302706027],
+                [-70.0315071370847, 12.503746764924802],
+                [-70.03164661195348, 12.503924829118258]]]),
+          {
+            "landcover": 1,
+            "system:index": "5"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.0319738414533, 12.503851508582866],
+                [-70.03174317147801, 12.50401909834747],
+                [-70.03201675679753, 12.504579475833335],
+                [-70.03229034211705, 12.504490443977552]]]),
+          {
+            "landcover": 1,
+            "system:index": "6"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.032462003494, 12.504155264951148],
+                [-70.03261220719884, 12.504008623990357],
+                [-70.03232252862523, 12.503678681524283],
+                [-70.03214550283025, 12.503762476476215]]]),
+          {
+            "landcover": 1,
+            "system:index": "7"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03155005242894, 12.503448245266318],
+                [-70.03108871247838, 12.5030135581293],
+                [-70.03097605969975, 12.50309735329695],
+                [-70.03143203523229, 12.50357917498355]]]),
+          {
+            "landcover": 1,
+            "system:index": "8"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03171098496983, 12.503264943550722],
+                [-70.03180754449437, 12.50312877647781],
+                [-70.03124428060124, 12.502652191157507],
+                [-70.03112089898656, 12.50283549330781]]]),
+          {
+            "landcover": 1,
+            "system:index": "9"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03021557286024, 12.501558601926321],
+                [-70.02971131756544, 12.501951393751542],
+                [-70.02999026730299, 12.502171356912886],
+                [-70.03050525143385, 12.501804751539977]]]),
+          {
+            "landcover": 1,
+            "system:index": "10"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.02933580830336, 12.500623754980854],
+                [-70.02897907450438, 12.500775635106846],
+                [-70.02914805367232, 12.500940608246008],
+                [-70.02932776167631, 12.500872524106098],
+                [-70.02944309666395, 12.500712788168984]]]),
+          {
+            "landcover": 1,
+            "system:index": "11"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.02638564284142, 12.49771737333107],
+                [-70.02610488429467, 12.497989418783188],
+                [-70.02709193721215, 12.499063063185263],
+                [-70.02745671763817, 12.498790724539564]]]),
+          {
+            "landcover": 1,
+            "system:index": "12"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.02437091467083, 12.495687780375063],
+                [-70.02411674679941, 12.495958130396135],
+                [-70.02486776532358, 12.496764679774675],
+                [-70.02509307088083, 12.496586610647809]]]),
+          {
+            "landcover": 1,
+            "system:index": "13"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.02388275263012, 12.495331640515188],
+                [-70.02241290208995, 12.494315591748153],
+                [-70.02202666399181, 12.494420339228315],
+                [-70.02333558199108, 12.495729679149852],
+                [-70.02389348146617, 12.495404963467625]]]),
+          {
+            "landcover": 1,
+            "system:index": "14"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.01948391142682, 12.49128888188913],
+                [-70.01917277518109, 12.491634552458489],
+                [-70.02136145773724, 12.493991384934967],
+                [-70.02174769583539, 12.49369809139701]]]),
+          {
+            "landcover": 1,
+            "system:index": "15"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.0027031575844, 12.487068992765918],
+                [-70.00327178589556, 12.485832934666062],
+                [-70.00231691948626, 12.485455831019365],
+                [-70.00172683350299, 12.485434880800662],
+                [-70.00152298561785, 12.4859376855815],
+                [-70.00217744461749, 12.486440489385263]]]),
+          {
+            "landcover": 1,
+            "system:index": "16"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.98862272203722, 12.47318293223302],
+                [-69.988762196906, 12.472926279770386],
+                [-69.98811310232439, 12.472722005179609],
+                [-69.98803800047197, 12.47292104196238]]]),
+          {
+            "landcover": 1,
+            "system:index": "17"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.98713677824297, 12.472051564365046],
+                [-69.98712604940691, 12.471863002573299],
+                [-69.98686855734148, 12.471595873133374],
+                [-69.98667543829241, 12.471836813424693],
+                [-69.98753374517717, 12.472659151426953],
+                [-69.98774832189837, 12.472549157323126]]]),
+          {
+            "landcover": 1,
+            "system:index": "18"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.98757929238623, 12.477980478163792],
+                [-69.98761147889441, 12.477823346944172],
+                [-69.98652786645239, 12.477404329892288],
+                [-69.98637229832953, 12.47729433780381],
+                [-69.98601824673956, 12.477158157058101],
+                [-69.98595923814123, 12.47737290358606],
+                [-69.9862220946247, 12.477613838502991],
+                [-69.98680681618994, 12.477713355033693]]]),
+          {
+            "landcover": 1,
+            "system:index": "19"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.98990728884948, 12.47946157507232],
+                [-69.98968734771026, 12.479527046011125],
+                [-69.98945667773498, 12.479867494626108],
+                [-69.98948349982513, 12.480042956429765],
+                [-69.989821458161, 12.48021841811448],
+                [-69.98988046675933, 12.480100570727409],
+                [-69.98966589003814, 12.479935584295385]]]),
+          {
+            "landcover": 1,
+            "system:index": "20"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.96870278228242, 12.463652229751656],
+                [-69.96905683387239, 12.463222713771385],
+                [-69.96801613677461, 12.46277224502751],
+                [-69.96765135634858, 12.463201761754142]]]),
+          {
+            "landcover": 1,
+            "system:index": "21"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.96355070784475, 12.459744143007757],
+                [-69.96329321577932, 12.459199382700357],
+                [-69.96245636656667, 12.45885366883478],
+                [-69.96198429778005, 12.459587000728828],
+                [-69.96288552000905, 12.459838428329379],
+                [-69.96459140494252, 12.461022230005778],
+                [-69.96476306631948, 12.46081270797882]]]),
+          {
+            "landcover": 1,
+            "system:index": "22"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.96189846709157, 12.45937747754215],
+                [-69.96229543402578, 12.458769859343427],
+                [-69.96196284010793, 12.45857081169287],
+                [-69.96145858481313, 12.458696526016249],
+                [-69.96034278586293, 12.45735557009172],
+                [-69.95945229246999, 12.458162239721013]]]),
+          {
+            "landcover": 1,
+            "system:index": "23"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.9601389379778, 12.457198426365457],
+                [-69.96033205702687, 12.456140322796434],
+                [-69.95939864828969, 12.455427933803792],
+                [-69.95786442473317, 12.456266038297917],
+                [-69.95901241019155, 12.457942239161842]]]),
+          {
+            "landcover": 1,
+            "system:index": "24"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.95837582092119, 12.454851022903235],
+                [-69.95691669921709, 12.454411015981258],
+                [-69.95687378387285, 12.455186265771424],
+                [-69.95768917541338, 12.455898655427758],
+                [-69.95859039764238, 12.455437697638231]]]),
+          {
+            "landcover": 1,
+            "system:index": "25"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.97242004058901, 12.481087993238079],
+                [-69.97280627868716, 12.480155691129955],
+                [-69.97030645988528, 12.480134740482208],
+                [-69.96985584877078, 12.480857536849607]]]),
+          {
+            "landcover": 1,
+            "system:index": "26"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.97168511531893, 12.478427256990843],
+                [-69.97130960605685, 12.478490109343536],
+                [-69.97141152999941, 12.479689538816753],
+                [-69.97181922576968, 12.47965811278791]]]),
+          {
+            "landcover": 1,
+            "system:index": "27"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.97245759151522, 12.477673027568423],
+                [-69.97272581241671, 12.47720163306371],
+                [-69.97290820262972, 12.476510252904443],
+                [-69.97285455844943, 12.476017905302044],
+                [-69.97268289707247, 12.476017905302044],
+                [-69.97271508358065, 12.476290267921172],
+                [-69.97267216823641, 12.476573105722474],
+                [-69.97245759151522, 12.477227821669816],
+                [-69.97224301479403, 12.477479232153692],
+                [-69.97163683555667, 12.477966339271548],
+                [-69.971878234368, 12.47818108512922]]]),
+          {
+            "landcover": 1,
+            "system:index": "28"
+          })])
+
+  NonMangrove = ee.FeatureCollection(
+      [ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03671663037285, 12.515005127981798],
+                [-70.03523605099663, 12.516241046556585],
+                [-70.03655569783196, 12.51748743302393],
+                [-70.0380577348803, 12.516408628280596]]]),
+          {
+            "landcover": 0,
+            "system:index": "0"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.03381188298339, 12.508841050009346],
+                [-70.03145153905028, 12.510810184837855],
+                [-70.03443415547484, 12.514559878783437],
+                [-70.03735239888304, 12.512465084410305]]]),
+          {
+            "landcover": 0,
+            "system:index": "1"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.99805502494439, 12.483094683561244],
+                [-69.99863439179269, 12.480811069921913],
+                [-69.99887041648492, 12.480182560325844],
+                [-69.99831251341573, 12.479910208218563],
+                [-69.99629549583062, 12.47888361709417],
+                [-69.99494366248712, 12.482130962952331]]]),
+          {
+            "landcover": 0,
+            "system:index": "2"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.89566442067482, 12.419244490176723],
+                [-69.89480611379005, 12.42213634203198],
+                [-69.89806767995216, 12.424567149156204],
+                [-69.89884015614845, 12.421633413583782]]]),
+          {
+            "landcover": 0,
+            "system:index": "3"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.0399761404729, 12.516695468730221],
+                [-70.03830244204761, 12.51811990740766],
+                [-70.0433449949956, 12.522078967726642],
+                [-70.0469284262395, 12.521115392501827]]]),
+          {
+            "landcover": 0,
+            "system:index": "4"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.05348167596101, 12.52374470808388],
+                [-70.05043468652009, 12.521000621670986],
+                [-70.04773101983308, 12.524394067772905],
+                [-70.04964075265168, 12.52655160596711]]]),
+          {
+            "landcover": 0,
+            "system:index": "5"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.98747874682294, 12.501311005098941],
+                [-69.98833705370771, 12.48471891748726],
+                [-69.93992854540693, 12.486394934261224],
+                [-69.94387675707685, 12.509858028521709]]]),
+          {
+            "landcover": 0,
+            "system:index": "6"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-69.9217324394499, 12.459074508048971],
+                [-69.89787150805341, 12.475165414633638],
+                [-69.92997218554365, 12.496618401430144],
+                [-69.94816829150068, 12.471813224829958]]]),
+          {
+            "landcover": 0,
+            "system:index": "7"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.00276005834993, 12.501312574333873],
+                [-69.97426426977572, 12.531477276080388],
+                [-70.01614964575228, 12.564654371175223],
+                [-70.03812230200228, 12.534158412210905]]]),
+          {
+            "landcover": 0,
+            "system:index": "8"
+          }),
+      ee.Feature(
+          ee.Geometry.Polygon(
+              [[[-70.04322098850915, 12.550588678924465],
+                [-70.04988926132701, 12.539561524707254],
+                [-70.03941791733287, 12.533864196543567],
+                [-70.03169315536998, 12.545426289728876]]]),
+          {
+            "landcover": 0,
+            "system:index": "9"
+          })])
+  return Mangrove.merge(NonMangrove)
+
+coast_coords = (
         [[[-70.05011458873312, 12.53310615311535],
           [-70.0337209272341, 12.522046241725752],
           [-70.01500983714621, 12.502187483824548],
@@ -542,7 +534,7 @@ Coast = ee.Geometry.Polygon(
           [-70.04664084439504, 12.557722360828263],
           [-70.05676886563528, 12.54255820454302]]])
 
-Aruba = ee.Geometry.Polygon(
+aruba_coords = (
         [[[-70.06916900157492, 12.541987253564153],
           [-70.06436248302023, 12.531262867496329],
           [-70.04925628184836, 12.511823780744288],
@@ -583,21 +575,14 @@ Aruba = ee.Geometry.Polygon(
 # Objective: This code works through a tutorial for mapping mangrove extent in surfside in 2009 and 2019
 #=====================================================================================================================
 
-# adding Sentinel 2
-
-S2 = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED');
-
-# dates
+# default dates
 i_date = '2022-01-01';
 f_date = '2022-12-31';
 
-if start_date != None and end_date != None:
-  i_date = start_date
-  f_date = end_date
-
 # 1 - ROI AND MAP SETUP
 
-ROI = Aruba;
+def region():
+  return ee.Geometry.Polygon(aruba_coords)
 
 # 2 - SENTINEL PREPROCESSING
 
@@ -629,150 +614,214 @@ def addIndicesS2(img):
   banded = img.addBands(ndvi).addBands(ndmi).addBands(mndwi).addBands(sr).addBands(ratio84).addBands(ratio38).addBands(gcvi)
   return banded
 
-# filter and mask sentinel imagery
-S2 = S2.filterDate(i_date,f_date).map(maskS2clouds).map(addIndicesS2)
-
-# sentinel composite (per pixel, per-band using .median() OR with quality bands like .qualityMosaic('NDVI')
-composite = S2.median().clip(ROI);
-
-# mask to low elevation and high NDVI and MNDWI areas
-srtmClip = SRTM.clip(ROI); # Clip SRTM data to region
-elevationMask = srtmClip.lt(30); # less than 65 meters
-NDVIMask = composite.select('NDVI').gt(0.25); # NDVI mask > 0.25
-MNDWIMask = composite.select('MNDWI').gt(-0.50); # MNDWI mask > -0.5
-
-# apply the masks
-compositeNew = composite.updateMask(NDVIMask).updateMask(MNDWIMask).updateMask(elevationMask)
-
-#======================================
-# 3 - RANDOM FOREST MODEL CONSTRUCTION
-
-# training data and predictors
-classes = Mangrove.merge(NonMangrove) # merge training polygons
-bands = ['B8','B11','B4','NDVI','NDMI','MNDWI','SR','GCVI'] # define bands to include
-image = compositeNew.select(bands).clip(ROI) # clip to bands and geometry
-
-#Assemble samples for the model
-samples = image.sampleRegions(collection=classes, # Set of geometries selected for training
-    properties=['landcover'], # Label from each geometry
-    scale=10, # Make each sample the same size as Sentinel pixel
-    tileScale=16).randomColumn('random') # creates a column with random numbers
-
-# split samples into training and testing data
-split = 0.8; # Roughly 80% for training, 20% for testing.
-training = samples.filter(ee.Filter.lt('random', split)); #Subset training data
-testing = samples.filter(ee.Filter.gte('random', split)); #Subset testing data
-
-#.smileRandomForest is used to run the model using 100 trees and 5 randomly selected predictors per split ("(100,5)")
-classifier = ee.Classifier.smileRandomForest(100,5).train(features=training.select(['B8','B11','B4','NDVI','NDMI','MNDWI','SR','GCVI', 'landcover']), #Train using bands and landcover property
-    classProperty='landcover', #Pull the landcover property from classes
-    inputProperties=bands)
-
-# test the model accuracy
-validation = testing.classify(classifier);
-testAccuracy = validation.errorMatrix('landcover', 'classification');
-
-# classify the sentinel composite using the RF model
-classifiedrf = image.select(bands).classify(classifier); # select predictor bands and .classify applies the Random Forest
-
-#To reduce noise, create a mask to mask unconnected pixels
-#pixelcount = classifiedrf.connectedPixelCount(100, false); #Create an image that shows the number of pixels each pixel is connected to
-#countmask = pixelcount.select(0).gt(25); #filter out all pixels connected to 4 or less
-
-#Mask to only display mangrove extent
-classMask = classifiedrf.select('classification').gt(0);
-classed= classifiedrf.updateMask(classMask);
-#classed= classifiedrf.updateMask(countmask).updateMask(classMask);
-
-
-#Use reduceRegion with a Sum reducer to calculate total area
-area1 = classed.reduceRegion(reducer=ee.Reducer.sum(),
-    geometry=ROI,
+# the masked composite for a window, the stored composite when there is one
+def composite(window, ROI, s2, config):
+  SRTM = ee.Image("USGS/SRTMGL1_003")
+
+  # filter and mask sentinel imagery
+  def median():
+    S2 = s2.filterBounds(ROI).map(maskS2clouds).map(addIndicesS2)
+    return S2.median()
+
+  # sentinel composite (per pixel, per-band using .median() OR with quality bands like .qualityMosaic('NDVI')
+  # the stored composite is used when there is one
+  composite = composites.get('s2clouds_indices', window, ROI, median, config).clip(ROI);
+
+  # mask to low elevation and high NDVI and MNDWI areas
+  srtmClip = SRTM.clip(ROI); # Clip SRTM data to region
+  elevationMask = srtmClip.lt(30); # less than 65 meters
+  NDVIMask = composite.select('NDVI').gt(0.25); # NDVI mask > 0.25
+  MNDWIMask = composite.select('MNDWI').gt(-0.50); # MNDWI mask > -0.5
+
+  # apply the masks
+  return composite.updateMask(NDVIMask).updateMask(MNDWIMask).updateMask(elevationMask)
+
+# build the graph for one window, returns the unstarted export tasks and the manifest;
+# config['s2'] is the window's Sentinel-2 collection when it is shared with other products
+def exports(window, config=None):
+  config = config or {}
+  i_date, f_date = window
+  bucket = config.get('bucket', bucket_name)
+  ROI = region()
+  s2 = config.get('s2')
+  if s2 is None:
+    s2 = sentinel2.collection(ROI, i_date, f_date)
+
+  compositeNew = composite(window, ROI, s2, config)
+
+  #======================================
+  # 3 - RANDOM FOREST MODEL CONSTRUCTION
+
+  # training data and predictors
+  classes = trainingPolygons() # merge training polygons
+  bands = ['B8','B11','B4','NDVI','NDMI','MNDWI','SR','GCVI'] # define bands to include
+  image = compositeNew.select(bands).clip(ROI) # clip to bands and geometry
+
+  # the composite the model is trained and tested on, a fixed window when
+  # config['training_window'] is set so windows share one model
+  trainWindow = models.training_window(config, window)
+  trainImage = image
+  if trainWindow != tuple(window):
+    trainImage = composite(trainWindow, ROI, sentinel2.collection(ROI, *trainWindow), config).select(bands).clip(ROI)
+
+  #Assemble samples for the model
+  samples = trainImage.sampleRegions(collection=classes, # Set of geometries selected for training
+      properties=['landcover'], # Label from each geometry
+      scale=10, # Make each sample the same size as Sentinel pixel
+      tileScale=16).randomColumn('random') # creates a column with random numbers
+
+  # split samples into training and testing data
+  split = 0.8; # Roughly 80% for training, 20% for testing.
+  training = samples.filter(ee.Filter.lt('random', split)); #Subset training data
+  testing = samples.filter(ee.Filter.gte('random', split)); #Subset testing data
+
+  #.smileRandomForest is used to run the model using 100 trees and 5 randomly selected predictors per split ("(100,5)")
+  def train():
+    return ee.Classifier.smileRandomForest(100,5).train(features=training.select(['B8','B11','B4','NDVI','NDMI','MNDWI','SR','GCVI', 'landcover']), #Train using bands and landcover property
+        classProperty='landcover', #Pull the landcover property from classes
+        inputProperties=bands)
+
+  # registered classifier when the training data has not changed (see models.py)
+  spec = {
+    'params': [100, 5],
+    'bands': bands,
+    'label': 'landcover',
+    'polygons': classes,
+    'split': split,
+    'composite': 's2clouds_indices',
+    'training_window': list(trainWindow),
+    'roi': ROI
+  }
+  classifier = models.get('mangrove_rf', spec, train, config)
+
+  # test the model accuracy
+  validation = testing.classify(classifier);
+  testAccuracy = validation.errorMatrix('landcover', 'classification');
+
+  # classify the sentinel composite using the RF model
+  classifiedrf = image.select(bands).classify(classifier); # select predictor bands and .classify applies the Random Forest
+
+  #To reduce noise, create a mask to mask unconnected pixels
+  #pixelcount = classifiedrf.connectedPixelCount(100, false); #Create an image that shows the number of pixels each pixel is connected to
+  #countmask = pixelcount.select(0).gt(25); #filter out all pixels connected to 4 or less
+
+  #Mask to only display mangrove extent
+  classMask = classifiedrf.select('classification').gt(0);
+  classed= classifiedrf.updateMask(classMask);
+  #classed= classifiedrf.updateMask(countmask).updateMask(classMask);
+
+  #Use reduceRegion with a Sum reducer to calculate total area
+  area1 = classed.reduceRegion(reducer=ee.Reducer.sum(),
+      geometry=ROI,
+      scale=10,
+      maxPixels=1e13,
+      tileScale=16)
+  getExtent = area1.get('classification');
+
+  #******************************************************************************
+  #======= would like to save the getExtent value as a property in the DB =======
+  #
+  # print(getExtent, 'Mangrove Extent in ha');
+  #******************************************************************************
+
+  #          7) Running an independent accuracy assessment
+
+  #These points were created in GEE using Stratified Random Sampling (see below)
+  #We then used the Class Accuracy plug-in (Pete Bunting) to classify each point using
+  #satellie data as validation
+
+  #7.1) Creating Stratified Random Samples
+
+  stratSamples = classifiedrf.stratifiedSample(numPoints=150,        #Number of points per class
+      classBand='classification',
+      region=ROI,
+      scale=30,
+      geometries=True)
+
+  #Add a 15m Radius buffer around each point
+  def stratBuff(feature):
+          num = feature.get('classification')
+          buf = feature.buffer(15).set('classification', num)
+          return buf
+
+  #Map the buffer across all points (see export code below
+
+  stratPoints = stratSamples.map(stratBuff)
+
+  # extent and the accuracy assessment in one round trip, or the extent summed
+  # over n x n tiles reduced concurrently (config['extent_tiles'], see tiles.py)
+  n = tiles.tile_count(config)
+  collector = stats.Collector()
+  if not n:
+    collector.add('extent', getExtent)
+  collector.add('accuracy', testAccuracy.accuracy())
+  collector.add('kappa', testAccuracy.kappa())
+  values = collector.evaluate(config)
+  tile_report = []
+  if n:
+    values['extent'], tile_report = tiles.reduce_sum(classed, 'classification', ROI, tiles.grid(aruba_coords[0], n, n), 10, config)
+
+  stat_list = []
+
+  stat_list.append({
+    'label': 'Mangrove Extent',
+    'area_ha': values['extent'] / 100
+  })
+
+  stat_list.append({
+    'label': 'overall accuracy',
+    'value': values['accuracy']
+  })
+
+  stat_list.append({
+    'label': 'kappa',
+    'value': values['kappa']
+  })
+
+  jsonBody = {
+    'subject': 'vegetation',
+    'location': config.get('location', 'surfside'),
+    'window_start': i_date,
+    'window_end': f_date,
+    'files': [],
+    'stats': stat_list
+  }
+  if tile_report:
+    jsonBody['extent_tiles'] = tile_report # per-tile latency
+
+  # what the exports' outputs depend on, for their fingerprint (see export.py);
+  # the model key covers the classifier's parameters and training data
+  params = {'roi': aruba_coords, 'composite': 's2clouds_indices', 'masks': {'elevation': 30, 'NDVI': 0.25, 'MNDWI': -0.5},
+    'bands': bands, 'model': models.key('mangrove_rf', spec)}
+
+  # stat-only runs skip the imagery exports
+  if config.get('stats_only'):
+    return [], jsonBody
+
+  #          8) Export Layers of Interest
+
+  #8.1) 2019 Mangrove Extent
+  #------------------
+  taskMG = shards.image('vegetation', window, config, params, image=classed,
+    description='SentinelMangroveExtent_Aruba_'+i_date+'_'+f_date,
+    bucket=bucket,
+    fileNamePrefix=i_date+'_'+f_date+'/SentinelMangroveExtent_Aruba_'+i_date+'_'+f_date,
+    region=ROI,
     scale=10,
-    maxPixels=1e13,
-    tileScale=16)
-getExtent = area1.get('classification');
+    maxPixels=1e13)
 
-#******************************************************************************
-#======= would like to save the getExtent value as a property in the DB =======
-#
-# print(getExtent, 'Mangrove Extent in ha');
-#******************************************************************************
-extent_ha = getExtent.getInfo() / 100
-
-#          7) Running an independent accuracy assessment
+  # mangrove extent tif, or its shards and their mosaic with config['shards']
+  jsonBody['files'] = taskMG.files
 
-#These points were created in GEE using Stratified Random Sampling (see below)
-#We then used the Class Accuracy plug-in (Pete Bunting) to classify each point using
-#satellie data as validation
+  # exports whose outputs already exist are skipped
+  return export.pending(taskMG.exports), jsonBody
 
-#7.1) Creating Stratified Random Samples
+# run one window and return its manifest, without touching the command line
+def run(window, config=None):
+  return taskmonitor.run_exports(exports, window, config or {})
 
-stratSamples = classifiedrf.stratifiedSample(numPoints=150,        #Number of points per class
-    classBand='classification',
-    region=ROI,
-    scale=30,
-    geometries=True)
-
-#Add a 15m Radius buffer around each point
-def stratBuff(feature):
-        num = feature.get('classification')
-        buf = feature.buffer(15).set('classification', num)
-        return buf
-
-#Map the buffer across all points (see export code below
-
-stratPoints = stratSamples.map(stratBuff)
-
-
-#          8) Export Layers of Interest
-
-#8.1) 2019 Mangrove Extent
-#------------------
-taskMG = ee.batch.Export.image.toCloudStorage(image=classed,
-  description='SentinelMangroveExtent_Aruba_'+i_date+'_'+f_date,
-  bucket=bucket_name,
-  fileNamePrefix=i_date+'_'+f_date+'/SentinelMangroveExtent_Aruba_'+i_date+'_'+f_date,
-  region=ROI,
-  scale=10,
-  maxPixels=1e13)
-
-taskMG.start()
-
-taskMG_status = {}
-
-file_list = []
-
-stat_list = []
-
-# 1st tif export
-file_list.append({
-  'type': 'geotiff',
-  'file_extension': 'tif',
-  'filename': i_date+'_'+f_date+'/SentinelMangroveExtent_Aruba_'+i_date+'_'+f_date + '.' + 'tif'
-})
-
-stat_list.append({
-  'label': 'Mangrove Extent',
-  'area_ha': extent_ha
-})
-
-jsonBody = {
-  'subject': 'vegetation',
-  'location': 'surfside',
-  'window_start': i_date,
-  'window_end': f_date,
-  'files': file_list,
-  'stats': stat_list
-}
-
-while True:
-  taskMG_status = taskMG.status()
-  if taskMG_status['state'] == 'COMPLETED':
-    print(json.dumps(jsonBody))
-    break
-  elif taskMG_status['state'] == 'FAILED':
+if __name__ == '__main__':
+  args = windows.parse(sys.argv[1:], (i_date, f_date))
+  if not windows.run(exports, args):
     print('at least one of the tasks failed', file=sys.stderr)
     sys.exit(1)
-  else:
-    sleep(1)
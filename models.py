@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from session import ee
+
+import assets
+import telemetry
+
+# trained classifier registry
+#
+# the mangrove random forest and the seafloor CART are trained on the same
+# polygons and points with the same parameters for every window. With the
+# registry enabled (config['models'] or SURFSIDE_MODELS=1) a trained
+# classifier is kept under a hash of its name, parameters, bands, label, the
+# serialized training geometries and labels, and the composite it samples
+# (mask profile, training window and ROI). The first run fetches its
+# explain() trees, which trains it once, and writes them to
+# ~/.cache/surfside/models (SURFSIDE_MODEL_DIR); later runs of any window or
+# product rebuild it with ee.Classifier.decisionTree(Ensemble) instead of
+# training. With an asset folder (config['model_root'] or
+# SURFSIDE_MODEL_ROOT) the classifier is also exported with
+# Export.classifier.toAsset and loaded from there on machines without the
+# trees. Changing the training data changes the key, so stale models are
+# never used. config['training_window'] (or SURFSIDE_TRAINING_WINDOW, as
+# START:END) trains on one fixed window so every window shares the model:
+#
+#   python models.py --report
+#   python models.py --clear
+
+enabled = os.environ.get('SURFSIDE_MODELS') == '1'
+model_dir = os.environ.get('SURFSIDE_MODEL_DIR',
+  os.path.join(os.path.expanduser('~'), '.cache', 'surfside', 'models'))
+model_root = os.environ.get('SURFSIDE_MODEL_ROOT')
+default_training_window = os.environ.get('SURFSIDE_TRAINING_WINDOW')
+
+
+def training_window(config, window):
+  found = (config or {}).get('training_window') or default_training_window
+  if not found:
+    return tuple(window)
+  if isinstance(found, str):
+    found = found.split(':')
+  return tuple(found)
+
+
+def key(name, spec):
+  payload = {'name': name}
+  for item, value in spec.items():
+    payload[item] = json.loads(ee.serializer.toJSON(value)) if isinstance(value, ee.ComputedObject) else value
+  return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _path(directory, k):
+  return os.path.join(directory, k + '.json')
+
+
+# the entry, None when it is missing or unreadable
+def _read(directory, k):
+  try:
+    with open(_path(directory, k)) as f:
+      return json.load(f)
+  except (OSError, ValueError):
+    return None
+
+
+def _write(directory, k, entry):
+  os.makedirs(directory, exist_ok=True)
+  path = _path(directory, k)
+  with open(path + '.tmp', 'w') as f:
+    json.dump(entry, f)
+  os.replace(path + '.tmp', path)
+
+
+# classifier rebuilt from its explain() trees
+def from_trees(entry):
+  if 'tree' in entry:
+    return ee.Classifier.decisionTree(entry['tree'])
+  return ee.Classifier.decisionTreeEnsemble(entry['trees'])
+
+
+# the trained classifier for spec: train() when it is not registered yet,
+# otherwise the stored one; every reuse adds its training time to the savings
+def get(name, spec, train, config=None):
+  config = config or {}
+  if not config.get('models', enabled):
+    return train()
+  directory = config.get('model_dir', model_dir)
+  root = config.get('model_root', model_root)
+  k = key(name, spec)
+  aid = root + '/' + name + '_' + k[:12] if root else None
+  entry = _read(directory, k)
+  if entry is not None:
+    entry['hits'] = entry.get('hits', 0) + 1
+    _write(directory, k, entry)
+    return from_trees(entry)
+  if aid and assets.exists(aid):
+    return ee.Classifier.load(aid)
+  classifier = train()
+  started = time.perf_counter()
+  with telemetry.span('getinfo', model=name):
+    trees = classifier.explain().getInfo()
+  entry = {'name': name, 'seconds': round(time.perf_counter() - started, 3), 'created': time.time(), 'hits': 0}
+  if 'tree' in trees:
+    entry['tree'] = trees['tree']
+  else:
+    entry['trees'] = trees['trees']
+  _write(directory, k, entry)
+  if aid:
+    assets.store(aid, lambda description: ee.batch.Export.classifier.toAsset(classifier=classifier, description=description, assetId=aid))
+  return classifier
+
+
+def report(directory=model_dir):
+  found = {'models': 0, 'reuses': 0, 'seconds_saved': 0.0}
+  if not os.path.isdir(directory):
+    return found
+  for filename in os.listdir(directory):
+    if not filename.endswith('.json'):
+      continue
+    entry = _read(directory, filename[:-len('.json')])
+    if entry is None:
+      continue
+    found['models'] += 1
+    found['reuses'] += entry.get('hits', 0)
+    found['seconds_saved'] += entry.get('hits', 0) * entry.get('seconds', 0.0)
+  found['seconds_saved'] = round(found['seconds_saved'], 3)
+  return found
+
+
+def clear(directory=model_dir):
+  if os.path.isdir(directory):
+    for filename in os.listdir(directory):
+      if filename.endswith('.json'):
+        os.remove(os.path.join(directory, filename))
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('--dir', default=model_dir)
+  p.add_argument('--clear', action='store_true')
+  p.add_argument('--report', action='store_true')
+  args = p.parse_args(sys.argv[1:])
+  if args.clear:
+    clear(args.dir)
+  print(json.dumps(report(args.dir)))
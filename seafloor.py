@@ -1,28 +1,16 @@
-import ee
+from session import ee
 
-import json
-from time import sleep
-import os
-
-bucket_name = 'surfsidegis'
-
-# to get arguments sent to this script
+import composites
+import export
+import models
+import sentinel2
+import taskmonitor
+import windows
 import sys
-start_date = None
-end_date = None
-if len(sys.argv) == 3:
-  start_date = sys.argv[1]
-  end_date = sys.argv[2]
 
-# Trigger the authentication flow.
-# ee.Authenticate()
-# Actually, use service account as login
-credentials = ee.ServiceAccountCredentials(os.environ['GOOGLE_SERVICE_ACCOUNT'], os.environ['GOOGLE_APPLICATION_CREDENTIALS'])
-
-# Initialize the library.
-ee.Initialize(credentials)
+bucket_name = 'surfsidegis'
 
-surfside2 = ee.Geometry.Polygon([[[-70.02874205226155, 12.505525368088623],
+surfside2_coords = [[[-70.02874205226155, 12.505525368088623],
   [-70.02976129168721, 12.505965288138416],
   [-70.02968618983479, 12.50650995001924],
   [-70.02821608747708, 12.508213241066992],
@@ -54,134 +42,133 @@ surfside2 = ee.Geometry.Polygon([[[-70.02874205226155, 12.505525368088623],
   [-70.02790943778218, 12.503275011480387],
   [-70.02867006891573, 12.50363993973414],
   [-70.02877625496478, 12.504130557570287],
-  [-70.02904882994079, 12.504204740034828]]])
+  [-70.02904882994079, 12.504204740034828]]]
 
-arusquare = ee.FeatureCollection('users/sevold/arusquare')
 
-seagrass = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03131901583443, 12.507111010538615]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03129755816231, 12.507927999305263]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03047143778572, 12.50773946366541]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03058945498238, 12.508954468707781]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03124391398201, 12.508943994550801]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03130828699837, 12.510106623381413]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03157650789986, 12.509792399889312]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03173744044075, 12.511133084124298]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03277813753853, 12.511195928527014]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03270303568611, 12.51243186533867]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03317510447273, 12.51330120717872]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03407632670174, 12.513646848301795]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03366863093147, 12.511887215947404]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03452693781624, 12.512787981627111]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03484880289803, 12.512494709425265]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03592168650398, 12.513604952432734]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03551399073372, 12.514243863697086]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03446256479988, 12.514589503558001]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03314291796455, 12.505634139671857]),{'landcover':1}),
-  ee.Feature(ee.Geometry.Point([-70.03227388224373, 12.510572905008726]),{'landcover':1})])
-ocean = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03774558863411, 12.505733829576121]),{'landcover':5}),
-  ee.Feature(ee.Geometry.Point([-70.03937804257468, 12.507662918746528]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04032218014792, 12.509066458957788]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03512942349509, 12.509569217774931]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04309770931037, 12.517584966664685]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04193899501594, 12.518003918589026]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03957865108283, 12.51620242048895]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04120943416389, 12.516453793071774]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03919241298469, 12.514484701287529]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03781912196906, 12.514065743650761]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03721830714973, 12.51247369843007]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03816244472297, 12.512599386567588]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.0373041378382, 12.510462679908375]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.0366174923304, 12.509792336920626]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03683206905158, 12.508116471838395]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03803369869026, 12.509205785378882]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04661676753791, 12.515825361155676]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04223940242561, 12.512348010231356]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.0358450161341, 12.503801069202208]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03279802669319, 12.500993923938076]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.0460099419306, 12.507569818206449]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04502288901313, 12.510586373909405]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04176132285102, 12.504092356110558]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04806987845404, 12.504092356110558]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.05437843405707, 12.50581014444243]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04343502127631, 12.50262594240032]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04377834403022, 12.498519939740076]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.05214683615668, 12.501033826663539]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04124633872016, 12.5025421470798]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04828445517524, 12.502709737693678]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.05146019064887, 12.512052742425603]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.0549792488764, 12.502919225808174]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04734031760199, 12.510753959304155]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.05064479910834, 12.50660618882055]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.03463737570746, 12.50061484720773]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.038156433935, 12.499357904764771]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04223339163764, 12.509329479981965]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04553787314399, 12.499399802944692]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.04854194724066, 12.515153037011851]),{'landcover':0}),
-  ee.Feature(ee.Geometry.Point([-70.05703918539984, 12.511591884646442]),{'landcover':0})])
-sand = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03209582921286, 12.508712076502245]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03256789799948, 12.508717313585493]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03301314469596, 12.508177893453588]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.0345527326705, 12.511304419722231]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03543249722739, 12.512058551044921]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03600112553855, 12.512084736120725]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.0305514391736, 12.510248563584812]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.02989698017397, 12.50885288541878]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.02989698017397, 12.508763855035937]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.02989161575594, 12.508690535874086]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.02990770901003, 12.508625072319129]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.030803566821, 12.50680256028777]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03069627846041, 12.50689682846684]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03066409195223, 12.508153734233579]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03165114486971, 12.508090889090502]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.03323891026652, 12.511409871637458]),{'landcover':2}),
-  ee.Feature(ee.Geometry.Point([-70.0341186748234, 12.51248346026501]),{'landcover':2})])
-rubble = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03341698884901, 12.50659615737621]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03388905763563, 12.506648528632908]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03400707483229, 12.50622955828205]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03442549943861, 12.50647046631683]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03371739625868, 12.50558015289527]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03352427720961, 12.505234500975297]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03374958276686, 12.505004066105032]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03394270181593, 12.50558015289527]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03439331293043, 12.506177186940405]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03313803911146, 12.504606041754098]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03338480234083, 12.50468983640525]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03784184136163, 12.515454293531088]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03750120081673, 12.515189827595425]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03754411616097, 12.514996060302241]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03728930630456, 12.514812766782923]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.0376567689396, 12.515103417874542]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03737513699303, 12.515043192900453]),{'landcover':3}),
-  ee.Feature(ee.Geometry.Point([-70.03780429043542, 12.515362646950397]),{'landcover':3})])
-coral = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03462934732374, 12.504071850214048]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03465080499586, 12.504511772739054]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03541255235609, 12.504752682375779]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03542328119215, 12.50521355235921]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03374958276686, 12.504637464751468]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03455424547133, 12.505150706500803]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03578806161818, 12.50542303844352]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03266597032484, 12.50272065491794]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03291273355421, 12.502385473595638]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03358865022597, 12.503223426086159]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03244066476759, 12.502270254915674]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03189885854658, 12.50148467163753]),{'landcover':4}),
-  ee.Feature(ee.Geometry.Point([-70.03157162904677, 12.501259470657363]),{'landcover':4})])
+# training points per seafloor class
+def trainingPoints():
+  seagrass = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03131901583443, 12.507111010538615]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03129755816231, 12.507927999305263]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03047143778572, 12.50773946366541]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03058945498238, 12.508954468707781]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03124391398201, 12.508943994550801]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03130828699837, 12.510106623381413]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03157650789986, 12.509792399889312]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03173744044075, 12.511133084124298]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03277813753853, 12.511195928527014]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03270303568611, 12.51243186533867]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03317510447273, 12.51330120717872]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03407632670174, 12.513646848301795]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03366863093147, 12.511887215947404]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03452693781624, 12.512787981627111]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03484880289803, 12.512494709425265]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03592168650398, 12.513604952432734]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03551399073372, 12.514243863697086]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03446256479988, 12.514589503558001]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03314291796455, 12.505634139671857]),{'landcover':1}),
+    ee.Feature(ee.Geometry.Point([-70.03227388224373, 12.510572905008726]),{'landcover':1})])
+  ocean = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03774558863411, 12.505733829576121]),{'landcover':5}),
+    ee.Feature(ee.Geometry.Point([-70.03937804257468, 12.507662918746528]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04032218014792, 12.509066458957788]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03512942349509, 12.509569217774931]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04309770931037, 12.517584966664685]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04193899501594, 12.518003918589026]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03957865108283, 12.51620242048895]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04120943416389, 12.516453793071774]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03919241298469, 12.514484701287529]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03781912196906, 12.514065743650761]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03721830714973, 12.51247369843007]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03816244472297, 12.512599386567588]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.0373041378382, 12.510462679908375]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.0366174923304, 12.509792336920626]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03683206905158, 12.508116471838395]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03803369869026, 12.509205785378882]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04661676753791, 12.515825361155676]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04223940242561, 12.512348010231356]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.0358450161341, 12.503801069202208]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03279802669319, 12.500993923938076]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.0460099419306, 12.507569818206449]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04502288901313, 12.510586373909405]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04176132285102, 12.504092356110558]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04806987845404, 12.504092356110558]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.05437843405707, 12.50581014444243]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04343502127631, 12.50262594240032]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04377834403022, 12.498519939740076]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.05214683615668, 12.501033826663539]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04124633872016, 12.5025421470798]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04828445517524, 12.502709737693678]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.05146019064887, 12.512052742425603]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.0549792488764, 12.502919225808174]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04734031760199, 12.510753959304155]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.05064479910834, 12.50660618882055]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.03463737570746, 12.50061484720773]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.038156433935, 12.499357904764771]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04223339163764, 12.509329479981965]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04553787314399, 12.499399802944692]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.04854194724066, 12.515153037011851]),{'landcover':0}),
+    ee.Feature(ee.Geometry.Point([-70.05703918539984, 12.511591884646442]),{'landcover':0})])
+  sand = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03209582921286, 12.508712076502245]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03256789799948, 12.508717313585493]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03301314469596, 12.508177893453588]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.0345527326705, 12.511304419722231]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03543249722739, 12.512058551044921]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03600112553855, 12.512084736120725]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.0305514391736, 12.510248563584812]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.02989698017397, 12.50885288541878]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.02989698017397, 12.508763855035937]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.02989161575594, 12.508690535874086]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.02990770901003, 12.508625072319129]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.030803566821, 12.50680256028777]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03069627846041, 12.50689682846684]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03066409195223, 12.508153734233579]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03165114486971, 12.508090889090502]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.03323891026652, 12.511409871637458]),{'landcover':2}),
+    ee.Feature(ee.Geometry.Point([-70.0341186748234, 12.51248346026501]),{'landcover':2})])
+  rubble = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03341698884901, 12.50659615737621]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03388905763563, 12.506648528632908]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03400707483229, 12.50622955828205]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03442549943861, 12.50647046631683]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03371739625868, 12.50558015289527]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03352427720961, 12.505234500975297]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03374958276686, 12.505004066105032]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03394270181593, 12.50558015289527]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03439331293043, 12.506177186940405]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03313803911146, 12.504606041754098]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03338480234083, 12.50468983640525]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03784184136163, 12.515454293531088]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03750120081673, 12.515189827595425]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03754411616097, 12.514996060302241]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03728930630456, 12.514812766782923]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.0376567689396, 12.515103417874542]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03737513699303, 12.515043192900453]),{'landcover':3}),
+    ee.Feature(ee.Geometry.Point([-70.03780429043542, 12.515362646950397]),{'landcover':3})])
+  coral = ee.FeatureCollection([ee.Feature(ee.Geometry.Point([-70.03462934732374, 12.504071850214048]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03465080499586, 12.504511772739054]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03541255235609, 12.504752682375779]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03542328119215, 12.50521355235921]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03374958276686, 12.504637464751468]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03455424547133, 12.505150706500803]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03578806161818, 12.50542303844352]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03266597032484, 12.50272065491794]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03291273355421, 12.502385473595638]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03358865022597, 12.503223426086159]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03244066476759, 12.502270254915674]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03189885854658, 12.50148467163753]),{'landcover':4}),
+    ee.Feature(ee.Geometry.Point([-70.03157162904677, 12.501259470657363]),{'landcover':4})])
+  return seagrass.merge(sand).merge(rubble).merge(coral).merge(ocean)
 
-roi = arusquare
-# roi = surfside2; # region of interest
+def region():
+  return ee.FeatureCollection('users/sevold/arusquare')
+  # return ee.Geometry.Polygon(surfside2_coords); # region of interest
 
-# time period of interest
+# default time period of interest
 i_date = '2022-01-01';
 f_date = '2022-12-31';
 
-if start_date != None and end_date != None:
-  i_date = start_date
-  f_date = end_date
-
 # LI ET AL image preprocessing
 # building the clean mosiac image based on different filters
-cloudBitMask = ee.Number(2).pow(10).int();
-cirrusBitMask = ee.Number(2).pow(11).int();
+cloudBitMask = 1 << 10;
+cirrusBitMask = 1 << 11;
 
 # this function is used to build clean water mosaic in the Google Earth Engine
 # the threshold value could be revised, the current value is suggested for a common clean coral reefs waters
@@ -207,88 +194,112 @@ def mask(img):
   return img
 # bad water region maskout end
 
-sentinel = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED').filterBounds(roi) # filter imagery by region
-sentinel = sentinel.filterDate(i_date,f_date) # Set up the date filter
-sentinel = sentinel.map(mask) # run the mask function
-median = sentinel.reduce(ee.Reducer.median()) # get the median value of it
+# the masked median for a window, the stored composite when there is one
+def composite(window, roi, s2, config):
+  def build():
+    sentinel = s2.filterBounds(roi) # filter imagery by region
+    sentinel = sentinel.map(mask) # run the mask function
+    return sentinel.reduce(ee.Reducer.median()) # get the median value of it
+
+  return composites.get('li_seafloor', window, roi, build, config)
+
+# build the graph for one window, returns the unstarted export tasks and the manifest;
+# config['s2'] is the window's Sentinel-2 collection when it is shared with other products
+def exports(window, config=None):
+  config = config or {}
+  i_date, f_date = window
+  bucket = config.get('bucket', bucket_name)
+  roi = region()
+  surfside2 = ee.Geometry.Polygon(surfside2_coords)
+  s2 = config.get('s2')
+  if s2 is None:
+    s2 = sentinel2.collection(roi, i_date, f_date)
+
+  median = composite(window, roi, s2, config)
+
+  image = median;
+  bands = ['B2_median', 'B3_median', 'B4_median', 'B8_median', 'B11_median', 'B12_median'];
+  points = trainingPoints();
+  label = 'landcover';
 
-image = median;
-bands = ['B2_median', 'B3_median', 'B4_median', 'B8_median', 'B11_median', 'B12_median'];
-points = seagrass.merge(sand).merge(rubble).merge(coral).merge(ocean);
-label = 'landcover';
+  # the composite the classifier is trained on, a fixed window when
+  # config['training_window'] is set so windows share one model
+  trainWindow = models.training_window(config, window)
+  trainImage = image if trainWindow == tuple(window) else composite(trainWindow, roi, sentinel2.collection(roi, *trainWindow), config)
 
-training = image.select(bands).sampleRegions(collection=points,
-  properties=[label],
-  scale=10)
+  def train():
+    training = trainImage.select(bands).sampleRegions(collection=points,
+      properties=[label],
+      scale=10)
 
-# Train a CART classifier with default parameters.
-trained = ee.Classifier.smileCart().train(training, label, bands)
+    # Train a CART classifier with default parameters.
+    return ee.Classifier.smileCart().train(training, label, bands)
 
-# Classify the image with the same bands used for training.
-image = image.clip(roi)
-classified = image.select(bands).classify(trained)
+  # registered classifier when the training data has not changed (see models.py)
+  spec = {
+    'params': {},
+    'bands': bands,
+    'label': label,
+    'points': points,
+    'composite': 'li_seafloor',
+    'training_window': list(trainWindow),
+    'roi': roi
+  }
+  trained = models.get('seafloor_cart', spec, train, config)
 
-# Export the classification map
-taskSC = ee.batch.Export.image.toCloudStorage(image=classified,
-  description='seafloorCover_'+i_date+'_'+f_date,
-  bucket=bucket_name,
-  fileNamePrefix=i_date+'_'+f_date+'/seafloorCover_'+i_date+'_'+f_date,
-  region=surfside2,
-  scale=10,
-  crs='EPSG:4326',
-  fileFormat='GeoTIFF',
-  maxPixels=10000000000000)
+  # Classify the image with the same bands used for training.
+  image = image.clip(roi)
+  classified = image.select(bands).classify(trained)
 
-taskSC.start()
+  jsonBody = {
+    'subject': 'seafloor',
+    'location': config.get('location', 'surfside'),
+    'window_start': i_date,
+    'window_end': f_date,
+    'files': []
+  }
 
-# Export the processed sentinel imagery
-taskS2 = ee.batch.Export.image.toCloudStorage(image=image,
-  description='SCsentinelS2_'+i_date+'_'+f_date,
-  bucket=bucket_name,
-  fileNamePrefix=i_date+'_'+f_date+'/SCsentinelS2_'+i_date+'_'+f_date,
-  region=surfside2,
-  scale=10,
-  crs='EPSG:4326',
-  fileFormat='GeoTIFF')
+  # what the exports' outputs depend on, for their fingerprint (see export.py);
+  # the model key covers the classifier's parameters and training data
+  params = {'roi': 'users/sevold/arusquare', 'composite': 'li_seafloor', 'bands': bands, 'model': models.key('seafloor_cart', spec)}
 
-taskS2.start()
+  # stat-only runs skip the imagery exports
+  if config.get('stats_only'):
+    return [], jsonBody
 
-taskSC_status = {}
-taskS2_status = {}
+  # Export the classification map
+  taskSC = export.image('seafloor', window, config, params, image=classified,
+    description='seafloorCover_'+i_date+'_'+f_date,
+    bucket=bucket,
+    fileNamePrefix=i_date+'_'+f_date+'/seafloorCover_'+i_date+'_'+f_date,
+    region=surfside2,
+    scale=10,
+    crs='EPSG:4326',
+    fileFormat='GeoTIFF',
+    maxPixels=10000000000000)
 
-file_list = []
-shape_exts = ['shp', 'shx', 'dbf', 'prj', 'cpg', 'fix']
+  # Export the processed sentinel imagery
+  taskS2 = export.image('seafloor', window, config, params, image=image,
+    description='SCsentinelS2_'+i_date+'_'+f_date,
+    bucket=bucket,
+    fileNamePrefix=i_date+'_'+f_date+'/SCsentinelS2_'+i_date+'_'+f_date,
+    region=surfside2,
+    scale=10,
+    crs='EPSG:4326',
+    fileFormat='GeoTIFF')
 
-# 1st tif export
-file_list.append({
-  'type': 'geotiff',
-  'file_extension': 'tif',
-  'filename': i_date+'_'+f_date + '/seafloorCover_'+i_date+'_'+f_date + '.' + 'tif'
-})
+  # classification and imagery tifs
+  jsonBody['files'] = taskSC.files + taskS2.files
 
-#2nd tif export
-file_list.append({
-  'type': 'geotiff',
-  'file_extension': 'tif',
-  'filename': i_date+'_'+f_date + '/SCsentinelS2_'+i_date+'_'+f_date + '.' + 'tif'
-})
+  # exports whose outputs already exist are skipped
+  return export.pending([taskSC, taskS2]), jsonBody
 
-jsonBody = {
-  'subject': 'seafloor',
-  'location': 'surfside',
-  'window_start': i_date,
-  'window_end': f_date,
-  'files': file_list
-}
+# run one window and return its manifest, without touching the command line
+def run(window, config=None):
+  return taskmonitor.run_exports(exports, window, config or {})
 
-while True:
-  taskSC_status = taskSC.status()
-  taskS2_status = taskS2.status()
-  if taskSC_status['state'] == 'COMPLETED' and taskS2_status['state'] == 'COMPLETED':
-    print(json.dumps(jsonBody))
-    break
-  elif taskSC_status['state'] == 'FAILED' or taskS2_status['state'] == 'FAILED':
+if __name__ == '__main__':
+  args = windows.parse(sys.argv[1:], (i_date, f_date))
+  if not windows.run(exports, args):
     print('at least one of the tasks failed', file=sys.stderr)
     sys.exit(1)
-  else:
-    sleep(1)
@@ -0,0 +1,9 @@
+from session import ee
+
+# Sentinel-2 surface reflectance for one window, the collection every product
+# starts from; surfside.py builds it once per window and hands it to all of them
+def collection(region, i_date, f_date):
+  s2 = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+  s2 = s2.filterBounds(region) # spatial filtration
+  s2 = s2.filterDate(i_date, f_date) # temporal filtration
+  return s2
@@ -0,0 +1,103 @@
+import datetime
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import telemetry
+
+# Earth Engine session shared by every product imported in the same process
+#
+# `from session import ee` gives a stand-in for the ee module: the real module
+# is imported and initialized on the first attribute access, so importing a
+# product costs nothing until it actually builds a graph. The service account
+# access token is cached on disk and reused by later launches until it
+# expires, which skips the JWT exchange on every cold start.
+
+token_cache = os.environ.get('SURFSIDE_TOKEN_CACHE',
+  os.path.join(os.path.expanduser('~'), '.cache', 'surfside', 'token.json'))
+# cached tokens this close to expiry are not reused
+token_margin = datetime.timedelta(minutes=5)
+
+_module = None
+_lock = threading.Lock()
+
+
+def _read_token(account):
+  try:
+    with open(token_cache) as f:
+      cached = json.load(f)
+    if cached['account'] != account:
+      return None
+    token = cached['token']
+    expiry = datetime.datetime.fromisoformat(cached['expiry'])
+  except (OSError, ValueError, KeyError, TypeError):
+    return None # no cache, or an entry we cannot use: refresh and rewrite it
+  # google-auth keeps the expiry as naive UTC
+  if expiry.tzinfo is not None:
+    expiry = expiry.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+  if expiry - token_margin < datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None):
+    return None
+  return token, expiry
+
+
+def _write_token(account, token, expiry):
+  os.makedirs(os.path.dirname(token_cache), exist_ok=True)
+  fd = os.open(token_cache, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+  with os.fdopen(fd, 'w') as f:
+    json.dump({'account': account, 'token': token, 'expiry': expiry.isoformat()}, f)
+
+
+# service account credentials, primed with the cached token when there is one;
+# google-auth only refreshes once the token is no longer valid
+def credentials(ee_module):
+  account = os.environ['GOOGLE_SERVICE_ACCOUNT']
+  creds = ee_module.ServiceAccountCredentials(account, os.environ['GOOGLE_APPLICATION_CREDENTIALS'])
+  cached = _read_token(account)
+  if cached is not None:
+    creds.token, creds.expiry = cached
+  else:
+    import google.auth.transport.requests
+    creds.refresh(google.auth.transport.requests.Request())
+    _write_token(account, creds.token, creds.expiry)
+  return creds
+
+
+# the initialized ee module
+def module():
+  global _module
+  with _lock:
+    if _module is None:
+      with telemetry.span('initialize'):
+        import ee as ee_module
+        ee_module.Initialize(credentials(ee_module))
+      _module = ee_module
+  return _module
+
+
+class _LazyEE:
+  def __getattr__(self, name):
+    return getattr(module(), name)
+
+
+ee = _LazyEE()
+
+
+# cold start budget: importing every product must not import ee or authenticate
+startup_budget = float(os.environ.get('SURFSIDE_STARTUP_BUDGET', '0.5'))
+
+
+def startup_time():
+  code = 'import sys, coastline, reefislands, seafloor, mangroves; sys.exit("ee" in sys.modules)'
+  started = time.perf_counter()
+  subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+  return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+  seconds = startup_time()
+  print('product import took %.3f s, budget %.3f s' % (seconds, startup_budget))
+  if seconds > startup_budget:
+    sys.exit(1)
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import sys
+
+from session import ee
+
+import export
+import statcache
+import tiles
+
+# sharded image exports
+#
+# a large export (rifS2_ over arusquare, the island-wide mangrove extent) is
+# one long task on the EE side and is lost whole if it fails near the end.
+# With config['shards'] = n (or SURFSIDE_SHARDS) the export region is split
+# into an n x n grid of cells and each cell is exported on its own, as
+# <prefix>_rXXcYY. The monitor runs at most --max-tasks of them at once and
+# retries a failed shard (config['shard_retries'], default 2) without
+# touching the others. The manifest lists every shard, each with its
+# 'shard' cell, and a 'mosaic' entry <prefix>.vrt naming the shards, which
+# `python shards.py vrt` turns into a GDAL VRT once the shards are
+# downloaded, so readers see one raster:
+#
+#   python shards.py vrt manifest.json downloads/
+
+default_shards = int(os.environ.get('SURFSIDE_SHARDS', '0'))
+default_retries = int(os.environ.get('SURFSIDE_SHARD_RETRIES', '2'))
+
+
+class Sharded:
+  # the exports of one logical image and its manifest entries
+  def __init__(self, exports, files):
+    self.exports = exports
+    self.files = files
+
+
+def count(config=None):
+  return int((config or {}).get('shards', default_shards))
+
+
+# [west, south, east, north] cells over the bounds of the region
+def cells(region, n, config=None):
+  bounds = statcache.get_info(ee.Geometry(region).bounds(1), config)
+  return tiles.grid(bounds['coordinates'][0], n, n)
+
+
+def image(product, window, config, params, **options):
+  n = count(config)
+  if not n:
+    found = export.image(product, window, config, params, **options)
+    return Sharded([found], found.files)
+  region = ee.Geometry(options['region'])
+  prefix = options['fileNamePrefix']
+  retries = config.get('shard_retries', default_retries)
+  exports = []
+  files = []
+  names = []
+  for i, cell in enumerate(cells(region, n, config)):
+    shard = 'r%02dc%02d' % (i // n, i % n)
+    found = export.image(product, window, config, params, retries=retries, **dict(options,
+      region=ee.Geometry.Rectangle(cell, 'EPSG:4326', False).intersection(region, 1),
+      description=options['description'] + '_' + shard,
+      fileNamePrefix=prefix + '_' + shard))
+    for f in found.files:
+      f['shard'] = shard
+      names.append(f['filename'])
+    exports.append(found)
+    files += found.files
+  files.append({'type': 'mosaic', 'file_extension': 'vrt', 'filename': prefix + '.vrt', 'shards': names})
+  return Sharded(exports, files)
+
+
+# a GDAL VRT mosaic of the downloaded shards, placed on the pixel size of the first
+def build_vrt(entry, directory):
+  import rasterio
+  paths = [os.path.join(directory, name) for name in entry['shards']]
+  sources = []
+  for path in paths:
+    with rasterio.open(path) as src:
+      sources.append((path, src.bounds, src.width, src.height, src.count, src.dtypes[0], src.nodata, src.crs, src.res))
+  west = min(s[1].left for s in sources)
+  north = max(s[1].top for s in sources)
+  east = max(s[1].right for s in sources)
+  south = min(s[1].bottom for s in sources)
+  xres, yres = sources[0][8]
+  width = int(round((east - west) / xres))
+  height = int(round((north - south) / yres))
+  dtype = {'uint8': 'Byte', 'uint16': 'UInt16', 'int16': 'Int16', 'int32': 'Int32', 'float32': 'Float32', 'float64': 'Float64'}[sources[0][5]]
+  target = os.path.join(directory, entry['filename'])
+  lines = ['<VRTDataset rasterXSize="%d" rasterYSize="%d">' % (width, height),
+    '  <SRS>%s</SRS>' % sources[0][7].to_wkt().replace('"', '&quot;'),
+    '  <GeoTransform>%r, %r, 0, %r, 0, %r</GeoTransform>' % (west, xres, north, -yres)]
+  for band in range(1, sources[0][4] + 1):
+    lines.append('  <VRTRasterBand dataType="%s" band="%d">' % (dtype, band))
+    if sources[0][6] is not None:
+      lines.append('    <NoDataValue>%r</NoDataValue>' % sources[0][6])
+    for path, bounds, w, h, *rest in sources:
+      xoff = int(round((bounds.left - west) / xres))
+      yoff = int(round((north - bounds.top) / yres))
+      lines += ['    <SimpleSource>',
+        '      <SourceFilename relativeToVRT="1">%s</SourceFilename>' % os.path.relpath(path, os.path.dirname(target)),
+        '      <SourceBand>%d</SourceBand>' % band,
+        '      <SrcRect xOff="0" yOff="0" xSize="%d" ySize="%d"/>' % (w, h),
+        '      <DstRect xOff="%d" yOff="%d" xSize="%d" ySize="%d"/>' % (xoff, yoff, w, h),
+        '    </SimpleSource>']
+    lines.append('  </VRTRasterBand>')
+  lines.append('</VRTDataset>')
+  with open(target, 'w') as f:
+    f.write('\n'.join(lines) + '\n')
+  return target
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  commands = p.add_subparsers(dest='command', required=True)
+  c = commands.add_parser('vrt')
+  c.add_argument('manifest')
+  c.add_argument('directory', help='where the shards were downloaded, keeping their bucket paths')
+  args = p.parse_args(sys.argv[1:])
+  with open(args.manifest) as f:
+    manifest = json.load(f)
+  for entry in manifest['files']:
+    if entry['type'] == 'mosaic':
+      print(build_vrt(entry, args.directory))
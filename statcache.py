@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from session import ee
+
+import telemetry
+
+# persistent cache for the blocking getInfo() statistics
+#
+# the key is a hash of the serialized expression graph, so the same
+# statistic for the same window, region and parameters is only computed once
+# per TTL. Entries expire after `ttl` seconds and the least recently used are
+# evicted once the cached values exceed `max_bytes`. Hits, misses and the
+# seconds the hits saved are kept in the same database:
+#
+#   python statcache.py --report
+#   python statcache.py --clear
+
+cache_path = os.environ.get('SURFSIDE_STAT_CACHE',
+  os.path.join(os.path.expanduser('~'), '.cache', 'surfside', 'stats.sqlite'))
+ttl = float(os.environ.get('SURFSIDE_STAT_TTL', str(7 * 24 * 3600)))
+max_bytes = int(os.environ.get('SURFSIDE_STAT_MAX_BYTES', str(64 * 1024 * 1024)))
+
+schema = '''
+create table if not exists entries (
+  key text primary key,
+  value text not null,
+  created real not null,
+  last_used real not null,
+  seconds real not null,
+  size integer not null
+);
+create table if not exists counters (
+  name text primary key,
+  value real not null
+);
+'''
+
+
+class Cache:
+  def __init__(self, path=None, ttl=ttl, max_bytes=max_bytes):
+    path = path or cache_path
+    if os.path.dirname(path):
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+    self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=30)
+    self.db.executescript(schema)
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    self.lock = threading.Lock()
+
+  @staticmethod
+  def key(obj):
+    return hashlib.sha256(ee.serializer.toJSON(obj).encode()).hexdigest()
+
+  def _count(self, name, amount=1):
+    self.db.execute('insert into counters (name, value) values (?, ?) on conflict(name) do update set value = value + excluded.value', (name, amount))
+
+  def lookup(self, key):
+    now = time.time()
+    with self.lock:
+      row = self.db.execute('select value, seconds from entries where key = ? and created > ?', (key, now - self.ttl)).fetchone()
+      if row is None:
+        self._count('misses')
+        return None
+      self.db.execute('update entries set last_used = ? where key = ?', (now, key))
+      self._count('hits')
+      self._count('seconds_saved', row[1])
+      return row
+
+  def store(self, key, value, seconds):
+    text = json.dumps(value)
+    now = time.time()
+    with self.lock:
+      self.db.execute('insert or replace into entries (key, value, created, last_used, seconds, size) values (?, ?, ?, ?, ?, ?)',
+        (key, text, now, now, seconds, len(text)))
+      self.evict()
+
+  # drop expired entries, then the least recently used ones above max_bytes
+  def evict(self):
+    self.db.execute('delete from entries where created <= ?', (time.time() - self.ttl,))
+    total = self.db.execute('select coalesce(sum(size), 0) from entries').fetchone()[0]
+    if total <= self.max_bytes:
+      return
+    for key, size in self.db.execute('select key, size from entries order by last_used').fetchall():
+      self.db.execute('delete from entries where key = ?', (key,))
+      total -= size
+      if total <= self.max_bytes:
+        break
+
+  # obj.getInfo(), answered from the cache when the same graph was evaluated before
+  def get_info(self, obj):
+    key = self.key(obj)
+    row = self.lookup(key)
+    if row is not None:
+      return json.loads(row[0])
+    started = time.perf_counter()
+    value = obj.getInfo()
+    self.store(key, value, time.perf_counter() - started)
+    return value
+
+  def report(self):
+    found = dict(self.db.execute('select name, value from counters').fetchall())
+    entries, size = self.db.execute('select count(*), coalesce(sum(size), 0) from entries').fetchone()
+    return {
+      'hits': int(found.get('hits', 0)),
+      'misses': int(found.get('misses', 0)),
+      'seconds_saved': round(found.get('seconds_saved', 0.0), 3),
+      'entries': entries,
+      'bytes': size
+    }
+
+  def clear(self):
+    with self.lock:
+      self.db.execute('delete from entries')
+      self.db.execute('delete from counters')
+
+
+_default = None
+
+
+def default():
+  global _default
+  if _default is None:
+    _default = Cache()
+  return _default
+
+
+# the products' getInfo(); config['stat_cache'] = False bypasses the cache
+def get_info(obj, config=None):
+  with telemetry.span('getinfo'):
+    if not (config or {}).get('stat_cache', True):
+      return obj.getInfo()
+    return default().get_info(obj)
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('--path', default=cache_path)
+  p.add_argument('--clear', action='store_true')
+  p.add_argument('--report', action='store_true')
+  args = p.parse_args(sys.argv[1:])
+  cache = Cache(args.path)
+  if args.clear:
+    cache.clear()
+  print(json.dumps(cache.report()))
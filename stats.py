@@ -0,0 +1,18 @@
+from session import ee
+
+import statcache
+
+# collects every statistic of a run into one ee.Dictionary that is evaluated
+# in a single getInfo() (through the stat cache), so shared subgraphs are
+# computed once and the run pays one round trip
+class Collector:
+  def __init__(self):
+    self.values = {}
+
+  def add(self, key, value):
+    self.values[key] = value
+
+  def evaluate(self, config=None):
+    if not self.values:
+      return {}
+    return statcache.get_info(ee.Dictionary(self.values), config)
@@ -0,0 +1,77 @@
+import argparse
+import importlib
+import sys
+
+from session import ee
+
+import sentinel2
+import taskmonitor
+import telemetry
+import windows
+
+# run several products for the same windows in one process
+#
+#   python surfside.py run --products all --window 2023-03-01 2023-03-31
+#   python surfside.py run --products coastline,reefislands --monthly 2023-01 2023-06
+#
+# the window's Sentinel-2 collection is built once and shared by every
+# product, and all exports go through a single task monitor
+
+product_names = ['coastline', 'reefislands', 'seafloor', 'mangroves']
+# manifest subjects that differ from the module name
+aliases = {'vegetation': 'mangroves'}
+
+
+def load(names):
+  return [importlib.import_module(name) for name in names]
+
+
+def select(text):
+  if text == 'all':
+    return list(product_names)
+  names = [aliases.get(name, name) for name in text.split(',')]
+  for name in names:
+    if name not in product_names:
+      raise argparse.ArgumentTypeError('unknown product: ' + name)
+  return names
+
+
+def parser():
+  p = argparse.ArgumentParser()
+  commands = p.add_subparsers(dest='command', required=True)
+  run = commands.add_parser('run', parents=[windows.parser(add_help=False)])
+  run.add_argument('--products', type=select, default='all', help='"all" or a comma separated list')
+  run.add_argument('--window', nargs=2, action='append', default=[], metavar=('START', 'END'))
+  return p
+
+
+# one job per (window, product), sharing the window's collection
+def jobs(products, window_list):
+  region = ee.FeatureCollection([ee.Feature(ee.FeatureCollection(product.region()).geometry()) for product in products])
+  found = []
+  for i_date, f_date in window_list:
+    s2 = sentinel2.collection(region, i_date, f_date)
+    for product in products:
+      found.append(taskmonitor.Job(lambda product=product, i_date=i_date, f_date=f_date, s2=s2: product.exports((i_date, f_date), {'s2': s2}),
+        product.__name__, (i_date, f_date)))
+  return found
+
+
+def main(argv):
+  p = parser()
+  args = windows.collect(p.parse_args(argv), None)
+  args.windows.extend(tuple(w) for w in args.window)
+  if not args.windows:
+    p.error('no window given')
+  products = load(args.products)
+  try:
+    return taskmonitor.wait_batch(jobs(products, args.windows), args.max_tasks,
+      windows.emit(args.manifest_dir, args.events != '-'), events=windows.events(args.events))
+  finally:
+    telemetry.flush()
+
+
+if __name__ == '__main__':
+  if not main(sys.argv[1:]):
+    print('at least one of the tasks failed', file=sys.stderr)
+    sys.exit(1)
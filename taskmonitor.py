@@ -0,0 +1,393 @@
+import asyncio
+import itertools
+import sys
+import time
+import traceback
+
+from session import ee
+
+import assets
+import telemetry
+
+# shared export task monitor used by all the product scripts
+#
+# instead of calling task.status() for every task every second, the monitor
+# lists the state of every tracked task in one call per tick, backs off while
+# nothing changes, starts the exports concurrently and cancels the remaining
+# tasks as soon as one of them fails
+#
+# with an events callback every task state transition is reported as a dict
+# (submitted, running, completed with the export's files, failed, cancelled)
+# tagged with the window's subject and dates, see windows.events()
+#
+# building a window is timed as its graph phase, and every finished task's
+# queue and execution times are taken from its listing, see telemetry.py
+
+ACTIVE_STATES = ('UNSUBMITTED', 'READY', 'RUNNING', 'CANCEL_REQUESTED')
+DONE_STATES = ('COMPLETED', 'FAILED', 'CANCELLED')
+
+
+class TaskFailed(Exception):
+  pass
+
+
+# event names for the task states
+EVENTS = {'RUNNING': 'running', 'COMPLETED': 'completed', 'FAILED': 'failed', 'CANCELLED': 'cancelled'}
+
+# polling interval in seconds, doubled while tasks sit in READY/RUNNING
+min_interval = 2
+max_interval = 60
+backoff = 2
+# attempts at a task listing before the monitor gives up
+listing_retries = 5
+
+
+class EEBackend:
+  # talks to Earth Engine, one task listing per tick
+  def start(self, task):
+    task.start()
+    return task.id
+
+  def states(self, ids):
+    wanted = set(ids)
+    found = {}
+    for entry in ee.data.getTaskList():
+      if entry['id'] in wanted:
+        found[entry['id']] = entry
+    return found
+
+  def cancel(self, task_id):
+    ee.data.cancelTask(task_id)
+
+
+class FakeTask:
+  # stand-in for ee.batch.Task, finishes after `ticks` listings; a failing
+  # task with retries left is retried by a task that succeeds
+  def __init__(self, description, ticks=3, fail=False, retries=0):
+    self.id = None
+    self.config = {'description': description}
+    self.ticks = ticks
+    self.fail = fail
+    self.retries = retries
+
+  def retry(self):
+    if self.retries <= 0:
+      return None
+    return FakeTask(self.config['description'], self.ticks, False, self.retries - 1)
+
+
+class FakeBackend:
+  # offline backend, every states() call counts as one listing round trip;
+  # tasks other than FakeTask (e.g. a product's export.Export) complete
+  # after 3 listings
+  def __init__(self):
+    self.tasks = {}
+    self.list_calls = 0
+    self.cancelled = []
+    self._ids = itertools.count(1)
+
+  def start(self, task):
+    task.id = 'FAKE%04d' % next(self._ids)
+    self.tasks[task.id] = {'task': task, 'state': 'READY', 'age': 0, 'created': int(time.time() * 1000)}
+    return task.id
+
+  def states(self, ids):
+    self.list_calls += 1
+    found = {}
+    for task_id in ids:
+      entry = self.tasks[task_id]
+      if entry['state'] in ('READY', 'RUNNING'):
+        entry['age'] += 1
+        entry['state'] = 'RUNNING'
+        entry.setdefault('started', int(time.time() * 1000))
+        if entry['age'] >= getattr(entry['task'], 'ticks', 3):
+          entry['state'] = 'FAILED' if getattr(entry['task'], 'fail', False) else 'COMPLETED'
+        entry['updated'] = int(time.time() * 1000)
+      found[task_id] = {'id': task_id,
+        'description': entry['task'].config['description'],
+        'state': entry['state'],
+        'creation_timestamp_ms': entry['created'],
+        'start_timestamp_ms': entry.get('started'),
+        'update_timestamp_ms': entry.get('updated')}
+    return found
+
+  def cancel(self, task_id):
+    self.cancelled.append(task_id)
+    self.tasks[task_id]['state'] = 'CANCELLED'
+
+
+class Monitor:
+  def __init__(self, backend=None, sleep=asyncio.sleep, log=None, events=None):
+    self.backend = backend if backend is not None else EEBackend()
+    self.sleep = sleep
+    self.log = log
+    self.events = events
+    self.windows = []
+    self.reserved = 0
+    self.interval = min_interval
+    self._poller = None
+    self._freed = None
+
+  def _log(self, message):
+    if self.log is not None:
+      print(message, file=self.log)
+
+  def _event(self, window, name, task_id, **fields):
+    if self.events is None:
+      return
+    task = window.task(task_id)
+    event = dict(window.context, event=name, task_id=task_id, description=task.config['description'], time=time.time())
+    if name == 'completed':
+      event['files'] = getattr(task, 'files', [])
+    event.update(fields)
+    self.events(event)
+
+  # number of tracked tasks that are still queued or running
+  def active(self):
+    return self.reserved + sum(window.active() for window in self.windows)
+
+  # start all tasks at once rather than one task.start() after another
+  async def start(self, tasks):
+    return await asyncio.gather(*[asyncio.to_thread(self.backend.start, task) for task in tasks])
+
+  async def cancel(self, ids):
+    await asyncio.gather(*[asyncio.to_thread(self.backend.cancel, task_id) for task_id in ids])
+
+  # wait until n more tasks fit within max_tasks, then hold room for them
+  async def reserve(self, n, max_tasks=None):
+    if self._freed is None:
+      self._freed = asyncio.Condition()
+    async with self._freed:
+      await self._freed.wait_for(lambda: max_tasks is None or self.active() == 0 or self.active() + n <= max_tasks)
+      self.reserved += n
+
+  # start the tasks and wait for them, True once every task is COMPLETED,
+  # False as soon as one fails for good (the others are cancelled); every
+  # watched window is polled by the same loop, one task listing per tick.
+  # With a limit only that many tasks of the window run at once, the rest
+  # are started as the first ones finish
+  async def watch(self, tasks, reserved=0, limit=None, context=None):
+    window = _Window(tasks[:limit] if limit else tasks)
+    window.pending = list(tasks[len(window.tasks):])
+    window.limit = limit
+    window.context = context or {}
+    try:
+      window.ids = await self.start(window.tasks)
+    finally:
+      self.reserved -= reserved
+    if not window.ids:
+      return True
+    window.states = dict.fromkeys(window.ids, 'READY')
+    for task_id in window.ids:
+      self._event(window, 'submitted', task_id)
+    window.done = asyncio.get_running_loop().create_future()
+    self.windows.append(window)
+    self.interval = min_interval
+    if self._poller is None or self._poller.done():
+      self._poller = asyncio.create_task(self._poll())
+    return await window.done
+
+  # the polling loop; an error it cannot recover from fails every watched
+  # window with it instead of leaving their callers waiting
+  async def _poll(self):
+    try:
+      await self._loop()
+    except Exception as error:
+      await self._fail_all(error)
+
+  async def _loop(self):
+    while self.windows:
+      await self.sleep(self.interval)
+      ids = [task_id for window in self.windows for task_id in window.ids]
+      found = await self._list(ids)
+      changed = False
+      for window in list(self.windows):
+        for task_id in list(window.ids):
+          state = found.get(task_id, {}).get('state', window.states[task_id])
+          if state != window.states[task_id]:
+            self._log(task_id + ' ' + state)
+            window.states[task_id] = state
+            changed = True
+            if state in EVENTS:
+              self._event(window, EVENTS[state], task_id)
+            if state in DONE_STATES and task_id in found:
+              telemetry.task(found[task_id], **telemetry.window_labels(window.context))
+            if state == 'COMPLETED':
+              await self._completed(window.task(task_id))
+            elif state == 'FAILED':
+              await self._retry(window, task_id)
+        states = window.states.values()
+        if any(state in ('FAILED', 'CANCELLED') for state in states):
+          await self.cancel([i for i in window.ids if window.states[i] in ACTIVE_STATES])
+          self.windows.remove(window)
+          window.done.set_result(False)
+        elif all(state == 'COMPLETED' for state in states) and not window.pending:
+          self.windows.remove(window)
+          window.done.set_result(True)
+        elif window.pending and self.active() < window.limit:
+          await self._start_pending(window)
+      if changed and self._freed is not None:
+        async with self._freed:
+          self._freed.notify_all()
+      # back off while nothing moves, go back to the short interval on progress
+      if changed:
+        self.interval = min_interval
+      else:
+        self.interval = min(self.interval * backoff, max_interval)
+
+  # one task listing, retried with backoff so a transient error of
+  # getTaskList does not stop every window
+  async def _list(self, ids):
+    for attempt in range(listing_retries):
+      try:
+        return await asyncio.to_thread(self.backend.states, ids)
+      except Exception as error:
+        if attempt == listing_retries - 1:
+          raise
+        self._log('task listing failed, retrying: ' + repr(error))
+        await self.sleep(min_interval * backoff ** attempt)
+
+  async def _fail_all(self, error):
+    windows, self.windows = self.windows, []
+    for window in windows:
+      if not window.done.done():
+        window.done.set_exception(error)
+    if self._freed is not None:
+      async with self._freed:
+        self._freed.notify_all()
+
+  # a failed task that can be retried (task.retry() returns a new task) is
+  # replaced by its retry, only that task runs again
+  async def _retry(self, window, task_id):
+    hook = getattr(window.task(task_id), 'retry', None)
+    task = await asyncio.to_thread(hook) if hook is not None else None
+    if task is None:
+      return
+    new_id = (await self.start([task]))[0]
+    self._log(task_id + ' retried as ' + new_id)
+    i = window.ids.index(task_id)
+    window.tasks[i] = task
+    window.ids[i] = new_id
+    del window.states[task_id]
+    window.states[new_id] = 'READY'
+    self._event(window, 'submitted', new_id, retry_of=task_id)
+
+  async def _start_pending(self, window):
+    tasks = window.pending[:window.limit - self.active()]
+    window.pending = window.pending[len(tasks):]
+    ids = await self.start(tasks)
+    window.tasks += tasks
+    window.ids += ids
+    window.states.update(dict.fromkeys(ids, 'READY'))
+    for task_id in ids:
+      self._event(window, 'submitted', task_id)
+
+  # exports can hook the end of their task, e.g. to stamp their outputs
+  async def _completed(self, task):
+    hook = getattr(task, 'completed', None)
+    if hook is not None:
+      await asyncio.to_thread(hook)
+
+  async def run(self, tasks, limit=None):
+    return await self.watch(tasks, limit=limit)
+
+  # build, start and wait for one window, done(manifest, ok) is called when
+  # it finishes; a window with more tasks than max_tasks starts them in turn.
+  # A window that cannot be built or watched fails on its own, done() gets
+  # the job's context (see Job) with the error and the other windows go on
+  async def run_job(self, job, max_tasks=None, done=None):
+    manifest = dict(getattr(job, 'context', {}))
+    try:
+      tasks, manifest = await asyncio.to_thread(build, job)
+      n = min(len(tasks), max_tasks) if max_tasks else len(tasks)
+      await self.reserve(n, max_tasks)
+      context = {key: manifest[key] for key in ('subject', 'window_start', 'window_end') if key in manifest}
+      ok = await self.watch(tasks, n, max_tasks, context)
+    except Exception as error:
+      self._log(traceback.format_exc())
+      manifest = dict(manifest, error=repr(error))
+      ok = False
+    if self.events is not None:
+      self.events(dict(manifest, event='summary', ok=ok, time=time.time()))
+    if done is not None:
+      done(manifest, ok)
+    return ok
+
+  # jobs are callables building one window each, returning (tasks, manifest);
+  # windows are built and started while the number of active tasks stays
+  # within max_tasks, done(manifest, ok) is called as each window finishes
+  async def run_batch(self, jobs, max_tasks=None, done=None):
+    jobs = list(jobs)
+    slots = asyncio.Semaphore(max_tasks or max(len(jobs), 1))
+    async def one(job):
+      async with slots:
+        return await self.run_job(job, max_tasks, done)
+    results = await asyncio.gather(*[one(job) for job in jobs])
+    return all(results)
+
+
+class Job:
+  # one window for run_job: calling it builds the window's (tasks, manifest),
+  # the context names the window when building it fails
+  def __init__(self, build, subject, window):
+    self.build = build
+    self.context = {'subject': subject, 'window_start': window[0], 'window_end': window[1]}
+
+  def __call__(self):
+    return self.build()
+
+
+class _Window:
+  # the export tasks of one window
+  def __init__(self, tasks):
+    self.tasks = list(tasks)
+    self.ids = []
+    self.states = {}
+    self.done = None
+    self.pending = []
+    self.limit = None
+    self.context = {}
+
+  def active(self):
+    return sum(1 for state in self.states.values() if state in ACTIVE_STATES)
+
+  def task(self, task_id):
+    return self.tasks[self.ids.index(task_id)]
+
+
+# build one window, timed as its graph phase and labelled with its product
+# and window length once the manifest is known; the asset exports stored
+# while building it (composites, models) are tasks of the window
+def build(job):
+  with telemetry.span('graph') as found, assets.collect() as stored:
+    tasks, manifest = job()
+    found.labels.update(telemetry.window_labels(manifest))
+  return list(tasks) + stored, manifest
+
+
+# blocking helper for the scripts
+def wait(tasks, backend=None, limit=None):
+  return asyncio.run(Monitor(backend).run(tasks, limit))
+
+
+# build and wait for one window of a product, returns its manifest;
+# config['max_tasks'] caps the tasks running at once
+def run_exports(exports, window, config):
+  tasks, manifest = build(lambda: exports(window, config))
+  if not wait(tasks, config.get('backend'), config.get('max_tasks')):
+    raise TaskFailed('at least one of the tasks failed for ' + manifest['subject'] + ' ' + window[0] + ' ' + window[1])
+  return manifest
+
+
+def wait_batch(jobs, max_tasks=None, done=None, backend=None, events=None):
+  return asyncio.run(Monitor(backend, events=events).run_batch(jobs, max_tasks, done))
+
+
+if __name__ == '__main__':
+  # offline run against the fake backend
+  backend = FakeBackend()
+  tasks = [FakeTask('shp', 2), FakeTask('mask', 4), FakeTask('s2', 6, fail='--fail' in sys.argv)]
+  async def no_sleep(seconds):
+    pass
+  ok = asyncio.run(Monitor(backend, sleep=no_sleep, log=sys.stderr).run(tasks))
+  print('completed' if ok else 'failed', backend.list_calls, 'listings')
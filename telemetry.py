@@ -0,0 +1,239 @@
+import argparse
+import contextlib
+import contextvars
+import datetime
+import fcntl
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+# where a run's wall time goes
+#
+# every run records spans for its phases: `initialize` (importing ee and
+# ee.Initialize), `graph` (building one window of a product, its blocking
+# statistics included), `getinfo` (each blocking getInfo through the stat
+# cache), and per export task `queue` (created to started) and `execution`
+# (started to its last update), both from the timestamps of the task
+# listing. Spans are labelled with the product and the window length in
+# days; spans opened while a window is built take its labels. At the end of
+# a run the spans are added to a Prometheus textfile (SURFSIDE_METRICS_FILE)
+# as the cumulative histogram surfside_phase_seconds, with its running
+# totals kept in <file>.state.json, and appended as one OTLP JSON trace line
+# to SURFSIDE_OTLP_FILE. --report gives p50/p95 per phase, product and
+# window length from the histogram:
+#
+#   SURFSIDE_METRICS_FILE=/var/lib/node_exporter/surfside.prom python coastline.py --monthly 2023-01 2023-06
+#   python telemetry.py --report /var/lib/node_exporter/surfside.prom
+
+metrics_file = os.environ.get('SURFSIDE_METRICS_FILE')
+otlp_file = os.environ.get('SURFSIDE_OTLP_FILE')
+
+metric = 'surfside_phase_seconds'
+# labels of the histogram, the OTLP spans also carry the task labels
+metric_labels = ('phase', 'product', 'window_days')
+# upper bounds in seconds, from a cached getInfo to a long export
+buckets = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+
+trace_id = '%032x' % random.getrandbits(128)
+
+_spans = []
+_lock = threading.Lock()
+_current = contextvars.ContextVar('surfside_span', default=None)
+
+
+class Span:
+  def __init__(self, name, start, labels=None, parent=None):
+    self.name = name
+    self.start = start
+    self.end = None
+    self.labels = dict(labels or {})
+    self.parent = parent
+    self.id = '%016x' % random.getrandbits(64)
+
+  # the enclosing spans' labels under its own, read when the run is written
+  # so a window's labels reach the spans opened before they were known
+  def all_labels(self):
+    found = self.parent.all_labels() if self.parent is not None else {}
+    found.update(self.labels)
+    return found
+
+
+def _add(found):
+  with _lock:
+    _spans.append(found)
+
+
+@contextlib.contextmanager
+def span(name, **labels):
+  found = Span(name, time.time(), labels, _current.get())
+  token = _current.set(found)
+  try:
+    yield found
+  finally:
+    _current.reset(token)
+    found.end = time.time()
+    _add(found)
+
+
+# a span whose times are known, e.g. from the task listing
+def record(name, start, end, **labels):
+  found = Span(name, start, labels, _current.get())
+  found.end = end
+  _add(found)
+
+
+# product and window length labels from a manifest or the monitor's window context
+def window_labels(manifest):
+  if 'window_start' not in manifest:
+    return {}
+  start = datetime.date.fromisoformat(manifest['window_start'])
+  end = datetime.date.fromisoformat(manifest['window_end'])
+  return {'product': manifest['subject'], 'window_days': str((end - start).days + 1)}
+
+
+# queue and execution spans of a finished export task from its listing entry
+def task(entry, **labels):
+  created = entry.get('creation_timestamp_ms')
+  started = entry.get('start_timestamp_ms')
+  updated = entry.get('update_timestamp_ms')
+  labels = dict(labels, task_id=entry['id'], description=entry.get('description', ''), state=entry['state'])
+  if created and started:
+    record('queue', created / 1000, started / 1000, **labels)
+  if started and updated:
+    record('execution', started / 1000, updated / 1000, **labels)
+
+
+def _escape(value):
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+  pairs = ['%s="%s"' % (name, _escape(value)) for name, value in zip(names, values)]
+  return '{' + ','.join(pairs + ([extra] if extra else [])) + '}'
+
+
+# add the spans to the histogram state and rewrite the textfile from it;
+# the textfile is replaced in one rename so the collector never reads half
+def write_prometheus(path, spans):
+  with open(path + '.state.json', 'a+') as f:
+    fcntl.flock(f, fcntl.LOCK_EX)
+    f.seek(0)
+    text = f.read()
+    state = json.loads(text) if text.strip() else {}
+    for found in spans:
+      labels = dict(found.all_labels(), phase=found.name)
+      key = json.dumps([labels.get(name, '') for name in metric_labels])
+      entry = state.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+      seconds = max(found.end - found.start, 0.0)
+      for i, bound in enumerate(buckets):
+        if seconds <= bound:
+          entry['buckets'][i] += 1
+      entry['sum'] += seconds
+      entry['count'] += 1
+    f.seek(0)
+    f.truncate()
+    json.dump(state, f)
+    lines = ['# HELP %s Wall time of the phases of a surfside run.' % metric, '# TYPE %s histogram' % metric]
+    for key in sorted(state):
+      values = json.loads(key)
+      entry = state[key]
+      for bound, count in zip(buckets, entry['buckets']):
+        lines.append('%s_bucket%s %d' % (metric, _labels(metric_labels, values, 'le="%g"' % bound), count))
+      lines.append('%s_bucket%s %d' % (metric, _labels(metric_labels, values, 'le="+Inf"'), entry['count']))
+      lines.append('%s_sum%s %r' % (metric, _labels(metric_labels, values), round(entry['sum'], 6)))
+      lines.append('%s_count%s %d' % (metric, _labels(metric_labels, values), entry['count']))
+    partial = path + '.tmp'
+    with open(partial, 'w') as out:
+      out.write('\n'.join(lines) + '\n')
+    os.replace(partial, path)
+
+
+def _value(value):
+  return {'stringValue': str(value)}
+
+
+# one OTLP JSON ExportTraceServiceRequest per line, as read by the
+# collector's otlpjsonfile receiver
+def write_otlp(path, spans):
+  found = []
+  for s in spans:
+    entry = {
+      'traceId': trace_id,
+      'spanId': s.id,
+      'name': s.name,
+      'kind': 1,
+      'startTimeUnixNano': str(int(s.start * 1e9)),
+      'endTimeUnixNano': str(int(s.end * 1e9)),
+      'attributes': [{'key': key, 'value': _value(value)} for key, value in sorted(s.all_labels().items())]
+    }
+    if s.parent is not None:
+      entry['parentSpanId'] = s.parent.id
+    found.append(entry)
+  request = {'resourceSpans': [{
+    'resource': {'attributes': [{'key': 'service.name', 'value': _value('surfside')}]},
+    'scopeSpans': [{'scope': {'name': 'surfside'}, 'spans': found}]
+  }]}
+  with open(path, 'a') as f:
+    f.write(json.dumps(request) + '\n')
+
+
+# write the spans recorded so far and forget them, called at the end of a
+# run (and after every job of the worker)
+def flush(metrics=None, otlp=None):
+  metrics = metrics or metrics_file
+  otlp = otlp or otlp_file
+  with _lock:
+    spans = [s for s in _spans if s.end is not None]
+    _spans[:] = []
+  if not spans:
+    return
+  if metrics:
+    write_prometheus(metrics, spans)
+  if otlp:
+    write_otlp(otlp, spans)
+
+
+# p50 and p95 of every series from the histogram state, interpolated within
+# a bucket like histogram_quantile()
+def quantile(q, counts, total):
+  rank = q * total
+  lower = 0.0
+  previous = 0
+  for bound, count in zip(buckets, counts):
+    if count >= rank:
+      if count == previous:
+        return bound
+      return lower + (bound - lower) * (rank - previous) / (count - previous)
+    lower = bound
+    previous = count
+  return buckets[-1]
+
+
+def report(path):
+  with open(path + '.state.json') as f:
+    state = json.load(f)
+  found = []
+  for key in sorted(state):
+    entry = state[key]
+    if not entry['count']:
+      continue
+    series = dict(zip(metric_labels, json.loads(key)))
+    series.update(count=entry['count'],
+      mean=round(entry['sum'] / entry['count'], 3),
+      p50=round(quantile(0.5, entry['buckets'], entry['count']), 3),
+      p95=round(quantile(0.95, entry['buckets'], entry['count']), 3))
+    found.append(series)
+  return found
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('--report', metavar='PROM_FILE', default=metrics_file, help='the textfile written by the runs')
+  args = p.parse_args(sys.argv[1:])
+  if not args.report:
+    p.error('no metrics file, give --report or set SURFSIDE_METRICS_FILE')
+  for series in report(args.report):
+    print(json.dumps(series))
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+rasterio = pytest.importorskip('rasterio')
+from rasterio.transform import from_origin
+
+import changedetect
+import localstats
+
+transform = from_origin(-70.0, 12.5, 0.001, 0.001)
+
+
+def write(path, data):
+  with rasterio.open(path, 'w', driver='GTiff', width=data.shape[1], height=data.shape[0], count=1, dtype='uint8',
+      nodata=255, crs='EPSG:4326', transform=transform) as dst:
+    dst.write(data, 1)
+
+
+def test_change_codes_and_areas(tmp_path):
+  before = np.ones((8, 6), dtype=np.uint8) # water
+  before[:, 3:] = 0 # land on the right half
+  after = before.copy()
+  after[0:2, 0:2] = 0 # land gained on the left
+  after[6:8, 4:6] = 1 # land lost on the right
+  after[4, :] = 255 # no data
+  before[5, 0] = 255
+  third = after.copy()
+  masks = [str(tmp_path / ('mask%d.tif' % i)) for i in range(3)]
+  for path, data in zip(masks, (before, after, third)):
+    write(path, data)
+  # the left half, in map coordinates
+  region = [[[-70.0, 12.5], [-69.997, 12.5], [-69.997, 12.492], [-70.0, 12.492], [-70.0, 12.5]]]
+  summary = changedetect.detect(masks, str(tmp_path / 'out'), regions=[('R1', region)], workers=2, rows=3)
+  with open(str(tmp_path / 'out' / 'summary.json')) as f:
+    assert json.load(f) == summary
+  first, second = summary['pairs']
+
+  with rasterio.open(str(tmp_path / 'out' / first['change'])) as src:
+    change = src.read(1)
+  expected = np.zeros((8, 6), dtype=np.uint8)
+  expected[0:2, 0:2] = 1
+  expected[6:8, 4:6] = 2
+  expected[4, :] = 255
+  expected[5, 0] = 255
+  assert (change == expected).all()
+
+  areas = localstats.row_areas(transform, 0, 8)
+  gained = 2 * (areas[0] + areas[1]) / 10000
+  lost = 2 * (areas[6] + areas[7]) / 10000
+  assert first['gained_ha'] == pytest.approx(gained, abs=1e-4)
+  assert first['lost_ha'] == pytest.approx(lost, abs=1e-4)
+  # the gain is in the region, the loss outside it
+  assert first['regions']['R1']['gained_ha'] == pytest.approx(gained, abs=1e-4)
+  assert first['regions']['R1']['lost_ha'] == 0
+  # nothing changed between the last two masks
+  assert (second['gained_ha'], second['lost_ha']) == (0, 0)
+
+
+def test_grids_must_match(tmp_path):
+  write(str(tmp_path / 'a.tif'), np.zeros((4, 4), dtype=np.uint8))
+  write(str(tmp_path / 'b.tif'), np.zeros((4, 5), dtype=np.uint8))
+  with pytest.raises(ValueError):
+    changedetect.pair(str(tmp_path / 'a.tif'), str(tmp_path / 'b.tif'), str(tmp_path / 'c.tif'))
@@ -0,0 +1,27 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+rasterio = pytest.importorskip('rasterio')
+from rasterio.transform import from_origin
+
+import cog
+
+
+def test_masked_pixels_get_the_product_nodata(tmp_path):
+  source = str(tmp_path / 'seafloorCover_2023-01-01_2023-12-31.tif')
+  classes = np.zeros((32, 32), dtype=np.uint8)
+  classes[:, 16:] = 3
+  valid = np.full((32, 32), 255, dtype=np.uint8)
+  valid[:4] = 0
+  with rasterio.open(source, 'w', driver='GTiff', width=32, height=32, count=1, dtype='uint8',
+      crs='EPSG:4326', transform=from_origin(-70.04, 12.52, 0.0001, 0.0001)) as dst:
+    dst.write(classes, 1)
+    dst.write_mask(valid)
+  target = cog.convert(source, str(tmp_path / 'cog.tif'))
+  with rasterio.open(target) as src:
+    assert src.nodata == 255
+    data = src.read(1)
+  assert (data[:4] == 255).all()
+  assert (data[4:, :16] == 0).all()
+  assert (data[4:, 16:] == 3).all()
+  assert not (tmp_path / 'cog.tif.nodata.tif').exists()
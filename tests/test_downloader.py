@@ -0,0 +1,24 @@
+import os
+
+import buckets
+import downloader
+
+
+# objects with the same content share one cache entry and must not be fetched into it twice at once
+def test_identical_objects(tmp_path):
+  data = os.urandom(3 * 1024 * 1024)
+  names = ['2023-0%d-01_w/shape.prj' % n for n in range(1, 7)] + ['other.tif']
+  for name in names:
+    path = tmp_path / 'buckets' / 'surfsidegis' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data if name != 'other.tif' else data[::-1])
+  bucket = buckets.LocalBucket('surfsidegis', str(tmp_path / 'buckets'))
+  d = downloader.Downloader(bucket, str(tmp_path / 'cache'), workers=8, chunk=50 * 1024)
+  manifests = [{'files': [{'type': 'shapefile', 'filename': name}]} for name in names]
+  report = d.fetch_all(manifests, str(tmp_path / 'out'))
+  assert report['files'] == 7
+  assert report['bytes'] == 2 * len(data)
+  for name in names:
+    assert (tmp_path / 'out' / name).read_bytes() == (data if name != 'other.tif' else data[::-1])
+  assert sorted(os.listdir(tmp_path / 'cache')) == sorted([downloader.md5_file(str(tmp_path / 'out' / names[0])), downloader.md5_file(str(tmp_path / 'out' / 'other.tif'))])
+  assert d.fetch_all(manifests, str(tmp_path / 'again'))['cached'] == 7
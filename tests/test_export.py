@@ -0,0 +1,36 @@
+import asyncio
+
+import buckets
+import export
+import taskmonitor
+
+
+async def no_sleep(seconds):
+  pass
+
+
+# product exports run offline against the fake backend, which sets their ids
+def test_fake_backend_runs_exports(tmp_path):
+  bucket = buckets.LocalBucket('surfsidegis', str(tmp_path))
+  prefix = '2023-03-01_2023-03-31/coastline_mask2023-03-01_2023-03-31'
+  task = export.Export(taskmonitor.FakeTask('coastline_mask', 2), bucket, prefix, 'abc', export.files(prefix, 'GeoTIFF'))
+  path = tmp_path / 'surfsidegis' / (prefix + '.tif')
+  path.parent.mkdir(parents=True)
+  path.write_bytes(b'tif')
+  backend = taskmonitor.FakeBackend()
+  assert asyncio.run(taskmonitor.Monitor(backend, sleep=no_sleep).run([task]))
+  assert task.id == 'FAKE0001'
+  assert bucket.get_metadata(prefix + '.tif') == {export.fingerprint_key: 'abc'}
+
+
+# the unsharded prefix does not take the shards of the same image, nor the other way round
+def test_outputs_match_exact_names(tmp_path):
+  bucket = buckets.LocalBucket('surfsidegis', str(tmp_path))
+  prefix = 'w/rifS2_w'
+  names = [prefix + '.tif', prefix + '-0000000000-0000000000.tif', prefix + '_r00c00.tif', prefix + '_r00c01.tif', prefix + 'x.tif']
+  for name in names:
+    path = tmp_path / 'surfsidegis' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'tif')
+  assert sorted(export.outputs(bucket, prefix)) == sorted(names[:2])
+  assert sorted(export.outputs(bucket, prefix + '_r00c00')) == [prefix + '_r00c00.tif']
@@ -0,0 +1,42 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import incremental
+import localcomposite
+import localindex
+
+
+def scenes(tmp_path, n=7, shape=(2, 5, 4)):
+  rng = np.random.default_rng(0)
+  paths = []
+  for i in range(n):
+    data = rng.uniform(0, 4000, shape).astype(np.float32)
+    data[:, 0, 0] = np.nan
+    path = str(tmp_path / ('scene%d.npy' % i))
+    np.save(path, data)
+    localindex.write_meta(path, {'bands': ['B3', 'B8'], 'nodata': None, 'date': '2023-%02d-15' % (i % 3 + 1)})
+    paths.append(path)
+  return paths
+
+
+def test_median_within_half_a_bin(tmp_path):
+  paths = scenes(tmp_path)
+  state = str(tmp_path / 'state')
+  incremental.init(state, paths[0], 0, 4000, 64)
+  assert len(incremental.ingest(state, paths)) == len(paths)
+  assert incremental.ingest(state, paths) == []
+  target = str(tmp_path / 'median.npy')
+  assert incremental.median(state, target, ('2023-01-01', '2023-03-31')) == 3
+  found = incremental.check(state, target, paths, ('2023-01-01', '2023-03-31'))
+  assert 0 < found['max_error'] <= found['bound']
+  assert np.isnan(np.load(target)[:, 0, 0]).all()
+
+
+def test_chunked_composite_matches_naive(tmp_path):
+  paths = scenes(tmp_path)
+  chunked = str(tmp_path / 'chunked.npy')
+  exact = str(tmp_path / 'exact.npy')
+  localcomposite.composite(paths, chunked, workers=2, budget_mb=0.0001)
+  localcomposite.naive(paths, exact)
+  np.testing.assert_array_equal(np.load(chunked), np.load(exact))
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import incremental
+import localcomposite
+import localindex
+
+fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def write(path, part):
+  values = np.array([[np.nan if v is None else v for v in row] for row in part['values']], dtype=np.float64)
+  np.save(path, values[:, None, :])
+  localindex.write_meta(path, {'bands': part['bands'], 'nodata': None})
+
+
+# goldens worked out by hand from the EE functions, see their comments
+@pytest.mark.parametrize('profile', ['mangroves', 'reefislands', 'seafloor'])
+def test_matches_golden(tmp_path, profile):
+  with open(os.path.join(fixtures, profile + '_golden.json')) as f:
+    fixture = json.load(f)
+  scene = str(tmp_path / 'scene.npy')
+  golden = str(tmp_path / 'golden.npy')
+  target = str(tmp_path / 'out.npy')
+  write(scene, fixture['scene'])
+  write(golden, fixture['golden'])
+  localindex.process(profile, scene, target, workers=1)
+  assert localindex.check(target, golden) == {}
+
+
+def test_division_by_zero_is_zero():
+  a = np.array([1.0, 0.0, -1.0, 2.0])
+  b = np.array([0.0, 0.0, 1.0, 2.0])
+  assert localindex.divide(a, b).tolist() == [0.0, 0.0, -1.0, 1.0]
+  nd = localindex.normalized_difference(a, b)
+  assert nd[0] == 1.0 and nd[1] == 0.0 and np.isnan(nd[2]) and nd[3] == 0.0
+
+
+# the outputs keep the scenes' dates, so they can be composited by window
+def test_outputs_feed_the_composites(tmp_path):
+  rng = np.random.default_rng(1)
+  outputs = []
+  for i, date in enumerate(['2023-01-10', '2023-02-10', '2023-04-10']):
+    scene = str(tmp_path / ('scene%d.npy' % i))
+    np.save(scene, rng.uniform(1, 4000, (2, 3, 4)))
+    localindex.write_meta(scene, {'bands': ['B3', 'B8'], 'nodata': None, 'date': date})
+    target = str(tmp_path / ('ndwi%d.npy' % i))
+    localindex.process('coastline', scene, target, workers=1)
+    assert localindex.read_meta(target)['date'] == date
+    outputs.append(target)
+  assert localcomposite.select(outputs, ('2023-01-01', '2023-03-31')) == outputs[:2]
+  state = str(tmp_path / 'state')
+  incremental.init(state, outputs[0], -1, 4000, 64)
+  assert len(incremental.ingest(state, outputs)) == 3
+  assert incremental.months(state, ('2023-01-01', '2023-12-31')) == ['2023-01', '2023-02', '2023-04']
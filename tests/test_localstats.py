@@ -0,0 +1,23 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+rasterio = pytest.importorskip('rasterio')
+from rasterio.transform import from_origin
+
+import localstats
+
+
+def test_stats_and_rss_budget(tmp_path):
+  path = str(tmp_path / 'mask.tif')
+  data = np.zeros((40, 30), dtype=np.uint8)
+  data[:10] = 1
+  data[-1] = 255
+  with rasterio.open(path, 'w', driver='GTiff', width=30, height=40, count=1, dtype='uint8', nodata=255,
+      crs='EPSG:4326', transform=from_origin(-70.04, 12.52, 0.0001, 0.0001)) as dst:
+    dst.write(data, 1)
+  report = localstats.stats(path, workers=2, rows=7)
+  assert report['classes']['1']['pixels'] == 300
+  assert report['classes']['0']['pixels'] == 870
+  # a pixel of 0.0001 degrees is about 11 m on a side this close to the equator
+  assert report['classes']['1']['area_ha'] == pytest.approx(300 * 0.0121, rel=0.03)
+  assert max(report['peak_rss_mb'].values()) < 1024
@@ -0,0 +1,9 @@
+import json
+
+import models
+
+
+def test_report_skips_unreadable_entries(tmp_path):
+  (tmp_path / 'a.json').write_text(json.dumps({'name': 'seafloor_cart', 'seconds': 2.5, 'hits': 2}))
+  (tmp_path / 'b.json').write_text('{"name": "mangrove_rf", ')
+  assert models.report(str(tmp_path)) == {'models': 1, 'reuses': 2, 'seconds_saved': 5.0}
@@ -0,0 +1,25 @@
+import datetime
+
+import session
+
+
+# importing every product must stay within the cold start budget without importing ee
+def test_startup_budget():
+  assert session.startup_time() <= session.startup_budget
+
+
+def test_token_cache(tmp_path, monkeypatch):
+  path = str(tmp_path / 'token.json')
+  monkeypatch.setattr(session, 'token_cache', path)
+  assert session._read_token('sa') is None
+  expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0) + datetime.timedelta(hours=1)
+  session._write_token('sa', 'abc', expiry)
+  assert session._read_token('sa') == ('abc', expiry)
+  assert session._read_token('other') is None
+  session._write_token('sa', 'abc', expiry - datetime.timedelta(hours=1))
+  assert session._read_token('sa') is None
+  # malformed entries are cache misses
+  for text in ('', '[]', '{"account": "sa"}', '{"account": "sa", "token": "abc", "expiry": "soon"}', '{"token": "abc"}'):
+    with open(path, 'w') as f:
+      f.write(text)
+    assert session._read_token('sa') is None
@@ -0,0 +1,38 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+rasterio = pytest.importorskip('rasterio')
+from rasterio.transform import from_origin
+
+import shards
+
+
+def write(path, data, west, north):
+  with rasterio.open(path, 'w', driver='GTiff', width=data.shape[1], height=data.shape[0], count=1, dtype='uint8',
+      nodata=255, crs='EPSG:4326', transform=from_origin(west, north, 0.001, 0.001)) as dst:
+    dst.write(data, 1)
+
+
+# two shards side by side, the second one shorter, read back as one raster
+def test_vrt_mosaic(tmp_path):
+  (tmp_path / 'mangroves').mkdir()
+  left = np.arange(20, dtype=np.uint8).reshape(5, 4)
+  right = np.arange(100, 109, dtype=np.uint8).reshape(3, 3)
+  write(str(tmp_path / 'mangroves' / 'extent_r00c00.tif'), left, -70.0, 12.5)
+  write(str(tmp_path / 'mangroves' / 'extent_r00c01.tif'), right, -69.996, 12.499)
+  entry = {'type': 'mosaic', 'filename': 'mangroves/extent.vrt',
+    'shards': ['mangroves/extent_r00c00.tif', 'mangroves/extent_r00c01.tif']}
+  target = shards.build_vrt(entry, str(tmp_path))
+  with open(target) as f:
+    text = f.read()
+  assert '<DstRect xOff="0" yOff="0" xSize="4" ySize="5"/>' in text
+  assert '<DstRect xOff="4" yOff="1" xSize="3" ySize="3"/>' in text
+  assert 'relativeToVRT="1">extent_r00c01.tif<' in text
+  with rasterio.open(target) as src:
+    assert (src.width, src.height) == (7, 5)
+    assert src.bounds.left == pytest.approx(-70.0) and src.bounds.top == pytest.approx(12.5)
+    data = src.read(1)
+  assert (data[:, :4] == left).all()
+  assert (data[1:4, 4:] == right).all()
+  # outside both shards is nodata
+  assert (data[0, 4:] == 255).all() and (data[4, 4:] == 255).all()
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+import assets
+import taskmonitor
+
+
+async def no_sleep(seconds):
+  pass
+
+
+def run(tasks, limit=None, events=None):
+  backend = taskmonitor.FakeBackend()
+  monitor = taskmonitor.Monitor(backend, sleep=no_sleep, events=events)
+  return asyncio.run(monitor.run(tasks, limit)), backend
+
+
+def test_completes_with_one_listing_per_tick():
+  ok, backend = run([taskmonitor.FakeTask('shp', 2), taskmonitor.FakeTask('mask', 4), taskmonitor.FakeTask('s2', 6)])
+  assert ok
+  assert backend.list_calls == 6
+
+
+def test_failure_cancels_the_others():
+  ok, backend = run([taskmonitor.FakeTask('shp', 2, fail=True), taskmonitor.FakeTask('s2', 6)])
+  assert not ok
+  assert backend.cancelled == ['FAKE0002']
+
+
+def test_limit_and_retry():
+  backend = taskmonitor.FakeBackend()
+  monitor = taskmonitor.Monitor(backend, sleep=no_sleep)
+  peak = []
+  states = backend.states
+  def counting(ids):
+    peak.append(monitor.active())
+    return states(ids)
+  backend.states = counting
+  tasks = [taskmonitor.FakeTask('t%d' % i, 2, fail=(i == 3), retries=(1 if i == 3 else 0)) for i in range(8)]
+  assert asyncio.run(monitor.run(tasks, 3))
+  assert max(peak) <= 3
+  assert len(backend.tasks) == 9
+
+
+def test_events():
+  found = []
+  ok, backend = run([taskmonitor.FakeTask('shp', 2)], events=found.append)
+  assert ok
+  assert [e['event'] for e in found] == ['submitted', 'running', 'completed']
+
+
+def test_batch_summary():
+  found = []
+  jobs = [lambda n=n: ([taskmonitor.FakeTask('a%d' % n, 2)], {'subject': 'coastline', 'window_start': '2023-0%d-01' % n, 'window_end': '2023-0%d-28' % n}) for n in (1, 2)]
+  monitor = taskmonitor.Monitor(taskmonitor.FakeBackend(), sleep=no_sleep, events=found.append)
+  assert asyncio.run(monitor.run_batch(jobs, 1))
+  assert sorted(e['window_start'] for e in found if e['event'] == 'summary') == ['2023-01-01', '2023-02-01']
+
+
+class FlakyBackend(taskmonitor.FakeBackend):
+  # every listing from the second on raises until `failures` have been raised
+  def __init__(self, failures):
+    super().__init__()
+    self.failures = failures
+
+  def states(self, ids):
+    if self.list_calls >= 1 and self.failures > 0:
+      self.failures -= 1
+      raise ConnectionError('listing failed')
+    return super().states(ids)
+
+
+def test_failed_listing_is_retried():
+  backend = FlakyBackend(2)
+  monitor = taskmonitor.Monitor(backend, sleep=no_sleep)
+  assert asyncio.run(asyncio.wait_for(monitor.run([taskmonitor.FakeTask('shp', 3)]), 5))
+  assert backend.failures == 0
+
+
+def test_listing_that_keeps_failing_reaches_the_caller():
+  backend = FlakyBackend(100)
+  monitor = taskmonitor.Monitor(backend, sleep=no_sleep)
+  with pytest.raises(ConnectionError):
+    asyncio.run(asyncio.wait_for(monitor.run([taskmonitor.FakeTask('shp', 3)]), 5))
+
+
+# one window failing to build does not stop the others
+def test_failed_build_fails_only_its_window():
+  def build(n):
+    if n == 2:
+      raise RuntimeError('stats failed')
+    return [taskmonitor.FakeTask('t%d' % n, 2)], {'subject': 'coastline', 'window_start': day(n), 'window_end': day(n)}
+  day = '2023-03-0{}'.format
+  jobs = [taskmonitor.Job(lambda n=n: build(n), 'coastline', (day(n), day(n))) for n in range(1, 5)]
+  finished = []
+  monitor = taskmonitor.Monitor(taskmonitor.FakeBackend(), sleep=no_sleep)
+  assert not asyncio.run(asyncio.wait_for(monitor.run_batch(jobs, 2, lambda manifest, ok: finished.append((manifest, ok))), 5))
+  assert sorted((m['window_start'], ok) for m, ok in finished) == [(day(1), True), (day(2), False), (day(3), True), (day(4), True)]
+  failed = [m for m, ok in finished if not ok][0]
+  assert failed['subject'] == 'coastline' and 'stats failed' in failed['error']
+
+
+# an asset export stored while a window is built is one of its tasks
+def test_asset_exports_are_watched(monkeypatch):
+  monkeypatch.setattr(assets, '_started', set())
+  monkeypatch.setattr(assets, '_active', {'time': time.time(), 'descriptions': set()})
+  def build():
+    assets.store('projects/p/assets/composite', lambda description: taskmonitor.FakeTask(description, 4))
+    return [taskmonitor.FakeTask('shp', 2)], {'subject': 'coastline', 'window_start': '2023-03-01', 'window_end': '2023-03-31'}
+  backend = taskmonitor.FakeBackend()
+  monitor = taskmonitor.Monitor(backend, sleep=no_sleep)
+  assert asyncio.run(monitor.run_job(build))
+  assert sorted(entry['task'].config['description'] for entry in backend.tasks.values()) == ['composite', 'shp']
+  assert backend.list_calls == 4
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import telemetry
+
+
+def spans(*seconds, **labels):
+  found = []
+  for s in seconds:
+    span = telemetry.Span('execution', 1000.0, dict(labels, product='coastline', window_days='31'))
+    span.end = 1000.0 + s
+    found.append(span)
+  return found
+
+
+def series(path):
+  found = {}
+  with open(path) as f:
+    for line in f:
+      if not line.startswith('#'):
+        name, value = line.rsplit(' ', 1)
+        found[name] = float(value)
+  return found
+
+
+def test_prometheus_buckets_are_cumulative_and_merged_across_runs(tmp_path):
+  path = str(tmp_path / 'surfside.prom')
+  telemetry.write_prometheus(path, spans(0.05, 3, 45))
+  telemetry.write_prometheus(path, spans(45, 20000))
+  found = series(path)
+  labels = 'phase="execution",product="coastline",window_days="31"'
+  bucket = lambda le: found['surfside_phase_seconds_bucket{%s,le="%s"}' % (labels, le)]
+  assert bucket('0.1') == 1
+  assert bucket('5') == 2
+  assert bucket('30') == 2
+  assert bucket('60') == 4
+  assert bucket('14400') == 4
+  # the run above the last bound only shows in +Inf and _count
+  assert bucket('+Inf') == 5
+  assert found['surfside_phase_seconds_count{%s}' % labels] == 5
+  assert found['surfside_phase_seconds_sum{%s}' % labels] == pytest.approx(20093.05)
+  counts = [bucket('%g' % bound) for bound in telemetry.buckets]
+  assert counts == sorted(counts)
+
+
+def test_quantile_interpolates_within_a_bucket():
+  counts = [0] * len(telemetry.buckets)
+  # 10 runs in (5, 10], 10 more in (10, 30]
+  for i, bound in enumerate(telemetry.buckets):
+    counts[i] = 10 if bound == 10 else 20 if bound >= 30 else 0
+  assert telemetry.quantile(0.5, counts, 20) == 10
+  assert telemetry.quantile(0.25, counts, 20) == pytest.approx(7.5)
+  assert telemetry.quantile(0.75, counts, 20) == pytest.approx(20)
+  # everything above the last bound
+  assert telemetry.quantile(0.5, [0] * len(telemetry.buckets), 3) == telemetry.buckets[-1]
+
+
+def test_report(tmp_path):
+  path = str(tmp_path / 'surfside.prom')
+  telemetry.write_prometheus(path, spans(0.05, 0.05, 0.05, 3))
+  [found] = telemetry.report(path)
+  assert found['phase'] == 'execution' and found['count'] == 4
+  assert found['p50'] == pytest.approx(0.0667, abs=1e-3)
+
+
+def test_otlp_parent_span_ids(tmp_path, monkeypatch):
+  monkeypatch.setattr(telemetry, '_spans', [])
+  path = str(tmp_path / 'trace.jsonl')
+  with telemetry.span('graph', product='coastline') as graph:
+    with telemetry.span('getinfo'):
+      pass
+    telemetry.record('queue', 1.0, 2.0, task_id='T1')
+  telemetry.write_otlp(path, telemetry._spans)
+  telemetry.write_otlp(path, telemetry._spans)
+  with open(path) as f:
+    lines = [json.loads(line) for line in f]
+  assert len(lines) == 2
+  written = {s['name']: s for s in lines[0]['resourceSpans'][0]['scopeSpans'][0]['spans']}
+  assert 'parentSpanId' not in written['graph']
+  assert written['getinfo']['parentSpanId'] == written['graph']['spanId'] == graph.id
+  assert written['queue']['parentSpanId'] == graph.id
+  assert {'key': 'product', 'value': {'stringValue': 'coastline'}} in written['queue']['attributes']
+  assert written['queue']['traceId'] == telemetry.trace_id
+  assert written['queue']['startTimeUnixNano'] == str(10 ** 9)
@@ -0,0 +1,23 @@
+import pytest
+
+import mangroves
+import tiles
+
+
+def test_grid_and_tolerance():
+  ring = [[0, 0], [0.1, 0], [0.1, 0.1], [0, 0.1], [0, 0]]
+  cells = tiles.grid(ring, 2, 2)
+  assert cells[0] == [0, 0, 0.05, 0.05] and cells[-1] == [0.05, 0.05, 0.1, 0.1]
+  assert tiles.tolerance_ha(ring, 1, 10) == 0
+  # one inner edge each way, 0.1 degrees (about 11.1 km) long, 10 m wide
+  assert tiles.tolerance_ha(ring, 2, 10) == pytest.approx(2 * 11119.5 * 10 / 10000, rel=1e-3)
+
+
+def test_benchmark_fails_beyond_the_tolerance(monkeypatch):
+  extents = {0: 500.0, 4: 500.0}
+  def exports(window, config):
+    return [], {'stats': [{'label': 'Mangrove Extent', 'area_ha': extents[config['extent_tiles']]}]}
+  monkeypatch.setattr(mangroves, 'exports', exports)
+  assert tiles.benchmark(('2022-01-01', '2022-12-31'), 4)['failed'] == {}
+  extents[4] = 500.0 + tiles.tolerance_ha(mangroves.aruba_coords[0], 4, 10) + 1
+  assert tiles.benchmark(('2022-01-01', '2022-12-31'), 4)['failed']['difference_ha'] > 0
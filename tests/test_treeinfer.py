@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+rasterio = pytest.importorskip('rasterio')
+from rasterio.transform import from_origin
+
+import treeinfer
+
+fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+tree = '''n= 100
+
+node), split, n, loss, yval, (yprob)
+      * denotes terminal node
+
+1) root 100 50 0
+  2) B3<=0.5 50 10 0 *
+  3) B3>0.5 50 20 1
+    6) B8<=0.2 20 5 1 *
+    7) B8>0.2 30 5 2 *
+'''
+stump = '''1) root 100 50 0
+  2) B8<=0.5 50 10 2 *
+  3) B8>0.5 50 20 0 *
+'''
+
+
+def test_tree():
+  parsed = treeinfer.Tree.parse(tree, ['B3', 'B8'])
+  assert parsed.depth == 2
+  X = np.array([[0.1, 0.9, 0.9, 0.5], [0.9, 0.1, 0.3, 0.2]])
+  assert parsed.predict(X).tolist() == [0, 1, 2, 0]
+
+
+def test_forest_vote():
+  forest = treeinfer.Forest([treeinfer.Tree.parse(text, ['B3', 'B8']) for text in (tree, tree, stump)])
+  X = np.array([[0.1, 0.9, 0.9], [0.9, 0.1, 0.3]])
+  assert forest.predict(X).tolist() == [0, 1, 2]
+  # one vote each for 1 and 2: ties go to the lowest class
+  tie = treeinfer.Forest([treeinfer.Tree.parse(text, ['B3', 'B8']) for text in (tree, stump)])
+  assert tie.predict(np.array([[0.9], [0.1]])).tolist() == [1]
+
+
+# a composite in EE's export layout (masked pixels 0 in every band, no
+# noData, band descriptions) against the classes the fixture's tree gives
+# by hand, read back through classify() in several blocks
+def test_classify_matches_reference(tmp_path):
+  rng = np.random.default_rng(3)
+  names = ['B2_median', 'B3_median', 'B8_median']
+  data = rng.uniform(0, 0.1, (3, 23, 17))
+  data[:, 5, :4] = 0
+  b2, b3, b8 = data
+  expected = np.where(b3 <= 0.04, np.where(b8 <= 0.02, 1, 3),
+    np.where(b2 <= 0.07, 2, np.where(b8 <= 0.05, 4, 2))).astype(np.uint8)
+  expected[5, :4] = treeinfer.nodata
+  profile = dict(driver='GTiff', width=17, height=23, crs='EPSG:4326', transform=from_origin(-70.04, 12.52, 0.0001, 0.0001))
+  composite = str(tmp_path / 'composite.tif')
+  with rasterio.open(composite, 'w', count=3, dtype='float64', **profile) as dst:
+    dst.write(data)
+    dst.descriptions = tuple(names)
+  reference = str(tmp_path / 'reference.tif')
+  with rasterio.open(reference, 'w', count=1, dtype='uint8', nodata=treeinfer.nodata, **profile) as dst:
+    dst.write(expected, 1)
+  target = str(tmp_path / 'local.tif')
+  treeinfer.classify(os.path.join(fixtures, 'seafloor_explain.json'), composite, target, workers=2, rows=5)
+  assert treeinfer.compare(target, reference) == {'pixels': 23 * 17 - 4, 'mismatched': 0}
+  with rasterio.open(target) as src:
+    assert (src.read(1) == expected).all()
@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+rasterio = pytest.importorskip('rasterio')
+fiona = pytest.importorskip('fiona')
+from rasterio.transform import from_origin
+
+import vectorize
+
+
+def area(ring):
+  return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:]))) / 2
+
+
+# land around a lagoon of one pixel: the land polygon has the lagoon as a hole
+def test_hole_is_an_interior_ring():
+  mask = np.zeros((7, 7), dtype=np.uint8)
+  mask[1:6, 1:6] = 1
+  mask[3, 3] = 0
+  found = sorted(vectorize.polygons(mask, from_origin(0, 7, 1, 1)), key=lambda p: (p[1], -area(p[0]['coordinates'][0])))
+  assert [label for geometry, label in found] == [0, 0, 1]
+  sea, lagoon, land = [geometry['coordinates'] for geometry, label in found]
+  assert [area(ring) for ring in land] == [25, 1]
+  assert [area(ring) for ring in sea] == [49, 25]
+  assert [area(ring) for ring in lagoon] == [1]
+  assert sorted(land[1]) == sorted(lagoon[0])
+
+
+# masked pixels are left out and the shapefile carries the labels; a
+# coastline-sized mask takes well under the seconds an EE export queues for
+def test_shapefile(tmp_path):
+  rng = np.random.default_rng(0)
+  mask = (rng.uniform(size=(400, 500)) > 0.995).astype(np.uint8)
+  mask[:, :250] = 255
+  source = str(tmp_path / 'coastline_mask.tif')
+  with rasterio.open(source, 'w', driver='GTiff', width=500, height=400, count=1, dtype='uint8', nodata=255,
+      crs='EPSG:4326', transform=from_origin(-70.04, 12.52, 0.0001, 0.0001)) as dst:
+    dst.write(mask, 1)
+  target = str(tmp_path / 'coastline_shp.shp')
+  report = vectorize.vectorize(source, target)
+  with fiona.open(target) as src:
+    features = list(src)
+  assert report['polygons'] == len(features)
+  assert report['pixels'] == 200000
+  assert {f['properties']['label'] for f in features} == {0, 1}
+  assert all(x >= -70.04 + 250 * 0.0001 - 1e-9 for f in features for ring in f['geometry']['coordinates'] for x, y in ring)
+  assert report['seconds'] < 5
@@ -0,0 +1,26 @@
+import pytest
+
+import windows
+
+
+def test_parse_window():
+  assert windows.parse_window('2023-01-01:2023-01-31') == ('2023-01-01', '2023-01-31')
+  assert windows.parse_window('2023-01-01,2023-01-31') == ('2023-01-01', '2023-01-31')
+  assert windows.parse_window('2023-01-01 2023-01-31') == ('2023-01-01', '2023-01-31')
+  with pytest.raises(ValueError):
+    windows.parse_window('2023-01-01')
+
+
+def test_month_range():
+  assert windows.month_range('2023-11', '2024-02') == [('2023-11-01', '2023-11-30'), ('2023-12-01', '2023-12-31'),
+    ('2024-01-01', '2024-01-31'), ('2024-02-01', '2024-02-29')]
+  assert windows.month_range('2023-01', '2023-06', 3) == [('2023-01-01', '2023-03-31'), ('2023-04-01', '2023-06-30')]
+
+
+def test_collect(tmp_path):
+  path = tmp_path / 'windows.txt'
+  path.write_text('# comment\n2023-05-01 2023-05-31\n')
+  assert windows.parse(['2023-03-01', '2023-03-31'], None).windows == [('2023-03-01', '2023-03-31')]
+  assert windows.parse([], ('a', 'b')).windows == [('a', 'b')]
+  args = windows.parse(['2023-01-01:2023-01-31', '--windows-file', str(path), '--quarterly', '2023-07', '2023-09'], None)
+  assert args.windows == [('2023-01-01', '2023-01-31'), ('2023-05-01', '2023-05-31'), ('2023-07-01', '2023-09-30')]
@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import jobqueue
+import taskmonitor
+import worker
+
+
+async def short_sleep(seconds):
+  await asyncio.sleep(0)
+
+
+def make_worker(queue, products=None, max_jobs=2):
+  monitor = taskmonitor.Monitor(taskmonitor.FakeBackend(), sleep=short_sleep)
+  return worker.Worker(queue, products or worker.fake_products(), monitor, max_tasks=2, max_jobs=max_jobs, log=open(os.devnull, 'w'))
+
+
+def test_fake_worker(tmp_path):
+  queue = jobqueue.Queue(str(tmp_path / 'jobs.sqlite'))
+  first = queue.put('coastline', ('2023-03-01', '2023-03-31'), location='aruba')
+  second = queue.put('vegetation', ('2023-01-01', '2023-12-31'), kind='stats')
+  asyncio.run(make_worker(queue).serve(once=True))
+  assert queue.get(first)['state'] == 'done'
+  assert queue.get(first)['manifest']['location'] == 'aruba'
+  assert queue.get(second)['state'] == 'done'
+  assert queue.get(second)['manifest']['files'] == []
+
+
+class SlowProduct(worker.FakeProduct):
+  def exports(self, window, config=None):
+    tasks, manifest = super().exports(window, config)
+    for task in tasks:
+      task.ticks = 200
+    return tasks, manifest
+
+
+# a stats job queued while every export slot is busy does not wait for them
+def test_stats_jobs_have_their_own_slots(tmp_path):
+  queue = jobqueue.Queue(str(tmp_path / 'jobs.sqlite'))
+  exports = [queue.put('coastline', ('2023-0%d-01' % n, '2023-0%d-28' % n)) for n in (1, 2)]
+  products = dict(worker.fake_products(), coastline=SlowProduct('coastline'))
+  w = make_worker(queue, products, max_jobs=1)
+
+  async def main():
+    serving = asyncio.create_task(w.serve(once=True))
+    while not w.running:
+      await asyncio.sleep(0)
+    stats = queue.put('reefislands', ('2023-01-01', '2023-01-31'), kind='stats')
+    await serving
+    return stats
+
+  stats = asyncio.run(main())
+  assert queue.get(stats)['finished'] < queue.get(exports[0])['finished']
@@ -0,0 +1,113 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+from session import ee
+
+import areas
+import statcache
+
+# tiled reduceRegion for the island-wide sums
+#
+# one reduceRegion over the whole ROI is a single long synchronous request
+# that sometimes hits "computation timed out". Here the ROI's bounding box is
+# split into a grid, each cell (intersected with the ROI) is reduced in its
+# own getInfo() from a bounded thread pool, failed cells are retried with
+# backoff, and the partial sums are added up. Cells are planar lon/lat
+# rectangles that share edges, so every pixel falls in exactly one cell and the
+# total matches the single call, up to the pixels whose centre lies within
+# the intersection's error of a cell edge. --benchmark allows a band one
+# pixel wide along the inner cell edges and exits non-zero beyond it:
+#
+#   python tiles.py --benchmark 2022-01-01 2022-12-31 --tiles 4
+
+default_tiles = int(os.environ.get('SURFSIDE_EXTENT_TILES', '0'))
+max_workers = int(os.environ.get('SURFSIDE_TILE_WORKERS', '8'))
+retries = 3
+backoff = 2
+
+
+# [west, south, east, north] cells covering the bounds of a polygon ring
+def grid(ring, rows, cols):
+  lons = [lon for lon, lat in ring]
+  lats = [lat for lon, lat in ring]
+  west, east, south, north = min(lons), max(lons), min(lats), max(lats)
+  width = (east - west) / cols
+  height = (north - south) / rows
+  cells = []
+  for row in range(rows):
+    for col in range(cols):
+      cells.append([west + col * width, south + row * height,
+        west + (col + 1) * width, south + (row + 1) * height])
+  return cells
+
+
+def _reduce(image, band, geometry, cell, scale, config):
+  region = ee.Geometry.Rectangle(cell, 'EPSG:4326', False).intersection(geometry, 1)
+  value = image.reduceRegion(reducer=ee.Reducer.sum(),
+    geometry=region,
+    scale=scale,
+    maxPixels=1e13,
+    tileScale=16).get(band)
+  started = time.perf_counter()
+  for attempt in range(1, retries + 1):
+    try:
+      result = statcache.get_info(ee.Number(ee.Algorithms.If(value, value, 0)), config)
+      return result, {'cell': cell, 'seconds': round(time.perf_counter() - started, 3), 'attempts': attempt}
+    except ee.EEException:
+      if attempt == retries:
+        raise
+      time.sleep(backoff ** attempt)
+
+
+# sum of band over geometry, returns (total, per-cell report)
+def reduce_sum(image, band, geometry, cells, scale, config=None, workers=max_workers):
+  with concurrent.futures.ThreadPoolExecutor(min(workers, len(cells))) as pool:
+    results = list(pool.map(lambda cell: _reduce(image, band, geometry, cell, scale, config), cells))
+  return sum(value for value, report in results), [report for value, report in results]
+
+
+# config['extent_tiles'] (or SURFSIDE_EXTENT_TILES) is n for an n x n grid, 0 for one call
+def tile_count(config=None):
+  return int((config or {}).get('extent_tiles', default_tiles))
+
+
+# allowed difference in hectares between the tiled and the single sum: a
+# band one pixel wide along the inner edges of the n x n grid over the ring
+def tolerance_ha(ring, n, scale):
+  west, south, east, north = grid(ring, 1, 1)[0]
+  edges = (n - 1) * (areas.perimeter_m([[west, south], [east, south]]) + areas.perimeter_m([[west, south], [west, north]])) / 2
+  return edges * scale / 10000
+
+
+# the mangrove extent with one reduceRegion and tiled, uncached, with the
+# wall time of each and whether they differ by more than the tolerance
+def benchmark(window, n):
+  import mangroves
+  report = {}
+  for tiles in (0, n):
+    started = time.perf_counter()
+    tasks, manifest = mangroves.exports(window, {'stats_only': True, 'stat_cache': False, 'extent_tiles': tiles})
+    report['tiled' if tiles else 'single'] = {
+      'seconds': round(time.perf_counter() - started, 3),
+      'extent_ha': [s['area_ha'] for s in manifest['stats'] if s['label'] == 'Mangrove Extent'][0],
+      'tiles': manifest.get('extent_tiles', [])
+    }
+  allowed = tolerance_ha(mangroves.aruba_coords[0], n, 10)
+  difference = abs(report['tiled']['extent_ha'] - report['single']['extent_ha'])
+  report['failed'] = {'difference_ha': difference, 'tolerance_ha': allowed} if difference > allowed else {}
+  return report
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('--benchmark', nargs=2, metavar=('START', 'END'), required=True)
+  p.add_argument('--tiles', type=int, default=default_tiles or 4)
+  args = p.parse_args(sys.argv[1:])
+  report = benchmark(tuple(args.benchmark), args.tiles)
+  print(json.dumps(report))
+  if report['failed']:
+    sys.exit(1)
@@ -0,0 +1,186 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import rasterio
+
+import localstats
+
+# local reclassification with the trees of an Earth Engine classifier
+#
+# the explain() output of smileCart / smileRandomForest (or a models.py
+# registry entry holding it) is compiled into flat node arrays: feature
+# index, threshold, left and right child and leaf value. Each tree walks a
+# whole block of pixels with NumPy, one level per step, and the forest
+# takes the majority vote (ties go to the lowest class, like EE). Blocks of
+# the exported GeoTIFF are classified across a process pool:
+#
+#   python treeinfer.py model.json SCsentinelS2_2023-01-01_2023-12-31.tif seafloor_local.tif \
+#     --bands B1_median,B2_median,... --check seafloorCover_2023-01-01_2023-12-31.tif
+#
+# --bands names the file's bands in order when the GeoTIFF carries no band
+# descriptions. --check compares the result with EE's classify() export.
+
+block_rows = 512
+nodata = 255
+
+# "2) B3_median<=0.0521 25 10 1 *": node id, split, n, loss, yval, leaf marker
+line_re = re.compile(r'^\s*(\d+)\)\s+(\S+)\s+\S+\s+\S+\s+(\S+)')
+split_re = re.compile(r'^(.+?)(<=|>)(\S+)$')
+
+
+class Tree:
+  def __init__(self, feature, threshold, left, right, value, depth):
+    self.feature = feature
+    self.threshold = threshold
+    self.left = left
+    self.right = right
+    self.value = value
+    self.depth = depth
+
+  # nodes are numbered like rpart: the children of n are 2n (split <=) and 2n+1 (split >)
+  @classmethod
+  def parse(cls, text, names):
+    nodes = {}
+    for line in text.splitlines():
+      match = line_re.match(line)
+      if match:
+        nodes[int(match.group(1))] = (match.group(2), float(match.group(3)), line.rstrip().endswith('*'))
+    ids = sorted(nodes)
+    index = {node: i for i, node in enumerate(ids)}
+    feature = np.full(len(ids), -1, dtype=np.int32)
+    threshold = np.zeros(len(ids), dtype=np.float64)
+    left = np.arange(len(ids), dtype=np.int32)
+    right = np.arange(len(ids), dtype=np.int32)
+    value = np.array([nodes[node][1] for node in ids])
+    for node in ids:
+      split, yval, leaf = nodes[node]
+      if leaf:
+        continue
+      i = index[node]
+      name, op, limit = split_re.match(nodes[2 * node][0]).groups()
+      feature[i] = names.index(name)
+      threshold[i] = float(limit)
+      left[i] = index[2 * node]
+      right[i] = index[2 * node + 1]
+    return cls(feature, threshold, left, right, value, ids[-1].bit_length() - 1)
+
+  # X is (features, pixels)
+  def predict(self, X):
+    node = np.zeros(X.shape[1], dtype=np.int32)
+    columns = np.arange(X.shape[1])
+    for _ in range(self.depth):
+      feature = self.feature[node]
+      inner = feature >= 0
+      x = X[np.where(inner, feature, 0), columns]
+      node = np.where(inner, np.where(x <= self.threshold[node], self.left[node], self.right[node]), node)
+    return self.value[node]
+
+
+class Forest:
+  def __init__(self, trees):
+    self.trees = trees
+    self.classes = np.unique(np.concatenate([tree.value for tree in trees]))
+
+  def predict(self, X):
+    if len(self.trees) == 1:
+      return self.trees[0].predict(X)
+    votes = np.stack([tree.predict(X) for tree in self.trees])
+    counts = np.stack([(votes == c).sum(axis=0) for c in self.classes])
+    return self.classes[counts.argmax(axis=0)]
+
+
+# the tree strings of an explain() dump or a models.py registry entry
+def tree_texts(entry):
+  if 'tree' in entry:
+    return [entry['tree']]
+  return list(entry['trees'])
+
+
+def load(path, names):
+  with open(path) as f:
+    entry = json.load(f)
+  return Forest([Tree.parse(text, names) for text in tree_texts(entry)])
+
+
+_state = {}
+
+
+def _init(model, source, names):
+  _state['forest'] = load(model, names)
+  _state['source'] = rasterio.open(source)
+
+
+# classified block of rows, masked pixels are nodata; EE writes masked
+# pixels as 0 in every band when the export sets no noData value
+def _classify(window):
+  source = _state['source']
+  data = source.read(window=window, masked=True).astype(np.float64)
+  bands, rows, cols = data.shape
+  X = data.filled(np.nan).reshape(bands, rows * cols)
+  valid = ~np.isnan(X).any(axis=0)
+  if source.nodata is None:
+    valid &= (X != 0).any(axis=0)
+  out = np.full(rows * cols, nodata, dtype=np.uint8)
+  if valid.any():
+    out[valid] = _state['forest'].predict(X[:, valid]).astype(np.uint8)
+  return window, out.reshape(rows, cols)
+
+
+def band_names(source, bands=None):
+  if bands:
+    return bands
+  if all(source.descriptions):
+    return list(source.descriptions)
+  raise ValueError('the GeoTIFF has no band descriptions, pass --bands')
+
+
+def classify(model, source, target, bands=None, workers=None, rows=block_rows):
+  with rasterio.open(source) as src:
+    names = band_names(src, bands)
+    profile = src.profile.copy()
+    height, width = src.height, src.width
+  profile.update(count=1, dtype='uint8', nodata=nodata, compress='deflate')
+  started = time.perf_counter()
+  with rasterio.open(target, 'w', **profile) as dst:
+    with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count(), initializer=_init, initargs=(model, source, names)) as pool:
+      for window, block in pool.map(_classify, localstats.windows(height, width, rows)):
+        dst.write(block, 1, window=window)
+  seconds = time.perf_counter() - started
+  return {'pixels': height * width, 'seconds': round(seconds, 3), 'megapixels_per_second': round(height * width / seconds / 1e6, 3)}
+
+
+# pixels where both rasters have data and the classes differ
+def compare(local, reference, rows=block_rows):
+  found = {'pixels': 0, 'mismatched': 0}
+  with rasterio.open(local) as a, rasterio.open(reference) as b:
+    for window in localstats.windows(a.height, a.width, rows):
+      x = a.read(1, window=window, masked=True)
+      y = b.read(1, window=window, masked=True)
+      both = ~(np.ma.getmaskarray(x) | np.ma.getmaskarray(y))
+      found['pixels'] += int(both.sum())
+      found['mismatched'] += int((x.data[both] != y.data[both]).sum())
+  return found
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('model', help='explain() json or models.py registry entry')
+  p.add_argument('source')
+  p.add_argument('target')
+  p.add_argument('--bands', type=lambda text: text.split(','))
+  p.add_argument('--workers', type=int)
+  p.add_argument('--block-rows', type=int, default=block_rows)
+  p.add_argument('--check', metavar='REFERENCE', help='EE classify() export to compare with')
+  args = p.parse_args(sys.argv[1:])
+  report = classify(args.model, args.source, args.target, args.bands, args.workers, args.block_rows)
+  if args.check:
+    report['check'] = compare(args.target, args.check, args.block_rows)
+  print(json.dumps(report))
+  if args.check and report['check']['mismatched']:
+    sys.exit(1)
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# local reduceToVectors for small masks
+#
+# for a small ROI like the coastline bbox the exported mask is a few
+# thousand pixels, and vectorizing it locally is faster than waiting for the
+# SHP export in the EE task queue. The mask is labelled into 8-connected
+# regions of equal value and their boundaries traced into polygons with
+# holes (GDAL polygonize through rasterio.features.shapes), written as a
+# shapefile with the pixel value in `label` like reduceToVectors(reducer=None).
+# Masked pixels are left out. With config['local_vectors'] (or
+# SURFSIDE_LOCAL_VECTORS=1) coastline.py skips its coastline_shp export and
+# this runs on the downloaded coastline_mask instead. fiona, numpy and
+# rasterio are imported on use so the products can import this module:
+#
+#   python vectorize.py coastline_mask2023-03-01_2023-03-31.tif coastline_shp2023-03-01_2023-03-31.shp
+
+enabled = os.environ.get('SURFSIDE_LOCAL_VECTORS') == '1'
+
+
+def local(config=None):
+  return (config or {}).get('local_vectors', enabled)
+
+
+# (GeoJSON polygon, label) for every connected region of the mask
+def polygons(mask, transform, valid=None, connectivity=8):
+  from rasterio.features import shapes
+  for geometry, value in shapes(mask, mask=valid, transform=transform, connectivity=connectivity):
+    yield geometry, int(value)
+
+
+def vectorize(source, target, band=1):
+  import fiona
+  import numpy as np
+  import rasterio
+  started = time.perf_counter()
+  with rasterio.open(source) as src:
+    data = src.read(band, masked=True)
+    crs = src.crs
+    transform = src.transform
+  mask = data.data.astype(np.uint8)
+  valid = ~np.ma.getmaskarray(data)
+  count = 0
+  schema = {'geometry': 'Polygon', 'properties': {'label': 'int'}}
+  with fiona.open(target, 'w', driver='ESRI Shapefile', crs=crs, schema=schema) as dst:
+    for polygon, label in polygons(mask, transform, valid):
+      dst.write({'geometry': polygon, 'properties': {'label': label}})
+      count += 1
+  seconds = time.perf_counter() - started
+  pixels = mask.shape[0] * mask.shape[1]
+  return {'polygons': count, 'pixels': pixels, 'seconds': round(seconds, 3),
+    'megapixels_per_second': round(pixels / max(seconds, 1e-9) / 1e6, 3)}
+
+
+if __name__ == '__main__':
+  p = argparse.ArgumentParser()
+  p.add_argument('source', help='binary mask GeoTIFF')
+  p.add_argument('target', help='shapefile to write')
+  p.add_argument('--band', type=int, default=1)
+  args = p.parse_args(sys.argv[1:])
+  print(json.dumps(vectorize(args.source, args.target, args.band)))
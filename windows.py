@@ -0,0 +1,140 @@
+import argparse
+import calendar
+import datetime
+import json
+import os
+import sys
+
+import taskmonitor
+import telemetry
+
+# date windows for the product scripts
+#
+#   python coastline.py                                   default window
+#   python coastline.py 2023-03-01 2023-03-31             one window
+#   python coastline.py 2023-01-01:2023-01-31 2023-02-01:2023-02-28
+#   python coastline.py --windows-file windows.txt        one "start end" per line
+#   python coastline.py --monthly 2019-01 2023-12         generated range
+#   python coastline.py --quarterly 2019-01 2023-12
+#   python coastline.py --events -                        NDJSON task events on stdout
+#
+# every window is built and submitted in the same process, keeping at most
+# --max-tasks export tasks active at once (EE concurrent task quota)
+
+default_max_tasks = int(os.environ.get('SURFSIDE_MAX_TASKS', '3'))
+
+
+# split "start:end", "start,end" or "start end" into a window tuple
+def parse_window(text):
+  for sep in (':', ',', None):
+    parts = text.split(sep)
+    if len(parts) == 2:
+      return (parts[0].strip(), parts[1].strip())
+  raise ValueError('not a date window: ' + text)
+
+
+def read_windows(path):
+  found = []
+  with open(path) as f:
+    for line in f:
+      line = line.split('#')[0].strip()
+      if line:
+        found.append(parse_window(line))
+  return found
+
+
+# windows of `months` months from the first of `start` to the end of `end`,
+# window_end is the last day of the period like the script defaults
+def month_range(start, end, months=1):
+  year, month = [int(x) for x in start.split('-')[:2]]
+  last_year, last_month = [int(x) for x in end.split('-')[:2]]
+  found = []
+  while (year, month) <= (last_year, last_month):
+    end_year = year + (month + months - 2) // 12
+    end_month = (month + months - 2) % 12 + 1
+    last_day = calendar.monthrange(end_year, end_month)[1]
+    found.append((datetime.date(year, month, 1).isoformat(),
+      datetime.date(end_year, end_month, last_day).isoformat()))
+    year = end_year + end_month // 12
+    month = end_month % 12 + 1
+  return found
+
+
+def parser(add_help=True):
+  p = argparse.ArgumentParser(add_help=add_help)
+  p.add_argument('windows', nargs='*', help='START END, or any number of START:END')
+  p.add_argument('--windows-file', help='file with one window per line')
+  p.add_argument('--monthly', nargs=2, metavar=('FROM', 'TO'), help='monthly windows, YYYY-MM')
+  p.add_argument('--quarterly', nargs=2, metavar=('FROM', 'TO'), help='quarterly windows, YYYY-MM')
+  p.add_argument('--max-tasks', type=int, default=default_max_tasks, help='concurrent export tasks')
+  p.add_argument('--manifest-dir', help='also write one manifest json per window here')
+  p.add_argument('--events', metavar='PATH', help='write one NDJSON event per task state change, - for stdout')
+  return p
+
+
+def parse(argv, default):
+  return collect(parser().parse_args(argv), default)
+
+
+# turn the parsed window options into args.windows, a list of (start, end)
+def collect(args, default):
+  found = []
+  # the original "script.py START END" form
+  if len(args.windows) == 2 and not any(sep in w for w in args.windows for sep in ':,'):
+    found.append(tuple(args.windows))
+  else:
+    found.extend(parse_window(w) for w in args.windows)
+  if args.windows_file:
+    found.extend(read_windows(args.windows_file))
+  if args.monthly:
+    found.extend(month_range(args.monthly[0], args.monthly[1], 1))
+  if args.quarterly:
+    found.extend(month_range(args.quarterly[0], args.quarterly[1], 3))
+  args.windows = found or ([default] if default else [])
+  return args
+
+
+# print a manifest as soon as its window completes (unless the events on
+# stdout carry it as their summary)
+def emit(manifest_dir=None, stdout=True):
+  def done(manifest, ok):
+    if not ok:
+      reason = ': ' + manifest['error'] if 'error' in manifest else ''
+      print('tasks failed for ' + manifest['subject'] + ' window ' + manifest['window_start'] + ' ' + manifest['window_end'] + reason, file=sys.stderr)
+      return
+    if stdout:
+      print(json.dumps(manifest), flush=True)
+    if manifest_dir:
+      os.makedirs(manifest_dir, exist_ok=True)
+      name = manifest['subject'] + '_' + manifest['window_start'] + '_' + manifest['window_end'] + '.json'
+      with open(os.path.join(manifest_dir, name), 'w') as f:
+        json.dump(manifest, f)
+  return done
+
+
+# NDJSON writer for the task monitor's events: submitted, running, completed
+# (with the export's files entries), failed, cancelled, and per window a
+# summary event which is the usual manifest with event, ok and time added
+def events(path):
+  if not path:
+    return None
+  out = sys.stdout if path == '-' else open(path, 'a')
+  def write(event):
+    out.write(json.dumps(event) + '\n')
+    out.flush()
+  return write
+
+
+# the product's name, from the file of the module defining exports (which is __main__ for the scripts)
+def product_name(exports):
+  return os.path.splitext(os.path.basename(sys.modules[exports.__module__].__file__))[0]
+
+
+# build, submit and wait for every window, returns False if any window failed
+def run(exports, args):
+  jobs = [taskmonitor.Job(lambda w=w: exports(w), product_name(exports), w) for w in args.windows]
+  done = emit(args.manifest_dir, args.events != '-')
+  try:
+    return taskmonitor.wait_batch(jobs, args.max_tasks, done, events=events(args.events))
+  finally:
+    telemetry.flush()
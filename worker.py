@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import traceback
+
+import jobqueue
+import surfside
+import taskmonitor
+import telemetry
+
+# long running worker: one Earth Engine session, jobs pulled from jobqueue
+#
+#   python worker.py add coastline 2023-03-01 2023-03-31 --priority 5
+#   python worker.py add vegetation 2023-01-01 2023-12-31 --stats-only
+#   python worker.py serve --max-tasks 3 --max-jobs 4
+#   python worker.py serve --fake --once       offline, against fake products
+#
+# every job goes through the product's exports() and one shared task monitor,
+# so all jobs together stay within --max-tasks active export tasks. Stats
+# jobs start no tasks and have their own --max-stats-jobs slots, so they are
+# not held up by export jobs waiting hours for their tasks
+
+default_db = os.environ.get('SURFSIDE_QUEUE', 'surfside-jobs.sqlite')
+# seconds between queue checks while it is empty
+idle_interval = 5
+
+
+class FakeProduct:
+  # offline stand-in for a product module, exports finish after a few listings
+  def __init__(self, subject, exports=2):
+    self.subject = subject
+    self.count = exports
+
+  def exports(self, window, config=None):
+    config = config or {}
+    i_date, f_date = window
+    prefix = i_date + '_' + f_date + '/' + self.subject
+    files = [{'type': 'geotiff', 'file_extension': 'tif', 'filename': prefix + str(n) + '_' + i_date + '_' + f_date + '.tif'} for n in range(self.count)]
+    manifest = {
+      'subject': self.subject,
+      'location': config.get('location', 'surfside'),
+      'window_start': i_date,
+      'window_end': f_date,
+      'files': files,
+      'stats': [{'label': self.subject, 'area_ha': 0.0}]
+    }
+    if config.get('stats_only'):
+      return [], dict(manifest, files=[])
+    return [taskmonitor.FakeTask(f['filename'], ticks=2 + n) for n, f in enumerate(files)], manifest
+
+
+def fake_products():
+  subjects = {name: subject for subject, name in surfside.aliases.items()}
+  return {name: FakeProduct(subjects.get(name, name)) for name in surfside.product_names}
+
+
+def real_products():
+  return dict(zip(surfside.product_names, surfside.load(surfside.product_names)))
+
+
+class Worker:
+  def __init__(self, queue, products, monitor, max_tasks=None, max_jobs=4, max_stats_jobs=2, log=sys.stderr):
+    self.queue = queue
+    self.products = products
+    self.monitor = monitor
+    self.max_tasks = max_tasks
+    # free job slots per job kind
+    self.slots = {'export': max_jobs, 'stats': max_stats_jobs}
+    self.freed = asyncio.Event()
+    self.log = log
+    self.stopping = False
+    self.running = set()
+
+  def stop(self):
+    self.stopping = True
+
+  async def handle(self, job):
+    name = surfside.aliases.get(job['product'], job['product'])
+    window = (job['window_start'], job['window_end'])
+    config = {'stats_only': job['kind'] == 'stats', 'location': job['location']}
+    try:
+      product = self.products[name]
+      manifest = {}
+      def done(result, ok):
+        manifest.update(result)
+      ok = await self.monitor.run_job(taskmonitor.Job(lambda: product.exports(window, config), name, window), self.max_tasks, done)
+      if ok:
+        self.queue.finish(job['id'], manifest)
+      else:
+        self.queue.fail(job['id'], manifest.get('error', 'at least one of the tasks failed'))
+    except Exception:
+      self.queue.fail(job['id'], traceback.format_exc())
+    telemetry.flush()
+    print('job %d %s %s %s: %s' % (job['id'], name, window[0], window[1], self.queue.get(job['id'])['state']), file=self.log)
+
+  # claim jobs of the kinds with a free slot, return when stopped (or idle with once=True)
+  async def serve(self, once=False):
+    self.queue.requeue_running()
+    while not self.stopping:
+      kinds = [kind for kind, free in self.slots.items() if free > 0]
+      job = self.queue.claim(kinds) if kinds else None
+      if job is None:
+        if once and not self.running:
+          break
+        await self._idle(0.01 if once else idle_interval)
+        continue
+      self.slots[job['kind']] -= 1
+      task = asyncio.create_task(self.handle(job))
+      task.kind = job['kind']
+      self.running.add(task)
+      task.add_done_callback(self._finished)
+    if self.running:
+      await asyncio.gather(*self.running)
+
+  # wait until a job finishes or the queue is due for another look
+  async def _idle(self, seconds):
+    self.freed.clear()
+    try:
+      await asyncio.wait_for(self.freed.wait(), seconds)
+    except asyncio.TimeoutError:
+      pass
+
+  def _finished(self, task):
+    self.running.discard(task)
+    self.slots[task.kind] += 1
+    self.freed.set()
+
+
+def parser():
+  p = argparse.ArgumentParser()
+  p.add_argument('--db', default=default_db)
+  commands = p.add_subparsers(dest='command', required=True)
+  add = commands.add_parser('add')
+  add.add_argument('product')
+  add.add_argument('start')
+  add.add_argument('end')
+  add.add_argument('--location', default='surfside')
+  add.add_argument('--priority', type=int, default=0)
+  add.add_argument('--stats-only', action='store_true')
+  serve = commands.add_parser('serve')
+  serve.add_argument('--max-tasks', type=int, default=int(os.environ.get('SURFSIDE_MAX_TASKS', '3')))
+  serve.add_argument('--max-jobs', type=int, default=4, help='export jobs at once')
+  serve.add_argument('--max-stats-jobs', type=int, default=2, help='stats jobs at once, on top of --max-jobs')
+  serve.add_argument('--fake', action='store_true', help='run offline against fake products')
+  serve.add_argument('--once', action='store_true', help='exit once the queue is empty')
+  return p
+
+
+async def serve(args, queue):
+  if args.fake:
+    async def short_sleep(seconds):
+      await asyncio.sleep(0.01)
+    monitor = taskmonitor.Monitor(taskmonitor.FakeBackend(), sleep=short_sleep)
+    products = fake_products()
+  else:
+    monitor = taskmonitor.Monitor()
+    products = real_products()
+  worker = Worker(queue, products, monitor, args.max_tasks, args.max_jobs, args.max_stats_jobs)
+  loop = asyncio.get_running_loop()
+  for sig in (signal.SIGINT, signal.SIGTERM):
+    loop.add_signal_handler(sig, worker.stop)
+  await worker.serve(args.once)
+
+
+def main(argv):
+  args = parser().parse_args(argv)
+  queue = jobqueue.Queue(args.db)
+  if args.command == 'add':
+    kind = 'stats' if args.stats_only else 'export'
+    print(queue.put(args.product, (args.start, args.end), args.location, args.priority, kind))
+  else:
+    asyncio.run(serve(args, queue))
+
+
+if __name__ == '__main__':
+  main(sys.argv[1:])